@@ -1 +1,2 @@
-from . import bem, green, mesh, seas, monitor
+from . import (analytic, bem, cache, ensemble, events, fields, green, hmatrix, krylov, mesh,
+               monitor, output, parallel, profiling, seas, timestep, toeplitz)
@@ -0,0 +1,108 @@
+import numpy as np
+from . import green
+
+# Closed-form integrals of the kernels in pycycle.green over a straight segment y = a + s h / |h|,
+# s in [0, |h|]. Points and segments are stored along the last axis and broadcast against
+# each other, i.e. x of shape (P, 1, 2) and a, h of shape (Q, 2) give a (P, Q) result.
+#
+# In local coordinates of the segment x - y = -u t + d m, where t is the unit tangent,
+# m the unit vector perpendicular to t, d = (x - a) . m, and u = s - (x - a) . t.
+
+
+# Relative distance below which a point counts as on the segment line
+_ON_LINE = 64 * np.finfo(float).eps
+
+
+def _local(x, a, h):
+    """Return tangent t, perpendicular m, distance d, and interval [u0, u1]."""
+    L = np.linalg.norm(h, axis=-1)
+    t = h / L[..., np.newaxis]
+    m = np.stack((-t[..., 1], t[..., 0]), axis=-1)
+    r = x - a
+    sx = np.sum(r * t, axis=-1)
+    d = np.sum(r * m, axis=-1)
+    return t, m, d, -sx, L - sx
+
+
+def _log_r2(u, d):
+    """log(u^2 + d^2), set to zero where u = d = 0 (the factor in front vanishes there)."""
+    r2 = u * u + d * d
+    return np.log(np.where(r2 > 0, r2, 1.0))
+
+
+def _log_antiderivative(u, d):
+    """Antiderivative of log sqrt(u^2 + d^2) with respect to u."""
+    ad = np.abs(d)
+    return 0.5 * u * _log_r2(u, d) - u + ad * np.arctan2(u, ad)
+
+
+def int_G(x, a, h):
+    """Integral of G(x, y) over the segment from a to a + h."""
+    t, m, d, u0, u1 = _local(x, a, h)
+    return -(_log_antiderivative(u1, d) - _log_antiderivative(u0, d)) / (2 * np.pi)
+
+
+def int_dG_dn(x, a, h, n):
+    """Integral of dG_dn(x, y, n) over the segment from a to a + h."""
+    t, m, d, u0, u1 = _local(x, a, h)
+    # points on the segment line up to rounding (e.g. collocation points of tilted elements)
+    # lie on it, i.e. the jump of the arctan term is not taken on a random side
+    L = np.linalg.norm(h, axis=-1)
+    scale = np.sum(np.abs(x), axis=-1) + np.sum(np.abs(a), axis=-1) + L
+    d = np.where(np.abs(d) <= _ON_LINE * scale, 0.0, d)
+    tn = np.sum(t * n, axis=-1)
+    mn = np.sum(m * n, axis=-1)
+
+    def D(u):
+        return -0.5 * tn * _log_r2(u, d) + mn * np.sign(d) * np.arctan2(u, np.abs(d))
+
+    return (D(u1) - D(u0)) / (2 * np.pi)
+
+
+def _mirror(x):
+    """Mirror points at the free surface x[1] = 0."""
+    return x * np.array([1.0, -1.0])
+
+
+def int_G_fs(x, a, h):
+    """Integral of G_fs(x, y) over the segment from a to a + h."""
+    return int_G(x, a, h) + int_G(_mirror(x), a, h)
+
+
+def int_dG_fs_dn(x, a, h, n):
+    """Integral of dG_fs_dn(x, y, n) over the segment from a to a + h."""
+    return int_dG_dn(x, a, h, n) + int_dG_dn(_mirror(x), a, h, n)
+
+
+_closed_forms = {
+    green.G: lambda x, a, h, n: int_G(x, a, h),
+    green.G_fs: lambda x, a, h, n: int_G_fs(x, a, h),
+    green.dG_dn: int_dG_dn,
+    green.dG_fs_dn: int_dG_fs_dn,
+}
+
+
+# Closed forms of the whole-space terms (Kernel.base) of the kernels in pycycle.green
+_base_closed_forms = {
+    green._log: lambda x, a, h, n: int_G(x, a, h),
+    green._log_dn: int_dG_dn,
+}
+
+
+def closed_form(K):
+    """Look up the closed-form segment integral of kernel K.
+
+    :param K: Kernel function from pycycle.green
+    :return: Function (x, a, h, n) -> integral, or None if K has no known closed form
+    """
+    return _closed_forms.get(K)
+
+
+def base_closed_form(K):
+    """Look up the closed-form segment integral of the whole-space term of a green.Kernel,
+       e.g. to subtract the singularity of self pairs.
+
+    :param K: green.Kernel
+    :return: Function (x, a, h, n) -> integral, or None if unknown
+    """
+    return _base_closed_forms.get(getattr(K, 'base', None))
@@ -1,40 +1,339 @@
 import numpy as np
 from scipy.integrate import quad
+from .mesh import as_mesh
+from .analytic import base_closed_form, closed_form
+from .green import kernel
 
 
-def assemble(G, mesh):
+def assemble(G, mesh, method='quad', analytic=True, order=8, singular_order=24, rows=None,
+             cols=None, far_order=4):
     """Assemble the BEM operator A (left-hand side).
 
     :param G: Green's function G(x, xi)
-    :param mesh: List of line elements
+    :param mesh: Mesh or list of line elements
+    :param method: 'quad' (adaptive quadrature per entry) or 'gauss' (batched Gauss-Legendre
+                   with a rule per class of pairs, see plan and gauss_assemble; requires G to
+                   broadcast over leading axes like the kernels in pycycle.green)
+    :param analytic: Integrate LineElements in closed form if G is one of the kernels in
+                     pycycle.green; method is then only used for InfiniteLineElements
+    :param order: Gauss-Legendre order per half element for pairs at moderate distance
+                  ('gauss' only)
+    :param singular_order: Gauss-Legendre order per half element for near and self pairs
+                           (4 singular_order for infinite elements, 'gauss' only)
+    :param rows: Indices of collocation points (rows) to assemble; all if None
+    :param cols: Indices of elements (columns) to assemble; all if None
+    :param far_order: Gauss-Legendre order per half element for far pairs ('gauss' only, see
+                      gauss_assemble)
     """
-    M = len(mesh)
-    A = np.ndarray((M, M))
-
-    # TODO: implement - DONE
-    for i in range(M):
-        xc = mesh[i].collocation_point()
-        for j in range(M):
-            K = lambda t: G(xc, mesh[j].xi(t)) * mesh[j].factor(
-                t)
-            # Do not forget to initialize A (= sign instead of +=)
-            A[i, j] = quad(K, -1, 0)[0] + quad(K, 0, 1)[0]
-    return A
+    K = kernel(G)
+    if K is None:
+        K = lambda x, xi, n: G(x, xi)
+    return integrate(K, mesh, method, closed_form(G) if analytic else None, order,
+                     singular_order, rows, cols, far_order)
 
 
-def rhs_op(dG_dn, mesh):
+def rhs_op(dG_dn, mesh, method='quad', analytic=True, order=8, singular_order=24, rows=None,
+           cols=None, far_order=4):
     """Assemble the BEM operator B, which is used to construct the right-hand side,
        i.e. b = B @ u.
 
     :param dG_dn: Directional derivative of Green's function dG_dn(x, xi, n)
-    :param mesh: List of line elements
+    :param mesh: Mesh or list of line elements
+    :param method: 'quad' or 'gauss', see assemble
+    :param analytic: See assemble
+    :param order: See assemble
+    :param singular_order: See assemble
+    :param rows: See assemble
+    :param cols: See assemble
+    :param far_order: See assemble
     """
-    M = len(mesh)
-    B = 0.5 * np.eye(M)
-    for i in range(M):
-        xc = mesh[i].collocation_point()
-        for j in range(M):
-            K = lambda t: dG_dn(xc, mesh[j].xi(t), mesh[j].n) * mesh[j].factor(
-                t)
-            B[i, j] += quad(K, -1, 0)[0] + quad(K, 0, 1)[0]
+    K = kernel(dG_dn)
+    B = integrate(dG_dn if K is None else K, mesh, method,
+                  closed_form(dG_dn) if analytic else None, order, singular_order, rows, cols,
+                  far_order)
+    rows, cols = _indices(mesh, rows, cols)
+    B[np.equal.outer(rows, cols)] += 0.5
     return B
+
+
+def _indices(mesh, rows, cols):
+    M = len(mesh)
+    rows = np.arange(M) if rows is None else np.asarray(rows, dtype=int)
+    cols = np.arange(M) if cols is None else np.asarray(cols, dtype=int)
+    return rows, cols
+
+
+def integrate(K, mesh, method, integral=None, order=8, singular_order=24, rows=None,
+              cols=None, far_order=4):
+    """Compute int K(x_i, xi, n_j) dxi over element j for collocation points x_i.
+
+    :param K: Kernel K(x, xi, n)
+    :param mesh: Mesh or list of line elements
+    :param method: 'quad' or 'gauss', see assemble
+    :param integral: Closed-form integral over LineElements (see analytic.closed_form) or None
+    :param order: See assemble
+    :param singular_order: See assemble
+    :param rows: Indices of collocation points; all if None
+    :param cols: Indices of elements; all if None
+    :param far_order: See assemble
+    """
+    if method not in ('quad', 'gauss'):
+        raise ValueError('Unknown assembly method: {}'.format(method))
+
+    mesh = as_mesh(mesh)
+    rows, cols = _indices(mesh, rows, cols)
+    A = np.ndarray((rows.shape[0], cols.shape[0]))
+    xc = mesh[rows].collocation_points()
+    remaining = np.arange(cols.shape[0])
+    if integral is not None:
+        line = mesh.line[cols]
+        A[:, line] = closed_form_block(integral, xc, mesh[cols[line]])
+        remaining = remaining[~line]
+
+    elements = mesh[cols[remaining]]
+    if method == 'gauss':
+        A[:, remaining] = gauss_assemble(K, xc, elements, order, singular_order,
+                                         far_order=far_order)
+        return A
+
+    elements = list(elements)
+    for i in range(rows.shape[0]):
+        for j, e in zip(remaining, elements):
+            Kt = lambda t: K(xc[i], e.xi(t), e.n) * e.factor(t)
+            # Do not forget to initialize A (= sign instead of +=)
+            A[i, j] = quad(Kt, -1, 0)[0] + quad(Kt, 0, 1)[0]
+    return A
+
+
+def closed_form_block(integral, x, mesh, block_size=2**22):
+    """Integrate over LineElements in closed form.
+
+    :param integral: Closed-form integral, see analytic.closed_form
+    :param x: Collocation points (P, 2)
+    :param mesh: Mesh (or list) of LineElements
+    :param block_size: Bound on kernel evaluations held in memory at once
+    """
+    mesh = as_mesh(mesh)
+    A = np.empty((x.shape[0], len(mesh)))
+    if len(mesh) == 0:
+        return A
+    rows = max(1, block_size // len(mesh))
+    for start in range(0, x.shape[0], rows):
+        stop = min(start + rows, x.shape[0])
+        A[start:stop] = integral(x[start:stop, np.newaxis], mesh.a, mesh.h, mesh.n)
+    return A
+
+
+def gauss_rule(order, grading=0):
+    """Gauss-Legendre rule on [-1, 1], split at theta = 0 like the quad path.
+
+       With grading > 0 the substitution s -> s^q / (s^q + (1-s)^q) is applied on each half,
+       which clusters the nodes at theta = -1, 0, 1 and removes the logarithmic endpoint
+       singularities of the self terms and of infinite elements.
+
+    :param order: Number of nodes per half
+    :param grading: Exponent q of the graded substitution (0 = plain Gauss-Legendre)
+    :return: nodes, weights (each of size 2 * order)
+    """
+    x, w = np.polynomial.legendre.leggauss(order)
+    s = (x + 1) / 2
+    w = w / 2
+    if grading > 0:
+        q = grading
+        denom = s**q + (1 - s)**q
+        w = w * q * s**(q - 1) * (1 - s)**(q - 1) / denom**2
+        s = s**q / denom
+    return np.concatenate((s - 1, s)), np.concatenate((w, w))
+
+
+def element_nodes(mesh, theta, weights):
+    """Map quadrature rule to every element of the mesh.
+
+    :param mesh: Mesh or list of line elements
+    :param theta: Quadrature nodes in [-1, 1]
+    :param weights: Quadrature weights
+    :return: X (M, nodes, 2) physical nodes, W (M, nodes) weights times integration factor
+    """
+    mesh = as_mesh(mesh)
+    return mesh.xi(theta), weights * mesh.factor(theta)
+
+
+def pair_geometry(x, mesh):
+    """Distance-to-length ratio and nearest element parameter of (point, element) pairs.
+
+    :param x: Points (P, 2)
+    :param mesh: Mesh or list of line elements
+    :return: ratio (P, M), the distance between x and a LineElement divided by its length,
+             and theta (P, M) in [-1, 1], the parameter of the nearest point on the
+             LineElement (both 0 for InfiniteLineElements)
+    """
+    mesh = as_mesh(mesh)
+    finite = mesh.line
+    h0, h1 = mesh.h[:, 0], mesh.h[:, 1]
+    h_norm = np.where(finite, mesh.h_norm, 1.0)
+    # component-wise, i.e. without (P, M, 2) temporaries
+    d0 = x[:, 0, np.newaxis] - mesh.a[:, 0]
+    d1 = x[:, 1, np.newaxis] - mesh.a[:, 1]
+    s = (d0 * h0 + d1 * h1) / h_norm**2
+    np.clip(s, 0, 1, out=s)
+    d0 -= s * h0
+    d1 -= s * h1
+    ratio = np.sqrt(d0 * d0 + d1 * d1) / h_norm
+    return np.where(finite, ratio, 0.0), np.where(finite, 2 * s - 1, 0.0)
+
+
+def near_pairs(x, mesh, ratio=1.0):
+    """Flag (collocation point, element) pairs which need the singular rule.
+
+       A pair is near if the distance between the point and a LineElement is smaller than
+       ratio times the element length. InfiniteLineElements are always near.
+
+    :param x: Collocation points (P, 2)
+    :param mesh: Mesh or list of line elements
+    :param ratio: Distance-to-length ratio
+    :return: Boolean array (P, M)
+    """
+    mesh = as_mesh(mesh)
+    return np.logical_or(~mesh.line, pair_geometry(x, mesh)[0] < ratio)
+
+
+# Quadrature classes of (collocation point, element) pairs, see plan
+FAR = 0
+MID = 1
+NEAR = 2
+SELF = 3
+INFINITE = 4
+
+# Distance-to-length ratio below which a point lies on an element (up to rounding)
+SELF_RATIO = 1e-10
+
+
+def plan(x, mesh, K=None, near=1.0, far=4.0):
+    """Quadrature plan: class of every (collocation point, element) pair by element type and
+       distance-to-length ratio.
+
+       Pairs with InfiniteLineElements are INFINITE. For LineElements, a pair is SELF if
+       the point lies on the element, NEAR if any singular point of K (see
+       green.Kernel.singular_points, e.g. also the mirror image of x) is closer than near
+       times the element length, MID if closer than far times the element length, and FAR
+       otherwise.
+
+    :param x: Collocation points (P, 2)
+    :param mesh: Mesh or list of line elements
+    :param K: Kernel (only its singular points are used; x is the only one if None)
+    :param near: Ratio below which pairs are NEAR
+    :param far: Ratio from which pairs are FAR
+    :return: classes (P, M) (int8), and theta (P, M), the element parameter nearest to the
+             closest singular point at which near and self pairs are split (0 if it is an
+             end point, which the graded rule resolves anyway)
+    """
+    mesh = as_mesh(mesh)
+    singular_points = getattr(K, 'singular_points', lambda x: x[np.newaxis])
+    ratio, theta = pair_geometry(x, mesh)
+    on = ratio <= SELF_RATIO
+    for y in singular_points(x)[1:]:
+        r, t = pair_geometry(y, mesh)
+        closer = r < ratio
+        ratio = np.where(closer, r, ratio)
+        theta = np.where(closer, t, theta)
+    classes = np.full(ratio.shape, FAR, dtype=np.int8)
+    classes[ratio < far] = MID
+    classes[ratio < near] = NEAR
+    classes[on] = SELF
+    classes[:, ~mesh.line] = INFINITE
+    return classes, np.where(np.abs(theta) < 1, theta, 0.0)
+
+
+def split_nodes(mesh, j, theta, nodes, weights):
+    """Map a rule which is split at 0 (see gauss_rule) to LineElements j, split at theta.
+
+    :param mesh: Mesh
+    :param j: Indices of LineElements (k,)
+    :param theta: Split points in [-1, 1] (k,)
+    :param nodes: Nodes in [-1, 1], split at 0
+    :param weights: Weights
+    :return: X (k, nodes, 2) physical nodes, W (k, nodes) weights times integration factor
+    """
+    theta = theta[:, np.newaxis]
+    scale = np.where(nodes < 0, theta + 1, 1 - theta)
+    t = theta + scale * nodes
+    X = mesh.a[j, np.newaxis] + (t[..., np.newaxis] + 1) / 2 * mesh.h[j, np.newaxis]
+    return X, scale * weights * (mesh.h_norm[j, np.newaxis] / 2)
+
+
+def gauss_assemble(K, x, mesh, order=8, singular_order=24, grading=3, block_size=2**20,
+                   far_order=4, near=1.0, far=4.0):
+    """Batched Gauss-Legendre assembly of int K(x_i, xi, n_j) dxi over elements j for
+       collocation points x_i.
+
+       Every class of pairs (see plan) gets its own rule, evaluated in one batch per class:
+
+       * FAR: plain rule of far_order nodes per half element,
+       * MID: plain rule of order nodes per half element,
+       * NEAR: graded rule of singular_order nodes, split at the nearest point to the
+         singularity,
+       * SELF: like NEAR; for a green.Kernel whose whole-space term has a closed form (see
+         analytic.base_closed_form) the singularity is subtracted, i.e. only the image term
+         is integrated numerically,
+       * INFINITE: graded rule of 4 singular_order nodes per half element, as points near
+         the start of the element are only resolved by many nodes there (there are few
+         such pairs); the logarithmic growth of the kernel at infinity
+         (green.Kernel.growth) is subtracted, as its integral vanishes in the
+         parametrization of InfiniteLineElement.
+
+       All pairs are first evaluated with the FAR rule and the other classes are recomputed,
+       i.e. most of the work is done at low order.
+
+    :param K: Kernel K(x, xi, n), broadcasting over leading axes, or green.Kernel
+    :param x: Collocation points (P, 2)
+    :param mesh: Mesh or list of line elements (columns)
+    :param order: Order of the MID rule per half element
+    :param singular_order: Order of the graded rule per half element
+    :param grading: Exponent of the graded rule
+    :param block_size: Bound on kernel evaluations held in memory at once
+    :param far_order: Order of the FAR rule per half element
+    :param near: Distance-to-length ratio below which pairs are NEAR
+    :param far: Distance-to-length ratio from which pairs are FAR
+    """
+    mesh = as_mesh(mesh)
+    P = x.shape[0]
+    A = np.empty((P, len(mesh)))
+    if len(mesh) == 0:
+        return A
+    n = mesh.n
+    subtract = base_closed_form(K)
+    growth = getattr(K, 'growth', 0.0)
+    X, W = element_nodes(mesh, *gauss_rule(far_order))
+    Xm, Wm = element_nodes(mesh, *gauss_rule(order))
+    ts, ws = gauss_rule(singular_order, grading)
+    inf = np.flatnonzero(~mesh.line)
+    ti, wi = gauss_rule(4 * singular_order, grading)
+    Xi, Wi = element_nodes(mesh[inf], ti, wi)
+    tail = growth * np.log(1 - ti)
+
+    rows = max(1, block_size // (len(mesh) * X.shape[1]))
+    for start in range(0, P, rows):
+        stop = min(start + rows, P)
+        A[start:stop] = np.sum(
+            K(x[start:stop, np.newaxis, np.newaxis], X, n[:, np.newaxis]) * W, axis=-1)
+        classes, theta = plan(x[start:stop], mesh, K, near, far)
+
+        i, j = np.nonzero(classes == MID)
+        A[i + start, j] = np.sum(K(x[i + start, np.newaxis], Xm[j], n[j, np.newaxis]) * Wm[j],
+                                 axis=-1)
+
+        i, j = np.nonzero((classes == NEAR) | ((classes == SELF) & (subtract is None)))
+        Xn, Wn = split_nodes(mesh, j, theta[i, j], ts, ws)
+        A[i + start, j] = np.sum(K(x[i + start, np.newaxis], Xn, n[j, np.newaxis]) * Wn,
+                                 axis=-1)
+
+        if subtract is not None:
+            i, j = np.nonzero(classes == SELF)
+            Xn, Wn = split_nodes(mesh, j, theta[i, j], ts, ws)
+            A[i + start, j] = subtract(x[i + start], mesh.a[j], mesh.h[j], n[j]) + np.sum(
+                K.image_term(x[i + start, np.newaxis], Xn, n[j, np.newaxis]) * Wn, axis=-1)
+
+        A[start:stop, inf] = np.sum(
+            (K(x[start:stop, np.newaxis, np.newaxis], Xi, n[inf, np.newaxis]) - tail) * Wi,
+            axis=-1)
+    return A
@@ -0,0 +1,281 @@
+"""Performance benchmarks on the BP1 setup of bp1.ipynb.
+
+Run from the directory of the README, e.g.
+
+    python3 -m pycycle.benchmark --resolutions 0.8 0.4 0.2 0.1 --output results.json \\
+        --baseline benchmark_baseline.json
+
+and pass --save-baseline to replace the baseline by the new results.
+"""
+import argparse
+import json
+import os
+import platform
+import time
+import tracemalloc
+import warnings
+import numpy as np
+from . import bem, green, timestep
+from .fields import Profile
+from .mesh import InfiniteLineElement, line_normal, tessellate_line
+from .seas import F, ConstantParams, Context, VariableParams, y0
+
+CASES = ('assemble', 'rhs_op', 'context', 'traction', 'slip_rate', 'F', 'integrate')
+
+# Settings stored with every result; results are only compared with baseline results of
+# equal settings
+SETTINGS = ('assembly', 'operator', 'workers', 'cpus', 'platform')
+
+# Horizon [s] and step bound of the integration case
+HORIZON = 3.15e8
+MAX_STEPS = 200
+
+
+def bp1_mesh(h1):
+    """BP1 mesh of bp1.ipynb: fault with resolution h1 down to 40 km, then resolution 5 h1
+       down to 50 km, then an infinite element."""
+    b1 = (0, 40.0)
+    b2 = (0, 50.0)
+    star_centre = (1, 1)
+    normal1 = line_normal((0, 0), b1, star_centre)
+    normal2 = line_normal(b1, b2, star_centre)
+    mesh = tessellate_line((0, 0), b1, h1, normal1, True)
+    mesh += tessellate_line(b1, b2, 5 * h1, normal2)
+    mesh.append(InfiniteLineElement(b2, normal2))
+    return mesh
+
+
+def bp1_params(mesh):
+    """ConstantParams and VariableParams of bp1.ipynb."""
+    cp = ConstantParams(2.670, 3.464, 1e-9, 1e-6, 0.015, 0.008, 0.6, 50, 1e-9)
+    amax = 0.025
+    e = np.exp((cp.f0 + cp.b * np.log(cp.V0 / cp.Vinit)) / amax)
+    tau_pre = -(cp.sn * amax * np.arcsinh((cp.Vinit / (2.0 * cp.V0)) * e) + cp.eta * cp.Vinit)
+    vp = VariableParams(mesh, Profile([15.0, 18.0], [0.010, amax], axis=1), tau_pre)
+    return cp, vp
+
+
+def measure(fn, repeat=3, min_time=0.05):
+    """Best wall-clock time per call of fn and peak memory of one call.
+
+       Calls are timed in batches which take at least min_time (like timeit.autorange), and
+       the best of repeat batches is reported.
+
+    :param fn: Function without arguments
+    :param repeat: Number of timed batches
+    :param min_time: Minimum duration of a batch [s]
+    :return: time [s], peak of traced allocations [bytes], result of the last call
+    """
+    tracemalloc.start()
+    try:
+        result = fn()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    number = 1
+    best = np.inf
+    k = 0
+    while k < repeat:
+        start = time.perf_counter()
+        for _ in range(number):
+            result = fn()
+        elapsed = time.perf_counter() - start
+        if elapsed < min_time and k == 0:
+            number *= 2 if elapsed == 0 else max(2, int(min_time / elapsed))
+            continue
+        best = min(best, elapsed / number)
+        k += 1
+    return best, peak, result
+
+
+def bench(h1, cases=CASES, repeat=3, assembly='gauss', options=None):
+    """Run the benchmark cases on the BP1 mesh with fault resolution h1.
+
+    :param h1: Fault resolution [km]
+    :param cases: Subset of CASES
+    :param repeat: See measure
+    :param assembly: Assembly method of bem.assemble and Context
+    :param options: Further keyword arguments for Context (operator, linear_solver, ...)
+    :return: List of result dicts with case, h, N, Nf, time, peak_bytes (and steps), and
+             the SETTINGS
+    """
+    for case in cases:
+        if case not in CASES:
+            raise ValueError('Unknown benchmark case: {}'.format(case))
+    options = {} if options is None else options
+    mesh = bp1_mesh(h1)
+    cp, vp = bp1_params(mesh)
+    N = len(mesh)
+    Nf = int(np.count_nonzero(mesh.is_fault))
+    ctx = Context(mesh, green.G_fs, green.dG_fs_dn, vp, cp, assembly=assembly, **options)
+    y = y0(ctx)
+    S, psi = y[::2], y[1::2]
+    tau = ctx.traction(0.0, S)
+    calls = {
+        'assemble': lambda: bem.assemble(green.G_fs, mesh, method=assembly),
+        'rhs_op': lambda: bem.rhs_op(green.dG_fs_dn, mesh, method=assembly),
+        'context': lambda: Context(mesh, green.G_fs, green.dG_fs_dn, vp, cp,
+                                   assembly=assembly, **options),
+        'traction': lambda: ctx.traction(1e8, S),
+        'slip_rate': lambda: ctx.slip_rates(tau, psi),
+        'F': lambda: F(1e8, y, ctx),
+        'integrate': lambda: timestep.integrate(ctx, (0.0, HORIZON), y, max_steps=MAX_STEPS)
+    }
+    settings = {
+        'assembly': assembly,
+        'operator': options.get('operator', 'dense'),
+        'workers': options.get('workers'),
+        'cpus': os.cpu_count(),
+        'platform': platform.platform()
+    }
+    results = []
+    for case in cases:
+        t, peak, result = measure(calls[case], 1 if case in ('context', 'integrate') else repeat)
+        entry = {'case': case, 'h': h1, 'N': N, 'Nf': Nf, 'time': t, 'peak_bytes': peak}
+        entry.update(settings)
+        if case == 'integrate':
+            entry['steps'] = result.nsteps
+        results.append(entry)
+    return results
+
+
+def machine():
+    """Description of the machine and library versions."""
+    import scipy
+    return {
+        'platform': platform.platform(),
+        'processor': platform.processor(),
+        'cpus': os.cpu_count(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'scipy': scipy.__version__
+    }
+
+
+def run(resolutions=(0.8, 0.4, 0.2, 0.1), cases=CASES, repeat=3, assembly='gauss',
+        options=None):
+    """Run bench for all resolutions.
+
+    :return: Dict with machine, settings, and results
+    """
+    results = []
+    for h1 in resolutions:
+        results += bench(h1, cases, repeat, assembly, options)
+    return {
+        'machine': machine(),
+        'assembly': assembly,
+        'options': {} if options is None else options,
+        'results': results
+    }
+
+
+def scaling(results):
+    """Least-squares exponent p of time ~ N^p per case.
+
+    :param results: List of result dicts (see bench)
+    :return: Dict case -> exponent (only cases with at least two mesh sizes)
+    """
+    exponents = {}
+    for case in CASES:
+        points = [(r['N'], r['time']) for r in results if r['case'] == case and r['time'] > 0]
+        if len({N for N, _ in points}) >= 2:
+            N, t = np.log(np.array(points)).T
+            exponents[case] = np.polyfit(N, t, 1)[0]
+    return exponents
+
+
+def _key(r):
+    return (r['case'], r['N']) + tuple(r.get(name) for name in SETTINGS)
+
+
+def compare(results, baseline, tolerance=0.25):
+    """Compare results with baseline results of the same case, mesh size, and SETTINGS.
+
+       Baseline results of the same case and mesh size but other settings (e.g. recorded on
+       another machine or with another operator) are not compared; a warning names the
+       settings which differ.
+
+    :param results: List of result dicts
+    :param baseline: List of result dicts
+    :param tolerance: Relative change below which a case counts as unchanged
+    :return: List of (case, N, time, baseline time, speedup, verdict), where speedup is
+             baseline time / time and verdict is 'faster', 'slower', or 'unchanged'
+    """
+    reference = {_key(r): r['time'] for r in baseline}
+    others = {}
+    for r in baseline:
+        others.setdefault((r['case'], r['N']), []).append(r)
+    rows = []
+    differing = set()
+    for r in results:
+        t_ref = reference.get(_key(r))
+        if t_ref is None:
+            for other in others.get((r['case'], r['N']), []):
+                differing.update(name for name in SETTINGS if other.get(name) != r.get(name))
+            continue
+        speedup = t_ref / r['time'] if r['time'] > 0 else np.inf
+        if speedup > 1 + tolerance:
+            verdict = 'faster'
+        elif speedup < 1 / (1 + tolerance):
+            verdict = 'slower'
+        else:
+            verdict = 'unchanged'
+        rows.append((r['case'], r['N'], r['time'], t_ref, speedup, verdict))
+    if differing:
+        warnings.warn('Baseline results with other settings ({}) are not compared'.format(
+            ', '.join(name for name in SETTINGS if name in differing)))
+    return rows
+
+
+def report(data, baseline=None, tolerance=0.25):
+    """Format results, scaling exponents, and the comparison with baseline as text."""
+    results = data['results']
+    lines = ['{:<10} {:>6} {:>6} {:>12} {:>12} {:>6}'.format('case', 'N', 'Nf', 'time [s]',
+                                                              'peak [MiB]', 'steps')]
+    for r in results:
+        lines.append('{:<10} {:>6} {:>6} {:>12.4g} {:>12.3f} {:>6}'.format(
+            r['case'], r['N'], r['Nf'], r['time'], r['peak_bytes'] / 2**20, r.get('steps', '')))
+    lines += ['', 'Scaling exponents (time ~ N^p):']
+    for case, p in scaling(results).items():
+        lines.append('{:<10} p = {:.2f}'.format(case, p))
+    if baseline is not None:
+        lines += ['', 'Comparison with baseline (speedup = baseline / time):']
+        for case, N, t, t_ref, speedup, verdict in compare(results, baseline['results'],
+                                                           tolerance):
+            lines.append('{:<10} {:>6} {:>12.4g} {:>12.4g} {:>8.2f}x {}'.format(
+                case, N, t, t_ref, speedup, verdict))
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='pycycle BP1 benchmarks')
+    parser.add_argument('--resolutions', type=float, nargs='+', default=[0.8, 0.4, 0.2, 0.1],
+                        help='fault resolutions h1 [km]')
+    parser.add_argument('--cases', nargs='+', default=list(CASES), choices=CASES)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--assembly', default='gauss', choices=('quad', 'gauss'))
+    parser.add_argument('--output', help='write results as JSON')
+    parser.add_argument('--baseline', help='baseline JSON to compare with')
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='write the results to the baseline file')
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    data = run(args.resolutions, args.cases, args.repeat, args.assembly)
+    baseline = None
+    if args.baseline is not None and os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+    print(report(data, baseline, args.tolerance))
+    if args.output is not None:
+        with open(args.output, 'w') as file:
+            json.dump(data, file, indent=1)
+    if args.save_baseline:
+        if args.baseline is None:
+            parser.error('--save-baseline requires --baseline')
+        with open(args.baseline, 'w') as file:
+            json.dump(data, file, indent=1)
+
+
+if __name__ == '__main__':
+    main()
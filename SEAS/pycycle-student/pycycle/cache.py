@@ -0,0 +1,136 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import numpy as np
+from .mesh import as_mesh
+
+# Bump whenever the assembly changes such that cached operators become invalid
+VERSION = 4
+
+
+def kernel_name(K):
+    """Identify kernel K by module and qualified name.
+
+    :param K: Function, e.g. green.G_fs
+    """
+    name = getattr(K, '__qualname__', None)
+    module = getattr(K, '__module__', None)
+    if name is None or module is None or '<' in name:
+        raise ValueError('Cannot identify kernel for caching: {}'.format(K))
+    return '{}.{}'.format(module, name)
+
+
+def mesh_hash(mesh, h=None):
+    """Hash element types, endpoints, normals, and fault flags of mesh.
+
+    :param mesh: Mesh or list of line elements
+    :param h: hashlib object to update (a new sha256 if None)
+    """
+    mesh = as_mesh(mesh)
+    h = hashlib.sha256() if h is None else h
+    for array in (mesh.kind, mesh.a, mesh.h, mesh.n, mesh.is_fault):
+        h.update(np.ascontiguousarray(array).tobytes())
+    return h
+
+
+def operator_key(mesh, G, dG_dn, assembly):
+    """Content-addressed key of the BEM operators of a mesh.
+
+    :param mesh: Mesh or list of line elements
+    :param G: Green's function
+    :param dG_dn: Directional derivative of Green's function
+    :param assembly: Assembly method, see bem.assemble
+    :return: Hex digest
+    """
+    h = hashlib.sha256('pycycle-{}'.format(VERSION).encode())
+    for part in (kernel_name(G), kernel_name(dG_dn), assembly):
+        h.update(part.encode() + b'\0')
+    return mesh_hash(mesh, h).hexdigest()
+
+
+class OperatorCache:
+    """Persistent cache of arrays in directory/<key>/<name>.npy.
+
+       Arrays are loaded memory-mapped (read-only), i.e. pages are only read when used.
+       The total size is bounded by max_bytes; least recently used keys are evicted first.
+    """
+    def __init__(self, directory, max_bytes=2**32):
+        """Constructor.
+
+        :param directory: Cache directory (created if missing)
+        :param max_bytes: Size bound of the cache in bytes
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key, name):
+        return os.path.join(self.directory, key, name + '.npy')
+
+    def load(self, key, name):
+        """Load array name of key memory-mapped, or return None if not cached."""
+        path = self._path(key, name)
+        try:
+            array = np.load(path, mmap_mode='r')
+        except (FileNotFoundError, ValueError):
+            return None
+        os.utime(os.path.join(self.directory, key))
+        return array
+
+    def store(self, key, name, array):
+        """Store array name of key and evict old keys if the cache grew too large."""
+        os.makedirs(os.path.join(self.directory, key), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.join(self.directory, key), suffix='.npy')
+        with os.fdopen(fd, 'wb') as file:
+            np.save(file, np.asarray(array))
+        os.replace(tmp, self._path(key, name))
+        os.utime(os.path.join(self.directory, key))
+        self.evict(keep=key)
+
+    def get(self, key, name, compute):
+        """Load array name of key, or compute, store, and return it.
+
+        :param key: Key, see operator_key
+        :param name: Array name
+        :param compute: Function without arguments which returns the array
+        """
+        array = self.load(key, name)
+        if array is None:
+            array = compute()
+            self.store(key, name, array)
+        return array
+
+    def entries(self):
+        """List (key, bytes, last use) of all keys."""
+        result = []
+        for key in os.listdir(self.directory):
+            path = os.path.join(self.directory, key)
+            if os.path.isdir(path):
+                size = sum(entry.stat().st_size for entry in os.scandir(path))
+                result.append((key, size, os.stat(path).st_mtime))
+        return result
+
+    @property
+    def nbytes(self):
+        """Total size of the cache in bytes."""
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self, keep=None):
+        """Remove least recently used keys until the cache fits into max_bytes.
+
+        :param keep: Key which is not removed
+        """
+        entries = sorted(self.entries(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        for key, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            if key != keep:
+                shutil.rmtree(os.path.join(self.directory, key), ignore_errors=True)
+                total -= size
+
+    def clear(self):
+        """Remove all keys."""
+        for key, _, _ in self.entries():
+            shutil.rmtree(os.path.join(self.directory, key), ignore_errors=True)
@@ -0,0 +1,177 @@
+import os
+import traceback
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from multiprocessing import shared_memory
+import numpy as np
+from . import output
+from .mesh import as_mesh
+from .seas import Context, VariableParams
+from .timestep import integrate
+
+# Fault traction operator and mesh of the worker processes, set once per worker by _init
+_K = None
+_mesh = None
+_shm = None
+
+
+def _init(name, shape, mesh):
+    global _K, _mesh, _shm
+    _shm = shared_memory.SharedMemory(name=name)
+    _K = np.ndarray(shape, dtype=float, buffer=_shm.buf)
+    _mesh = mesh
+
+
+class Member:
+    """Parameter set of one ensemble member; unset parameters are taken from the Ensemble."""
+    def __init__(self, cp=None, a=None, tau_pre=None, y=None, name=None):
+        """Constructor.
+
+        :param cp: ConstantParams
+        :param a: a parameter (see seas.VariableParams); must be picklable for processes,
+                  e.g. a constant, an array, or a field from pycycle.fields
+        :param tau_pre: Pre-stress (same options as a)
+        :param y: Initial state; seas.y0 of the member if None
+        :param name: Name of the member, e.g. used as directory name of its output
+        """
+        self.cp = cp
+        self.a = a
+        self.tau_pre = tau_pre
+        self.y = y
+        self.name = name
+
+
+class MemberResult:
+    """Outcome of one ensemble member."""
+    def __init__(self, index, name, result=None, error=None):
+        """Constructor.
+
+        :param index: Index of the member
+        :param name: Name of the member
+        :param result: timestep.Result, or None if the member failed
+        :param error: Traceback of the failure, or None
+        """
+        self.index = index
+        self.name = name
+        self.result = result
+        self.error = error
+
+    @property
+    def success(self):
+        return self.error is None and self.result.success
+
+    def __repr__(self):
+        return 'MemberResult({}, {})'.format(self.name, self.result if self.error is None else
+                                            self.error.strip().splitlines()[-1])
+
+
+def _run_member(index, name, member, base, K, mesh, t_span, directory, options):
+    """Integrate one member; exceptions are returned as MemberResult instead of raised."""
+    try:
+        vp0, cp0 = base
+        cp = cp0 if member.cp is None else member.cp
+        if member.a is None and member.tau_pre is None:
+            vp = vp0
+        else:
+            vp = VariableParams(mesh, vp0.a if member.a is None else member.a,
+                                vp0.tau_pre if member.tau_pre is None else member.tau_pre)
+        ctx = Context.from_fault_operator(mesh, K, vp, cp, mu=cp0.mu)
+        if directory is None:
+            result = integrate(ctx, t_span, member.y, **options)
+        else:
+            result = output.run(ctx, os.path.join(directory, name), t_span, member.y,
+                                **options)
+        return MemberResult(index, name, result)
+    except Exception:
+        return MemberResult(index, name, error=traceback.format_exc())
+
+
+def _run_shared(index, name, member, base, t_span, directory, options):
+    return _run_member(index, name, member, base, _K, _mesh, t_span, directory, options)
+
+
+class Ensemble:
+    """Integrate many parameter variants of one mesh.
+
+       The fault traction operator K = mu / 2 M^T A^{-1} B M is built once by a dense
+       Context and placed in shared memory; members only differ in ConstantParams and
+       the a / pre-stress fields, and use K directly (traction is scaled if their shear
+       modulus differs). Memory is one copy of K for all worker processes.
+    """
+    def __init__(self, mesh, G, dG_dn, vp, cp, **options):
+        """Constructor.
+
+        :param mesh: Mesh or list of line elements
+        :param G: Green's function
+        :param dG_dn: Directional derivative of Green's function
+        :param vp: VariableParams of the base member
+        :param cp: ConstantParams of the base member
+        :param options: Further keyword arguments for seas.Context (assembly, cache,
+                        workers, ...); the operator must be dense with LU
+        """
+        self.mesh = as_mesh(mesh)
+        self.vp = vp
+        self.cp = cp
+        ctx = Context(self.mesh, G, dG_dn, vp, cp, precompute=True, **options)
+        self.K = np.ascontiguousarray(ctx.K)
+
+    def run(self, members, t_span, directory=None, workers=None, executor='process',
+            progress=None, **options):
+        """Integrate all members.
+
+        :param members: List of Member
+        :param t_span: Interval of integration (t0, tend) [s]
+        :param directory: Stream every member to directory/<name> with output.run, which
+                          also resumes members from their checkpoints (no streams if None)
+        :param workers: Number of workers (os.cpu_count() if None)
+        :param executor: 'process' (K in shared memory) or 'thread'
+        :param progress: Called with (number of finished members, number of members,
+                         MemberResult) whenever a member finishes
+        :param options: Further options for timestep.Integrator (method, rtol, max_steps, ...)
+        :return: List of MemberResult in the order of members; failures of single members
+                 are reported in MemberResult.error and do not stop the others
+        """
+        workers = os.cpu_count() if workers is None else workers
+        members = list(members)
+        names = [
+            'member{:04d}'.format(k) if member.name is None else member.name
+            for k, member in enumerate(members)
+        ]
+        base = (self.vp, self.cp)
+        results = [None] * len(members)
+
+        def collect(futures):
+            for done, future in enumerate(as_completed(futures), 1):
+                k = futures[future]
+                try:
+                    result = future.result()
+                except Exception:
+                    result = MemberResult(k, names[k], error=traceback.format_exc())
+                results[k] = result
+                if progress is not None:
+                    progress(done, len(members), result)
+
+        if executor == 'thread':
+            with ThreadPoolExecutor(workers) as pool:
+                collect({
+                    pool.submit(_run_member, k, names[k], member, base, self.K, self.mesh,
+                                t_span, directory, options): k
+                    for k, member in enumerate(members)
+                })
+            return results
+        if executor != 'process':
+            raise ValueError('Unknown executor: {}'.format(executor))
+
+        shm = shared_memory.SharedMemory(create=True, size=max(1, self.K.nbytes))
+        try:
+            np.ndarray(self.K.shape, dtype=float, buffer=shm.buf)[:] = self.K
+            with ProcessPoolExecutor(workers, initializer=_init,
+                                     initargs=(shm.name, self.K.shape, self.mesh)) as pool:
+                collect({
+                    pool.submit(_run_shared, k, names[k], member, base, t_span, directory,
+                                options): k
+                    for k, member in enumerate(members)
+                })
+        finally:
+            shm.close()
+            shm.unlink()
+        return results
@@ -0,0 +1,136 @@
+import numpy as np
+from .mesh import as_mesh
+
+# Default event classes by maximum slip rate [m/s]
+THRESHOLDS = [{'name': 'slow slip', 'vthresh': 1e-6}, {'name': 'earthquake', 'vthresh': 1e-2}]
+
+# mu [GPa] * slip [m] * length [km] in N m / m
+MOMENT_UNIT = 1e12
+
+
+class Event:
+    """Slip event during which the maximum slip rate exceeded a threshold."""
+    def __init__(self, level, name, t_start, hypocenter, x_hypocenter):
+        """Constructor.
+
+        :param level: Index of the threshold
+        :param name: Name of the threshold
+        :param t_start: Time at which max(V) crossed the threshold [s]
+        :param hypocenter: Fault element with maximum V when the threshold was crossed
+        :param x_hypocenter: Collocation point of the hypocenter
+        """
+        self.level = level
+        self.name = name
+        self.t_start = t_start
+        self.t_end = None
+        self.hypocenter = hypocenter
+        self.x_hypocenter = x_hypocenter
+        self.t_peak = t_start
+        self.V_peak = 0.0
+        self.slip = None
+        self.ruptured = None
+        self.extent = None
+        self.moment = None
+
+    @property
+    def duration(self):
+        return None if self.t_end is None else self.t_end - self.t_start
+
+    def __repr__(self):
+        return 'Event({}, t_start={}, duration={}, V_peak={}, moment={})'.format(
+            self.name, self.t_start, self.duration, self.V_peak, self.moment)
+
+
+def _crossing(t0, v0, t1, v1, v):
+    """Time at which the slip rate crosses v between (t0, v0) and (t1, v1), linear in log V."""
+    if not (v0 > 0 and v1 > 0) or v0 == v1 or t0 is None:
+        return t1
+    s = (np.log(v) - np.log(v0)) / (np.log(v1) - np.log(v0))
+    return t0 + min(max(s, 0.0), 1.0) * (t1 - t0)
+
+
+class Catalog:
+    """Online event catalog for the hooks of timestep.Integrator (t, S, V, psi, tau).
+
+       An event of level i starts when max(V) rises above thresholds[i]['vthresh'] and ends
+       when it falls below again; start and end times are interpolated linearly in log(V)
+       between accepted steps. Per event, the hypocenter (element of maximum V at the
+       start), peak slip rate, slip increment, ruptured elements (V above the threshold at
+       some step), their extent, and the seismic moment per unit length
+       mu * sum(slip * element length) [N m / m] are recorded.
+
+       Memory is O(Nf) plus the finished events; with keep_slip=False the per-element
+       arrays of finished events are dropped.
+    """
+    def __init__(self, ctx, mesh, thresholds=THRESHOLDS, keep_slip=True):
+        """Constructor.
+
+        :param ctx: Context
+        :param mesh: Mesh or list of line elements of ctx
+        :param thresholds: List of {'vthresh', 'name' (optional)}, e.g. the thresholds of
+                           a Monitor; thresholds which are not positive are ignored
+        :param keep_slip: Keep slip increment and ruptured elements of finished events
+        """
+        mesh = as_mesh(mesh)
+        fault = mesh.fault_indices()
+        self.x = ctx.vp.x
+        self.length = mesh.h_norm[fault]
+        self.mu = ctx.cp.mu
+        self.thresholds = [thr for thr in thresholds if thr['vthresh'] > 0]
+        self.vthresh = np.array([thr['vthresh'] for thr in self.thresholds])
+        self.keep_slip = keep_slip
+        self.events = []
+        self.active = [None] * len(self.thresholds)
+        self._S_start = np.empty((len(self.thresholds), fault.shape[0]))
+        self._ruptured = np.zeros((len(self.thresholds), fault.shape[0]), dtype=bool)
+        self._t = None
+        self._v_max = None
+
+    def __call__(self, t, S, V, psi, tau):
+        i_max = np.argmax(V)
+        v_max = V[i_max]
+        for level, (thr, vthresh) in enumerate(zip(self.thresholds, self.vthresh)):
+            event = self.active[level]
+            if event is None and v_max > vthresh:
+                event = Event(level, thr.get('name', str(level)),
+                              _crossing(self._t, self._v_max, t, v_max, vthresh), i_max,
+                              self.x[i_max])
+                self.active[level] = event
+                self._S_start[level] = S
+                self._ruptured[level] = False
+            if event is not None:
+                if v_max > event.V_peak:
+                    event.V_peak = v_max
+                    event.t_peak = t
+                self._ruptured[level] |= V > vthresh
+                if v_max <= vthresh:
+                    event.t_end = _crossing(self._t, self._v_max, t, v_max, vthresh)
+                    self._finish(event, S)
+        self._t = t
+        self._v_max = v_max
+
+    def _finish(self, event, S):
+        level = event.level
+        slip = S - self._S_start[level]
+        ruptured = self._ruptured[level].copy()
+        event.moment = MOMENT_UNIT * self.mu * np.sum(slip * self.length)
+        if ruptured.any():
+            event.extent = (self.x[ruptured].min(axis=0), self.x[ruptured].max(axis=0))
+        if self.keep_slip:
+            event.slip = slip
+            event.ruptured = ruptured
+        self.events.append(event)
+        self.active[level] = None
+
+    def table(self, level=None):
+        """Finished events as structured array with fields level, t_start, t_end, duration,
+           hypocenter, t_peak, V_peak, moment.
+
+        :param level: Only events of this threshold level (all if None)
+        """
+        events = [e for e in self.events if level is None or e.level == level]
+        dtype = [('level', int), ('t_start', float), ('t_end', float), ('duration', float),
+                 ('hypocenter', int), ('t_peak', float), ('V_peak', float),
+                 ('moment', float)]
+        return np.array([(e.level, e.t_start, e.t_end, e.duration, e.hypocenter, e.t_peak,
+                          e.V_peak, e.moment) for e in events], dtype=dtype)
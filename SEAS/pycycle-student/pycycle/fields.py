@@ -0,0 +1,75 @@
+import numpy as np
+from scipy.interpolate import RegularGridInterpolator
+
+
+class Profile:
+    """Field which depends on one coordinate only, e.g. on depth, given by a table and
+       interpolated linearly (constant beyond the ends of the table)."""
+    def __init__(self, coords, values, axis=1):
+        """Constructor.
+
+        :param coords: Increasing coordinates of the table
+        :param values: Field values at coords
+        :param axis: Coordinate the field depends on (0 = x, 1 = z)
+        """
+        self.coords = np.asarray(coords, dtype=float)
+        self.values = np.asarray(values, dtype=float)
+        self.axis = axis
+
+    def __call__(self, x):
+        """Evaluate at points x (..., 2)."""
+        return np.interp(np.asarray(x, dtype=float)[..., self.axis], self.coords, self.values)
+
+
+class GriddedField:
+    """Field given on a rectilinear grid, interpolated with
+       scipy.interpolate.RegularGridInterpolator (extrapolated outside the grid)."""
+    def __init__(self, x, z, values, method='linear'):
+        """Constructor.
+
+        :param x: Grid coordinates along x (size nx)
+        :param z: Grid coordinates along z (size nz)
+        :param values: Field values (nx, nz)
+        :param method: Interpolation method, e.g. 'linear', 'nearest', 'cubic'
+        """
+        self.interpolator = RegularGridInterpolator((x, z), values, method=method,
+                                                    bounds_error=False, fill_value=None)
+
+    def __call__(self, x):
+        """Evaluate at points x (..., 2)."""
+        return self.interpolator(np.asarray(x, dtype=float))
+
+
+def evaluate(field, x, vectorized=None, check=3):
+    """Evaluate a parameter field at all points.
+
+       Callables are evaluated once on the whole (N, 2) array if they support it and
+       called per point (x of shape (2,)) otherwise. With vectorized=None this is detected
+       automatically: the result of the vectorized call is used if it has the right shape
+       and agrees with per-point calls on check sample points.
+
+    :param field: Constant, array of size N, or functional R^2 -> R
+    :param x: Points (N, 2)
+    :param vectorized: True to require vectorized evaluation, False for per-point calls,
+                       None to detect
+    :param check: Number of sample points for the detection
+    :return: Values (N,)
+    """
+    N = x.shape[0]
+    if not callable(field):
+        return np.broadcast_to(np.asarray(field, dtype=float), (N, )).copy()
+    if vectorized is not False and N > 0:
+        try:
+            values = np.broadcast_to(np.asarray(field(x), dtype=float), (N, )).copy()
+        except (ValueError, TypeError, IndexError):
+            if vectorized:
+                raise
+            values = None
+        if vectorized:
+            return values
+        if values is not None:
+            sample = np.unique(np.linspace(0, N - 1, check).astype(int))
+            expected = [float(field(x[i])) for i in sample]
+            if np.allclose(values[sample], expected, rtol=1e-12, atol=0.0):
+                return values
+    return np.array([field(x[i]) for i in range(N)], dtype=float)
@@ -1,30 +1,114 @@
 import numpy as np
 
+# Points are stored along the last axis; all kernels broadcast over the leading axes.
+
+_EPS = np.finfo(float).eps
+
+
+def _log(d0, d1, n):
+    return np.log(d0 * d0 + d1 * d1) / (-4 * np.pi)
+
+
+def _log_dn(d0, d1, n):
+    dn = d0 * n[..., 0] + d1 * n[..., 1]
+    out = np.zeros(np.shape(dn))
+    np.divide(dn, (d0 * d0 + d1 * d1) * (2 * np.pi), out=out, where=np.abs(dn) >= _EPS)
+    return out
+
+
+class Kernel:
+    """Batched kernel K(x, xi, n) together with the metadata assembly backends need to
+       choose quadrature rules.
+
+       The kernel is base(x - xi) for the whole space, plus base(x~ - xi) with the mirror
+       image x~ = (x_0, -x_1) if image is set. The image difference is formed component-wise,
+       i.e. x is never copied.
+    """
+    def __init__(self, base, singularity, image=False, normal=False, growth=0.0):
+        """Constructor.
+
+        :param base: Function (d0, d1, n) -> values of the whole-space kernel at x - xi = d
+        :param singularity: Type of singularity at x = xi: 'log' (weakly singular, G) or
+                            'cauchy' (1/r, only integrable as principal value, dG_dn)
+        :param image: Kernel has a second singularity at the mirror image of x
+        :param normal: Kernel depends on the normal n
+        :param growth: Coefficient c of the growth K(x, xi) ~ -c log|xi| for |xi| -> inf
+                       (0 for decaying kernels), which InfiniteLineElements have to integrate
+        """
+        self.base = base
+        self.singularity = singularity
+        self.image = image
+        self.normal = normal
+        self.growth = growth
+
+    def __call__(self, x, xi, n=None):
+        """Evaluate at targets x, sources xi, and normals n (each (..., 2), broadcast)."""
+        x = np.asarray(x, dtype=float)
+        xi = np.asarray(xi, dtype=float)
+        if self.normal:
+            n = np.asarray(n, dtype=float)
+        d0 = x[..., 0] - xi[..., 0]
+        out = self.base(d0, x[..., 1] - xi[..., 1], n)
+        if self.image:
+            out += self.base(d0, -x[..., 1] - xi[..., 1], n)
+        return out[()]
+
+    def image_term(self, x, xi, n=None):
+        """Kernel without the whole-space term base(x - xi), i.e. the part which is regular at
+           xi = x (zero without image)."""
+        x = np.asarray(x, dtype=float)
+        xi = np.asarray(xi, dtype=float)
+        if not self.image:
+            return np.zeros(np.broadcast_shapes(x.shape, xi.shape)[:-1])[()]
+        if self.normal:
+            n = np.asarray(n, dtype=float)
+        return self.base(x[..., 0] - xi[..., 0], -x[..., 1] - xi[..., 1], n)[()]
+
+    def singular_points(self, x):
+        """Points (k, ..., 2) at which K(x, ., n) is singular, i.e. x and its mirror image."""
+        x = np.asarray(x, dtype=float)
+        if not self.image:
+            return x[np.newaxis]
+        return np.stack((x, x * [1.0, -1.0]))
+
+    def __repr__(self):
+        return 'Kernel({}, singularity={}, image={})'.format(self.base.__name__,
+                                                             self.singularity, self.image)
+
+
+_G = Kernel(_log, 'log', growth=1 / (2 * np.pi))
+_dG_dn = Kernel(_log_dn, 'cauchy', normal=True)
+_G_fs = Kernel(_log, 'log', image=True, growth=1 / np.pi)
+_dG_fs_dn = Kernel(_log_dn, 'cauchy', image=True, normal=True)
+
 
 def G(x, xi):
     """Fundamental solution (homogeneous whole-space). """
-    return -np.log(np.linalg.norm(x - xi)) / (2 * np.pi)
+    return _G(x, xi)
 
 
 def dG_dn(x, xi, n):
     """Directional derivative of fundamental solution. """
-    d = x - xi
-    eps = np.finfo(d.dtype).eps
-    if np.abs(np.inner(d, n)) < eps:
-        return 0
-    else:
-        return np.inner(d, n) / (np.inner(d, d) * 2 * np.pi)
+    return _dG_dn(x, xi, n)
 
 
 def G_fs(x, xi):
     """Green's function for half-space with free surface."""
-    x_tilde = x.copy()
-    x_tilde[1] = -x_tilde[1]
-    return G(x, xi) + G(x_tilde, xi)
+    return _G_fs(x, xi)
 
 
 def dG_fs_dn(x, xi, n):
     """Directional derivative of G_fs."""
-    x_tilde = x.copy()
-    x_tilde[1] = -x_tilde[1]
-    return dG_dn(x, xi, n) + dG_dn(x_tilde, xi, n)
+    return _dG_fs_dn(x, xi, n)
+
+
+_kernels = {G: _G, dG_dn: _dG_dn, G_fs: _G_fs, dG_fs_dn: _dG_fs_dn}
+
+
+def kernel(K):
+    """Batched kernel with metadata of Green's function K (one of the functions above), or
+       None if K is unknown. Kernel instances are returned unchanged.
+    """
+    if isinstance(K, Kernel):
+        return K
+    return _kernels.get(K)
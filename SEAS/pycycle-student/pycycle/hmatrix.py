@@ -0,0 +1,266 @@
+import numpy as np
+from scipy.sparse import csc_matrix
+from scipy.sparse.linalg import LinearOperator, gmres, splu
+from .mesh import as_mesh
+
+
+def support_boxes(mesh):
+    """Bounding boxes of the element supports.
+
+    :param mesh: Mesh or list of line elements
+    :return: lower, upper (M, 2); InfiniteLineElements extend to +-inf
+    """
+    mesh = as_mesh(mesh)
+    line = mesh.line[:, np.newaxis]
+    a, b = mesh.a, mesh.a + mesh.h
+    lower = np.where(line, np.minimum(a, b), np.where(a < 0, -np.inf, a))
+    upper = np.where(line, np.maximum(a, b), np.where(a > 0, np.inf, a))
+    return lower, upper
+
+
+class Cluster:
+    """Node of a cluster tree, i.e. the index range [start, stop) in tree ordering."""
+    def __init__(self, start, stop, row_box, col_box, children=()):
+        """Constructor.
+
+        :param start: First index (tree ordering)
+        :param stop: One past the last index (tree ordering)
+        :param row_box: Bounding box (lower, upper) of the collocation points
+        :param col_box: Bounding box (lower, upper) of the element supports
+        :param children: Sub-clusters
+        """
+        self.start = start
+        self.stop = stop
+        self.row_box = row_box
+        self.col_box = col_box
+        self.children = children
+
+    def __len__(self):
+        return self.stop - self.start
+
+    @property
+    def slice(self):
+        return slice(self.start, self.stop)
+
+
+class ClusterTree:
+    """Binary cluster tree obtained by recursively bisecting the collocation points along
+       the longest edge of their bounding box."""
+    def __init__(self, points, lower, upper, leaf_size=32):
+        """Constructor.
+
+        :param points: Collocation points (M, 2)
+        :param lower: Lower corners of element supports (M, 2)
+        :param upper: Upper corners of element supports (M, 2)
+        :param leaf_size: Maximum cluster size of leaves
+        """
+        self.perm = np.arange(points.shape[0])
+        self.points = points
+        self.lower = lower
+        self.upper = upper
+        self.leaf_size = leaf_size
+        self.root = self._build(0, points.shape[0])
+
+    def _build(self, start, stop):
+        idx = self.perm[start:stop]
+        p = self.points[idx]
+        row_box = (p.min(axis=0), p.max(axis=0))
+        col_box = (self.lower[idx].min(axis=0), self.upper[idx].max(axis=0))
+        if stop - start <= self.leaf_size:
+            return Cluster(start, stop, row_box, col_box)
+        dim = np.argmax(row_box[1] - row_box[0])
+        self.perm[start:stop] = idx[np.argsort(p[:, dim], kind='stable')]
+        mid = (start + stop) // 2
+        children = (self._build(start, mid), self._build(mid, stop))
+        return Cluster(start, stop, row_box, col_box, children)
+
+
+def _diameter(box):
+    return np.linalg.norm(box[1] - box[0])
+
+
+def _distance(box1, box2):
+    gap = np.maximum(0.0, np.maximum(box2[0] - box1[1], box1[0] - box2[1]))
+    return np.linalg.norm(gap)
+
+
+def aca(row, col, m, n, tol, max_rank):
+    """Adaptive cross approximation with partial pivoting.
+
+    :param row: Function i -> i-th row of the block (size n)
+    :param col: Function j -> j-th column of the block (size m)
+    :param m: Number of rows
+    :param n: Number of columns
+    :param tol: Relative tolerance (Frobenius norm)
+    :param max_rank: Maximum rank
+    :return: U (m, k), V (k, n), converged flag
+    """
+    U = np.zeros((m, max_rank))
+    V = np.zeros((max_rank, n))
+    used = np.zeros(m, dtype=bool)
+    norm2 = 0.0
+    k = 0
+    i = 0
+    while k < max_rank:
+        used[i] = True
+        r = row(i) - U[i, :k] @ V[:k]
+        j = np.argmax(np.abs(r))
+        if r[j] != 0:
+            v = r / r[j]
+            u = col(j) - U[:, :k] @ V[:k, j]
+            norm2 += 2.0 * np.sum((U[:, :k].T @ u) * (V[:k] @ v)) + (u @ u) * (v @ v)
+            U[:, k] = u
+            V[k] = v
+            k += 1
+            if np.linalg.norm(u) * np.linalg.norm(v) <= tol * np.sqrt(abs(norm2)):
+                return U[:, :k], V[:k], True
+        if np.all(used):
+            return U[:, :k], V[:k], True
+        score = np.abs(U[:, k - 1]) if k > 0 else np.zeros(m)
+        score[used] = -1
+        i = np.argmax(score)
+    return U[:, :k], V[:k], False
+
+
+def recompress(U, V, tol):
+    """Truncate low-rank factors U @ V by QR and SVD to the rank required by tol."""
+    if U.shape[1] == 0:
+        return U, V
+    Qu, Ru = np.linalg.qr(U)
+    Qv, Rv = np.linalg.qr(V.T)
+    W, s, Zt = np.linalg.svd(Ru @ Rv.T)
+    k = max(1, np.count_nonzero(s > tol * s[0]))
+    return Qu @ (W[:, :k] * s[:k]), Zt[:k] @ Qv.T
+
+
+class HMatrix:
+    """Hierarchical matrix. Admissible blocks of the block cluster tree, i.e. blocks with
+       min(diam(rows), diam(cols)) <= eta dist(rows, cols), are stored in low-rank form
+       U @ V obtained by ACA, all other blocks are stored dense.
+    """
+    def __init__(self, entries, tree, tol=1e-6, eta=2.0):
+        """Constructor.
+
+        :param entries: Function (rows, cols) -> dense block for index arrays rows, cols
+        :param tree: ClusterTree
+        :param tol: Relative tolerance of the low-rank approximation
+        :param eta: Admissibility parameter
+        """
+        M = tree.perm.shape[0]
+        self.shape = (M, M)
+        self.perm = tree.perm
+        self.tol = tol
+        self.eta = eta
+        self.dense = []
+        self.lowrank = []
+        self._entries = entries
+        self._lu = None
+        self._build(tree.root, tree.root)
+        del self._entries
+
+    def _build(self, s, t):
+        if min(_diameter(s.row_box), _diameter(t.col_box)) <= self.eta * _distance(
+                s.row_box, t.col_box):
+            rows = self.perm[s.slice]
+            cols = self.perm[t.slice]
+            m, n = len(s), len(t)
+            U, V, converged = aca(lambda i: self._entries(rows[i:i + 1], cols)[0],
+                                  lambda j: self._entries(rows, cols[j:j + 1])[:, 0], m, n,
+                                  self.tol, max(1, min(m, n) // 2))
+            if converged:
+                U, V = recompress(U, V, self.tol)
+                self.lowrank.append((s.slice, t.slice, U, V))
+                return
+        if not s.children or not t.children:
+            self.dense.append(
+                (s.slice, t.slice, self._entries(self.perm[s.slice], self.perm[t.slice])))
+            return
+        for sc in s.children:
+            for tc in t.children:
+                self._build(sc, tc)
+
+    @property
+    def nbytes(self):
+        """Memory of the stored blocks in bytes."""
+        return sum(D.nbytes for _, _, D in self.dense) + sum(
+            U.nbytes + V.nbytes for _, _, U, V in self.lowrank)
+
+    @property
+    def compression(self):
+        """Ratio of stored to dense memory."""
+        return self.nbytes / (self.shape[0] * self.shape[1] * 8)
+
+    def matvec(self, x):
+        """Compute self @ x for x of shape (M,) or (M, k)."""
+        xp = np.asarray(x)[self.perm]
+        yp = np.zeros(xp.shape)
+        for rs, cs, D in self.dense:
+            yp[rs] += D @ xp[cs]
+        for rs, cs, U, V in self.lowrank:
+            yp[rs] += U @ (V @ xp[cs])
+        y = np.empty(yp.shape)
+        y[self.perm] = yp
+        return y
+
+    __matmul__ = matvec
+
+    def to_dense(self):
+        """Expand to a dense array (for testing)."""
+        return self.matvec(np.eye(self.shape[1]))
+
+    def nearfield(self):
+        """Sparse matrix of the dense blocks (original ordering)."""
+        rows, cols, vals = [], [], []
+        for rs, cs, D in self.dense:
+            r, c = np.meshgrid(self.perm[rs], self.perm[cs], indexing='ij')
+            rows.append(r.ravel())
+            cols.append(c.ravel())
+            vals.append(D.ravel())
+        return csc_matrix((np.concatenate(vals), (np.concatenate(rows), np.concatenate(cols))),
+                          shape=self.shape)
+
+    def factorize(self):
+        """Approximate factorization: sparse LU of the near field, which is used as
+           preconditioner in solve."""
+        self._lu = splu(self.nearfield())
+
+    def preconditioner(self):
+        """Near-field LU solve as LinearOperator (factorizes on first use)."""
+        if self._lu is None:
+            self.factorize()
+        return LinearOperator(self.shape, matvec=self._lu.solve)
+
+    def solve(self, b, tol=None, maxiter=None):
+        """Solve self @ x = b with GMRES, preconditioned by the near-field LU.
+
+        :param b: Right-hand side (M,) or (M, k)
+        :param tol: Relative residual tolerance (self.tol if None)
+        :param maxiter: Maximum number of GMRES restarts
+        """
+        b = np.asarray(b)
+        if b.ndim == 2:
+            return np.stack([self.solve(b[:, k], tol, maxiter) for k in range(b.shape[1])],
+                            axis=1)
+        A = LinearOperator(self.shape, matvec=self.matvec)
+        x, info = gmres(A, b, rtol=self.tol if tol is None else tol, atol=0.0,
+                        M=self.preconditioner(),
+                        maxiter=maxiter)
+        if info != 0:
+            raise RuntimeError('GMRES did not converge (info = {})'.format(info))
+        return x
+
+
+def build(entries, mesh, tol=1e-6, eta=2.0, leaf_size=32):
+    """Build an H-matrix approximation of a BEM operator.
+
+    :param entries: Function (rows, cols) -> dense block, e.g.
+                    lambda r, c: bem.assemble(G, mesh, 'gauss', rows=r, cols=c)
+    :param mesh: Mesh or list of line elements
+    :param tol: Relative tolerance of the low-rank blocks
+    :param eta: Admissibility parameter
+    :param leaf_size: Maximum cluster size of leaves
+    """
+    mesh = as_mesh(mesh)
+    points = mesh.collocation_points()
+    tree = ClusterTree(points, *support_boxes(mesh), leaf_size=leaf_size)
+    return HMatrix(entries, tree, tol, eta)
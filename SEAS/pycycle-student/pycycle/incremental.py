@@ -0,0 +1,148 @@
+import numpy as np
+from scipy.linalg import lu_factor, lu_solve
+from .mesh import as_mesh
+
+
+def _keys(mesh):
+    """Geometry of every element (kind, a, h, n) as bytes."""
+    rows = np.column_stack((mesh.kind, mesh.a, mesh.h, mesh.n)).astype(float) + 0.0
+    return [row.tobytes() for row in rows]
+
+
+class MeshDiff:
+    """Correspondence of the elements of an old and a new mesh.
+
+       Elements are matched if their kind, start point, extent, and normal are equal
+       (bitwise), i.e. elements which were appended, removed, or replaced (e.g. by a local
+       refinement) are detected as long as the unchanged parts of the mesh are tessellated
+       in the same way. Fault flags are ignored, as they do not enter A and B.
+    """
+    def __init__(self, old, new):
+        """Constructor.
+
+        :param old: Old mesh or list of line elements
+        :param new: New mesh or list of line elements
+        """
+        old = as_mesh(old)
+        new = as_mesh(new)
+        index = {}
+        for i, key in enumerate(_keys(old)):
+            index.setdefault(key, i)
+        self.match = np.array([index.pop(key, -1) for key in _keys(new)], dtype=int)
+        self.kept = np.flatnonzero(self.match >= 0)
+        self.added = np.flatnonzero(self.match < 0)
+        removed = np.ones(len(old), dtype=bool)
+        removed[self.match[self.kept]] = False
+        self.removed = np.flatnonzero(removed)
+        self.old_size = len(old)
+        self.new_size = len(new)
+
+    @property
+    def rank(self):
+        """Rank of the change of the operator seen by UpdatedSolver."""
+        return 2 * self.removed.shape[0] + self.added.shape[0]
+
+    def __repr__(self):
+        return 'MeshDiff(kept={}, added={}, removed={})'.format(
+            self.kept.shape[0], self.added.shape[0], self.removed.shape[0])
+
+
+def update_operator(A, diff, entries):
+    """BEM operator of the new mesh from operator A of the old mesh.
+
+       Entries of kept (row, column) element pairs are copied from A, as they only depend on
+       the collocation point of the row element and on the column element; only rows and
+       columns of added elements are assembled, i.e. O(M k) instead of O(M^2) entries for k
+       added elements.
+
+    :param A: Operator of the old mesh (M_old x M_old)
+    :param diff: MeshDiff of the old and the new mesh
+    :param entries: Function (rows, cols) -> dense block of the new mesh (cols None: all), e.g.
+                    lambda r, c: bem.assemble(G, new, 'gauss', rows=r, cols=c)
+    :return: Operator of the new mesh (M_new x M_new)
+    """
+    kept, added = diff.kept, diff.added
+    old = diff.match[kept]
+    A_new = np.empty((diff.new_size, diff.new_size))
+    A_new[np.ix_(kept, kept)] = A[np.ix_(old, old)]
+    if added.shape[0] > 0:
+        A_new[added] = entries(added, None)
+        A_new[np.ix_(kept, added)] = entries(kept, added)
+    return A_new
+
+
+class UpdatedSolver:
+    """Solver of A_new x = b which updates a solver of the old operator A instead of
+       factorizing A_new.
+
+       Removed elements are handled by the Woodbury identity: A with the rows and columns of
+       the r removed elements replaced by the identity is a rank-2r update of A, whose
+       restriction to the kept elements is the kept block A11 of A_new. Added elements are
+       handled by blocks: with A12, A21, A22 the blocks of the k added elements, the Schur
+       complement S = A22 - A21 A11^{-1} A12 is factorized. Setup costs 2r + k solves with A
+       and one LU of size k; a solve costs one solve with A plus O(M (2r + k)). Updated
+       solvers can be updated again.
+    """
+    def __init__(self, solve, A, A_new, diff):
+        """Constructor.
+
+        :param solve: Solver of A x = b for b (M_old,) or (M_old, m), e.g.
+                      functools.partial(lu_solve, (lu, piv)) or UpdatedSolver.solve
+        :param A: Operator of the old mesh
+        :param A_new: Operator of the new mesh (see update_operator)
+        :param diff: MeshDiff of the old and the new mesh
+        """
+        self._solve = solve
+        self.M_old = diff.old_size
+        self.old = diff.match[diff.kept]
+        self.kept = diff.kept
+        self.added = diff.added
+        self.removed = diff.removed
+
+        R = self.removed
+        r = R.shape[0]
+        if r > 0:
+            U = np.zeros((self.M_old, 2 * r))
+            U[R, np.arange(r)] = 1.0
+            U[:, r:] = -A[:, R]
+            U[R, r:] = 0.0
+            self.Z = solve(U)
+            C = np.eye(2 * r)
+            C[:r] += self.Z[R] - U[R]
+            C[r:] += self.Z[R]
+            self.C = lu_factor(C)
+
+        if self.added.shape[0] > 0:
+            A12 = A_new[np.ix_(self.kept, self.added)]
+            self.A21 = A_new[np.ix_(self.added, self.kept)]
+            self.Y = self._solve_kept(A12)
+            self.S = lu_factor(A_new[np.ix_(self.added, self.added)] - self.A21 @ self.Y)
+
+    def _solve_kept(self, b):
+        """Solve A11 x = b, where A11 is the block of A_new of the kept elements."""
+        z = np.zeros((self.M_old, ) + b.shape[1:])
+        z[self.old] = b
+        y = self._solve(z)
+        R = self.removed
+        if R.shape[0] > 0:
+            w = np.concatenate((y[R] - z[R], y[R]))
+            y = y - self.Z @ lu_solve(self.C, w)
+        return y[self.old]
+
+    def solve(self, b, x0=None):
+        """Solve A_new x = b.
+
+        :param b: Right-hand side (M_new,) or (M_new, m)
+        :param x0: Ignored (interface of krylov.KrylovSolver)
+        """
+        b = np.asarray(b, dtype=float)
+        y1 = self._solve_kept(b[self.kept])
+        if self.added.shape[0] == 0:
+            x = np.empty(b.shape)
+            x[self.kept] = y1
+            return x
+        x2 = lu_solve(self.S, b[self.added] - self.A21 @ y1)
+        x = np.empty(b.shape)
+        x[self.kept] = y1 - self.Y @ x2
+        x[self.added] = x2
+        return x
@@ -0,0 +1,179 @@
+import numpy as np
+from scipy.linalg import lu_factor, lu_solve
+from scipy.sparse.linalg import LinearOperator, bicgstab, gmres
+from .mesh import as_mesh
+
+
+def partition(mesh, block_size=64):
+    """Split the element indices into contiguous blocks of at most block_size elements
+       which never mix fault and non-fault elements.
+
+    :param mesh: Mesh or list of line elements
+    :param block_size: Maximum number of elements per block
+    :return: List of index arrays
+    """
+    fault = as_mesh(mesh).is_fault
+    blocks = []
+    for indices in (np.flatnonzero(fault), np.flatnonzero(~fault)):
+        blocks += [indices[i:i + block_size] for i in range(0, indices.shape[0], block_size)]
+    return blocks
+
+
+class BlockJacobi:
+    """Block-Jacobi preconditioner, i.e. the inverse of the block diagonal of A."""
+    def __init__(self, entries, blocks, shape):
+        """Constructor.
+
+        :param entries: Function (rows, cols) -> dense block of A
+        :param blocks: List of disjoint index arrays covering all rows (see partition)
+        :param shape: Shape of A
+        """
+        self.blocks = blocks
+        self.shape = shape
+        self.lu = [lu_factor(entries(b, b)) for b in blocks]
+
+    @property
+    def nbytes(self):
+        """Memory of the LU factors in bytes."""
+        return sum(lu.nbytes + piv.nbytes for lu, piv in self.lu)
+
+    def solve(self, x):
+        """Apply the preconditioner to x of shape (N,) or (N, k)."""
+        y = np.empty(np.shape(x))
+        for b, lu in zip(self.blocks, self.lu):
+            y[b] = lu_solve(lu, x[b])
+        return y
+
+    def aslinearoperator(self):
+        return LinearOperator(self.shape, matvec=self.solve)
+
+
+def aggregate(blocks, size=8):
+    """Split the blocks of partition into aggregates of at most size elements.
+
+    :param blocks: List of index arrays
+    :param size: Maximum number of elements per aggregate
+    :return: Aggregate number of every element
+    """
+    N = sum(b.shape[0] for b in blocks)
+    agg = np.empty(N, dtype=int)
+    k = 0
+    for b in blocks:
+        for i in range(0, b.shape[0], size):
+            agg[b[i:i + size]] = k
+            k += 1
+    return agg
+
+
+class TwoLevel:
+    """Two-level preconditioner with a coarse-mesh LU correction followed by a
+       block-Jacobi step, i.e. y = R A_c^{-1} R^T x and y <- y + BJ (x - A y), where R is
+       piecewise constant on aggregates of elements and A_c = R^T A R.
+    """
+    def __init__(self, A, smoother, agg, chunk_size=64):
+        """Constructor.
+
+        :param A: Operator (N x N) supporting A @ X for X of shape (N, k)
+        :param smoother: BlockJacobi
+        :param agg: Aggregate number of every element (see aggregate)
+        :param chunk_size: Number of columns of A R computed at once
+        """
+        self.A = A
+        self.shape = A.shape
+        self.smoother = smoother
+        self.agg = agg
+        nc = agg.max() + 1
+        self.nc = nc
+        Ac = np.empty((nc, nc))
+        for start in range(0, nc, chunk_size):
+            stop = min(start + chunk_size, nc)
+            R = (agg[:, np.newaxis] == np.arange(start, stop)).astype(float)
+            Ac[:, start:stop] = self.restrict(A @ R)
+        self.lu = lu_factor(Ac)
+
+    @property
+    def nbytes(self):
+        """Memory of the LU factors in bytes."""
+        return self.smoother.nbytes + self.lu[0].nbytes + self.lu[1].nbytes
+
+    def restrict(self, x):
+        """Compute R^T x."""
+        y = np.zeros((self.nc, ) + np.shape(x)[1:])
+        np.add.at(y, self.agg, x)
+        return y
+
+    def solve(self, x):
+        """Apply the preconditioner to x of shape (N,)."""
+        y = lu_solve(self.lu, self.restrict(x))[self.agg]
+        return y + self.smoother.solve(x - self.A @ y)
+
+    def aslinearoperator(self):
+        return LinearOperator(self.shape, matvec=self.solve)
+
+
+class KrylovSolver:
+    """Iterative solver for A x = b with a preconditioner which is built once and reused
+       for every right-hand side. Diagnostics of the last solve are kept in iterations
+       and residual, the totals over all solves in nsolves and total_iterations.
+    """
+    def __init__(self, A, M=None, method='gmres', tol=1e-10, maxiter=None, restart=None):
+        """Constructor.
+
+        :param A: Operator (N x N) supporting A @ x, e.g. ndarray, HMatrix, LinearOperator
+        :param M: Preconditioner (approximation of A^{-1}) as LinearOperator or None
+        :param method: 'gmres' or 'bicgstab'
+        :param tol: Relative residual tolerance
+        :param maxiter: Maximum number of iterations (GMRES: restarts)
+        :param restart: Krylov subspace dimension between GMRES restarts
+        """
+        if method not in ('gmres', 'bicgstab'):
+            raise ValueError('Unknown Krylov method: {}'.format(method))
+        self.A = A
+        self.shape = A.shape
+        self.M = M
+        self.method = method
+        self.tol = tol
+        self.maxiter = maxiter
+        self.restart = restart
+        self.iterations = 0
+        self.residual = 0.0
+        self.nsolves = 0
+        self.total_iterations = 0
+
+    def solve(self, b, x0=None):
+        """Solve A x = b.
+
+        :param b: Right-hand side (N,) or (N, k)
+        :param x0: Initial guess of the same shape as b (zero if None)
+        """
+        b = np.asarray(b, dtype=float)
+        if b.ndim == 2:
+            return np.stack([
+                self.solve(b[:, k], None if x0 is None else x0[:, k])
+                for k in range(b.shape[1])
+            ], axis=1)
+        A = LinearOperator(self.shape, matvec=lambda x: self.A @ x)
+        iterations = [0]
+
+        def count(*args):
+            iterations[0] += 1
+
+        if self.method == 'gmres':
+            x, info = gmres(A, b, x0=x0, rtol=self.tol, atol=0.0, restart=self.restart,
+                            maxiter=self.maxiter, M=self.M, callback=count,
+                            callback_type='pr_norm')
+        else:
+            x, info = bicgstab(A, b, x0=x0, rtol=self.tol, atol=0.0, maxiter=self.maxiter,
+                               M=self.M, callback=count)
+        if info != 0:
+            raise RuntimeError('{} did not converge (info = {})'.format(self.method, info))
+        norm_b = np.linalg.norm(b)
+        self.iterations = iterations[0]
+        self.residual = np.linalg.norm(b - A @ x) / norm_b if norm_b > 0 else 0.0
+        self.nsolves += 1
+        self.total_iterations += self.iterations
+        return x
+
+    def __repr__(self):
+        return 'KrylovSolver(method={}, iterations={}, residual={}, nsolves={})'.format(
+            self.method, self.iterations, self.residual, self.nsolves)
@@ -1,7 +1,20 @@
 import numpy as np
 
 
-class LineElement:
+class _Element:
+    """Base of the element classes. Elements returned by Mesh[i] are bound to the mesh:
+       assigning an attribute (e.g. e.is_fault = True) writes the element back, like
+       changing an element of a list would. Their arrays are read-only copies, i.e. in-place
+       changes (e.a[0] = 1) raise instead of being lost.
+    """
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, value)
+        mesh = self.__dict__.get('_mesh')
+        if mesh is not None:
+            mesh[self._index] = self
+
+
+class LineElement(_Element):
     """LineElement represents a finite arc in the discretization of the domain boundary."""
     def __init__(self, a, b, n, is_fault):
         """Constructor.
@@ -21,10 +34,12 @@ class LineElement:
     def xi(self, theta):
         """Map from interval [-1, 1] to line a-b.
 
-        :param theta: Scalar in [-1, 1].
+        :param theta: Scalar in [-1, 1] (or array of scalars, then points are stacked along
+                      the last axis).
         """
         # TODO: implement - DONE
         #return np.array([0.0, 0.0])
+        theta = np.asarray(theta)[..., np.newaxis]
         return self.h * (theta + 1) / 2 + self.a
 
     def basis(self, theta):
@@ -56,7 +71,7 @@ class LineElement:
         return 'LineElement({}, {})'.format(self.a, self.a + self.h)
 
 
-class InfiniteLineElement:
+class InfiniteLineElement(_Element):
     """InfiniteLineElement represents an infinite arc in the discretization of the domain boundary."""
     def __init__(self, a, n):
         """Constructor.
@@ -74,11 +89,12 @@ class InfiniteLineElement:
     def xi(self, theta):
         """Map from interval [-1, 1] to line starting at "a" with direction "a" extending to infinity.
 
-        :param theta: Scalar in [-1, 1].
+        :param theta: Scalar in [-1, 1] (or array of scalars, then points are stacked along
+                      the last axis).
         """
         # TODO: implement - DONE
         #return np.array([0.0, 0.0])
-        
+        theta = np.asarray(theta, dtype=float)[..., np.newaxis]
         return self.a*(theta+3)/(1-theta)
         # Why does the following not work?
         #constant p(theta)
@@ -119,6 +135,201 @@ class InfiniteLineElement:
         return 'InfiniteLineElement({})'.format(self.a)
 
 
+# Element kinds of Mesh
+LINE = 0
+INFINITE = 1
+
+
+class Mesh:
+    """Mesh stored as contiguous arrays (struct of arrays).
+
+       Element i starts at a[i]. For LineElements (kind LINE) it extends by h[i]; for
+       InfiniteLineElements (kind INFINITE) h[i] is zero and the element extends from a[i]
+       to infinity in direction a[i]. Indexing with an integer returns the element object,
+       indexing with a slice, index or boolean array returns a new Mesh (a copy, as for lists).
+
+       Meshes replace the lists of elements used before (e.g. as returned by
+       tessellate_line) and support the list operations append, extend, insert, pop, del,
+       and +=, all in place. Elements obtained by indexing or iteration are copies which
+       write attribute assignments back (mesh[i].is_fault = True changes the mesh), but
+       their arrays are read-only; change the arrays of the mesh (e.g. mesh.n[i]) instead.
+    """
+    def __init__(self, a=None, h=None, n=None, kind=None, is_fault=None):
+        """Constructor.
+
+        :param a: Start points (M, 2)
+        :param h: Extents (M, 2), zero for infinite elements
+        :param n: Unit outward-pointing normals (M, 2)
+        :param kind: LINE or INFINITE per element (M,)
+        :param is_fault: Fault flags (M,)
+        """
+        self.a = np.zeros((0, 2)) if a is None else np.asarray(a, dtype=float).reshape(-1, 2)
+        M = self.a.shape[0]
+        self.h = np.zeros((M, 2)) if h is None else np.asarray(h, dtype=float).reshape(-1, 2)
+        self.n = np.zeros((M, 2)) if n is None else np.asarray(n, dtype=float).reshape(-1, 2)
+        self.kind = np.full(M, LINE, dtype=np.int8) if kind is None else np.asarray(
+            kind, dtype=np.int8).reshape(-1)
+        self.is_fault = np.zeros(M, dtype=bool) if is_fault is None else np.asarray(
+            is_fault, dtype=bool).reshape(-1)
+
+    @classmethod
+    def from_elements(cls, elements):
+        """Convert a list of LineElements and InfiniteLineElements."""
+        M = len(elements)
+        mesh = cls(np.empty((M, 2)), np.zeros((M, 2)), np.empty((M, 2)),
+                   np.empty(M, dtype=np.int8), np.empty(M, dtype=bool))
+        for i, e in enumerate(elements):
+            mesh[i] = e
+        return mesh
+
+    @property
+    def line(self):
+        """Mask of LineElements."""
+        return self.kind == LINE
+
+    @property
+    def h_norm(self):
+        """Element lengths (zero for infinite elements)."""
+        return np.linalg.norm(self.h, axis=-1)
+
+    @property
+    def a_norm(self):
+        return np.linalg.norm(self.a, axis=-1)
+
+    @property
+    def nbytes(self):
+        return self.a.nbytes + self.h.nbytes + self.n.nbytes + self.kind.nbytes + \
+            self.is_fault.nbytes
+
+    def __len__(self):
+        return self.a.shape[0]
+
+    def _index(self, i):
+        if not -len(self) <= i < len(self):
+            raise IndexError('Element index {} out of range'.format(i))
+        return int(i) % len(self)
+
+    def _element(self, i, item=True):
+        """Element i as object; with item, assignments are written back (see _Element)."""
+        i = self._index(i)
+        if self.kind[i] == INFINITE:
+            e = InfiniteLineElement(self.a[i], self.n[i])
+        else:
+            e = LineElement(self.a[i], self.a[i] + self.h[i], self.n[i], bool(self.is_fault[i]))
+            e.h = self.h[i].copy()
+            e.h_norm = np.linalg.norm(e.h)
+        e.n = self.n[i].copy()
+        if item:
+            for array in (e.a, e.n) + ((e.h, ) if self.kind[i] == LINE else ()):
+                array.flags.writeable = False
+            object.__setattr__(e, '_mesh', self)
+            object.__setattr__(e, '_index', i)
+        return e
+
+    def __getitem__(self, i):
+        if isinstance(i, (int, np.integer)):
+            return self._element(i)
+        return Mesh(*(np.array(x[i]) for x in (self.a, self.h, self.n, self.kind, self.is_fault)))
+
+    def __setitem__(self, i, e):
+        self.a[i] = e.a
+        self.n[i] = e.n
+        self.is_fault[i] = e.is_fault
+        if isinstance(e, InfiniteLineElement):
+            self.kind[i] = INFINITE
+            self.h[i] = 0.0
+        else:
+            self.kind[i] = LINE
+            self.h[i] = e.h
+
+    def __iter__(self):
+        return (self._element(i) for i in range(len(self)))
+
+    def __add__(self, other):
+        other = as_mesh(other)
+        return Mesh(np.concatenate((self.a, other.a)), np.concatenate((self.h, other.h)),
+                    np.concatenate((self.n, other.n)), np.concatenate((self.kind, other.kind)),
+                    np.concatenate((self.is_fault, other.is_fault)))
+
+    def __radd__(self, other):
+        return as_mesh(other) + self
+
+    def __iadd__(self, other):
+        self.extend(other)
+        return self
+
+    def __delitem__(self, i):
+        keep = np.ones(len(self), dtype=bool)
+        keep[i] = False
+        self._assign(self[keep])
+
+    def _assign(self, m):
+        self.a, self.h, self.n, self.kind, self.is_fault = m.a, m.h, m.n, m.kind, m.is_fault
+
+    def append(self, e):
+        """Append a single element."""
+        self._assign(self + [e])
+
+    def extend(self, elements):
+        """Append elements (list or Mesh)."""
+        self._assign(self + elements)
+
+    def insert(self, i, e):
+        """Insert element e before index i."""
+        i = min(max(i + len(self) if i < 0 else i, 0), len(self))
+        self._assign(self[:i] + [e] + self[i:])
+
+    def pop(self, i=-1):
+        """Remove element i and return it (detached from the mesh)."""
+        e = self._element(i, item=False)
+        del self[self._index(i)]
+        return e
+
+    def xi(self, theta):
+        """Map from [-1, 1] to all elements (see LineElement.xi, InfiniteLineElement.xi).
+
+        :param theta: Array of parameters (T,)
+        :return: Points (M, T, 2)
+        """
+        theta = np.asarray(theta, dtype=float).reshape(-1)[:, np.newaxis]
+        X = np.empty((len(self), theta.shape[0], 2))
+        line = self.line
+        X[line] = self.h[line, np.newaxis] * (theta + 1) / 2 + self.a[line, np.newaxis]
+        X[~line] = self.a[~line, np.newaxis] * (theta + 3) / (1 - theta)
+        return X
+
+    def factor(self, theta):
+        """Integration factors of all elements (see LineElement.factor,
+           InfiniteLineElement.factor).
+
+        :param theta: Array of parameters (T,)
+        :return: Factors (M, T)
+        """
+        theta = np.asarray(theta, dtype=float).reshape(-1)
+        W = np.empty((len(self), theta.shape[0]))
+        line = self.line
+        W[line] = (self.h_norm[line] / 2)[:, np.newaxis]
+        bas = (1 - theta)**2 / (theta + 3)**2
+        W[~line] = np.outer(self.a_norm[~line], bas * 4 / (theta - 1)**2)
+        return W
+
+    def collocation_points(self):
+        """Midpoints of LineElements and start points of InfiniteLineElements (M, 2)."""
+        return np.where(self.line[:, np.newaxis], self.h / 2 + self.a, self.a)
+
+    def fault_indices(self):
+        """Mesh indices of the fault elements."""
+        return np.flatnonzero(self.is_fault)
+
+
+def as_mesh(mesh):
+    """Return mesh as Mesh; lists of elements are converted.
+
+    :param mesh: Mesh or list of line elements
+    """
+    return mesh if isinstance(mesh, Mesh) else Mesh.from_elements(list(mesh))
+
+
 def tessellate_line(a, b, resolution, normal, is_fault=False):
     """Tessellate the line from a to b into small arcs, such that
        the arc length is smaller than resolution.
@@ -128,26 +339,26 @@ def tessellate_line(a, b, resolution, normal, is_fault=False):
     :param resolution: Target arc length
     :param normal: Outward-pointing normal
     :param is_fault: Flag all line elements as fault
+    :return: Mesh (formerly a list of LineElements; see Mesh for the list operations)
     """
-    origin = np.array(a)
-    h = np.array(b) - origin
+    origin = np.array(a, dtype=float)
+    h = np.array(b, dtype=float) - origin
     N = int(np.ceil(np.linalg.norm(h) / resolution))
-    return [
-        LineElement(origin + n / N * h, origin + (n + 1) / N * h, normal,
-                    is_fault) for n in range(N)
-    ]
+    n = np.arange(N)[:, np.newaxis]
+    start = origin + n / N * h
+    end = origin + (n + 1) / N * h
+    normal = np.array(normal, dtype=float)
+    normal = normal / np.linalg.norm(normal)
+    return Mesh(start, end - start, np.tile(normal, (N, 1)), np.full(N, LINE),
+                np.full(N, is_fault))
 
 
 def num_fault_elements(mesh):
     """Counts number of fault elements in mesh.
 
-    :param mesh: List of LineElements.
+    :param mesh: Mesh or list of line elements.
     """
-    count = 0
-    for m in mesh:
-        if m.is_fault:
-            count = count + 1
-    return count
+    return int(np.count_nonzero(as_mesh(mesh).is_fault))
 
 
 def line_normal(a, b, star_centre):
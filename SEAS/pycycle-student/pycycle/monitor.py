@@ -1,78 +1,285 @@
+import threading
+import time
 import numpy as np
-from scipy.integrate import quad
 
-def print_time(t):
-    ms    =  round(1000*t)
-    y, ms = divmod(ms, 1000*60*60*24*365)
-    d, ms = divmod(ms, 1000*60*60*24)
-    h, ms = divmod(ms, 1000*60*60)
-    m, ms = divmod(ms, 1000*60)
+
+def format_time(t):
+    """Format time t [s] as years, days, hours, minutes, seconds, and milliseconds."""
+    ms = round(1000 * t)
+    y, ms = divmod(ms, 1000 * 60 * 60 * 24 * 365)
+    d, ms = divmod(ms, 1000 * 60 * 60 * 24)
+    h, ms = divmod(ms, 1000 * 60 * 60)
+    m, ms = divmod(ms, 1000 * 60)
     s, ms = divmod(ms, 1000)
-    print(
-        "{0:>6}".format(y), 'yr,',
-        "{0:>3}".format(d), 'd,',
-        "{0:>2}".format(h), 'h,',
-        "{0:>2}".format(m), 'm,',
-        "{0:>2}".format(s), 's,',
-        "{0:>3}".format(ms),'ms.')
-    return
+    return '{0:>6} yr, {1:>3} d, {2:>2} h, {3:>2} m, {4:>2} s, {5:>3} ms.'.format(
+        y, d, h, m, s, ms)
+
+
+def print_time(t):
+    print(format_time(t))
+
+
+class ArrayStore:
+    """Append-only rows of fixed shape in a preallocated array, whose capacity is doubled
+       when full, i.e. appending costs amortized O(1) and no Python object per row."""
+    def __init__(self, shape=(), capacity=1024, dtype=float):
+        """Constructor.
+
+        :param shape: Shape of a row
+        :param capacity: Initial number of rows
+        :param dtype: Data type
+        """
+        self.array = np.empty((capacity, ) + tuple(shape), dtype=dtype)
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def data(self):
+        """View of the stored rows."""
+        return self.array[:self.size]
+
+    def append(self, row):
+        """Append one row."""
+        if self.size == self.array.shape[0]:
+            self._grow(self.size + 1)
+        self.array[self.size] = row
+        self.size += 1
+
+    def extend(self, rows):
+        """Append several rows at once."""
+        rows = np.asarray(rows)
+        if self.size + rows.shape[0] > self.array.shape[0]:
+            self._grow(self.size + rows.shape[0])
+        self.array[self.size:self.size + rows.shape[0]] = rows
+        self.size += rows.shape[0]
+
+    def _grow(self, size):
+        capacity = max(size, 2 * self.array.shape[0])
+        array = np.empty((capacity, ) + self.array.shape[1:], dtype=self.array.dtype)
+        array[:self.size] = self.array[:self.size]
+        self.array = array
+
+
+# Fields of a state; t is stored separately
+FIELDS = ('u', 'v', 'psi', 'tau')
+
+
+class RingBuffer:
+    """Last depth states (t, u, v, psi, tau) in preallocated arrays."""
+    def __init__(self, N, depth=10):
+        """Constructor.
+
+        :param N: Number of fault elements
+        :param depth: Number of states kept
+        """
+        self.t = np.empty(depth)
+        self.data = np.empty((depth, len(FIELDS), N))
+        self.count = 0
+
+    def __len__(self):
+        return min(self.count, self.t.shape[0])
+
+    def push(self, t, u, v, psi, tau):
+        """Store a state, overwriting the oldest one if full."""
+        i = self.count % self.t.shape[0]
+        self.t[i] = t
+        for k, field in enumerate((u, v, psi, tau)):
+            self.data[i, k] = field
+        self.count += 1
+
+    def __getitem__(self, k):
+        """State k (negative: counted from the newest state) as (t, data (4, N))."""
+        if not -len(self) <= k < len(self):
+            raise IndexError('State {} is not stored'.format(k))
+        i = (self.count + k if k < 0 else self.count - len(self) + k) % self.t.shape[0]
+        return self.t[i], self.data[i]
+
+
+class Snapshots:
+    """Growable store of snapshots (t, region, u, v, psi, tau)."""
+    def __init__(self, N):
+        """Constructor.
+
+        :param N: Number of fault elements
+        """
+        self.t_store = ArrayStore()
+        self.region_store = ArrayStore(dtype=int)
+        self.data_store = ArrayStore((len(FIELDS), N))
+
+    def __len__(self):
+        return len(self.t_store)
+
+    def extend(self, t, region, data):
+        """Append snapshots at times t (k,) with data (k, 4, N) of one region."""
+        self.t_store.extend(t)
+        self.region_store.extend(np.full(np.shape(t), region))
+        self.data_store.extend(data)
+
+    @property
+    def t(self):
+        return self.t_store.data
+
+    @property
+    def region(self):
+        return self.region_store.data
+
+    def __getattr__(self, name):
+        if name in FIELDS:
+            return self.data_store.data[:, FIELDS.index(name)]
+        raise AttributeError(name)
+
 
 class Monitor:
-    def __init__(self, thresholds, u_ax, u_fig, v_ax, v_fig):
-        self.t          = []
-        self.v          = []
-        self.sol_stack  = [] #array of solutions for slip
-        self.plt_stack  = []
+    """Monitor for the hooks of timestep.Integrator (or the callback of seas.F).
+
+       Capture and rendering are separated: every call only appends t and max(V) to
+       ArrayStores, pushes the state into a RingBuffer, and interpolates Snapshots at
+       regular intervals between the last two states, whose length depends on the
+       slip-rate region given by thresholds. Figures are updated at most
+       every render_interval seconds (wall-clock), either in the calling thread
+       (render='sync'), on a background thread (render='thread'), or never (render=None,
+       also used if no axes are given). Progress is logged at most every log_interval
+       seconds.
+
+       Matplotlib is not thread-safe: render='thread' is only for headless figures
+       (Agg backend, e.g. figures saved to files), not for GUI or notebook backends.
+    """
+    def __init__(self, thresholds, u_ax=None, u_fig=None, v_ax=None, v_fig=None,
+                 render='sync', render_interval=1.0, log_interval=1.0, log=print,
+                 depth=10):
+        """Constructor.
+
+        :param thresholds: List of slip-rate regions {'color', 'vthresh', 'dt'}, sorted by
+                           vthresh; the last region with max(V) > vthresh applies
+        :param u_ax: Axes for snapshots of the cumulative slip
+        :param u_fig: Figure of u_ax
+        :param v_ax: Axes for log10(max(V)) over time
+        :param v_fig: Figure of v_ax
+        :param render: 'sync', 'thread' (Agg backend only, see above), or None (headless)
+        :param render_interval: Minimum wall-clock time between figure updates [s]
+        :param log_interval: Minimum wall-clock time between progress lines [s]; 0 logs
+                             every step, None disables logging
+        :param log: Function which receives the progress lines
+        :param depth: Number of states kept in the ring buffer
+        """
+        if render not in ('thread', 'sync', None):
+            raise ValueError('Unknown render mode: {}'.format(render))
+        if u_ax is None and v_ax is None:
+            render = None
+        self.t = ArrayStore()
+        self.v = ArrayStore()
+        self.states = None
+        self.snapshots = None
+        self.depth = depth
         self.thresholds = thresholds
-        self.u_ax       = u_ax
-        self.u_fig      = u_fig
-        self.v_ax       = v_ax
-        self.v_fig      = v_fig
-        return
+        self.vthresh = np.array([thr['vthresh'] for thr in thresholds[1:]])
+        self.dt = np.array([thr['dt'] for thr in thresholds])
+        self.u_ax = u_ax
+        self.u_fig = u_fig
+        self.v_ax = v_ax
+        self.v_fig = v_fig
+        self.render = render
+        self.render_interval = render_interval
+        self.log_interval = log_interval
+        self.log = log
+        self.nrendered = 0
+        self.v_line = None
+        self._last_render = -np.inf
+        self._last_log = -np.inf
+        self._lock = threading.Lock()
+        self._thread = None
+        if render == 'thread':
+            self._pending = threading.Event()
+            self._stop = False
+            self._thread = threading.Thread(target=self._render_loop, daemon=True)
+            self._thread.start()
 
     def __call__(self, t, u, v, psi, tau):
-        print_time(t)
-        print('       v_max = ', v.max(), 'm/s | ', v.max()*100*(60*60*24*365), 'cm/yr')
-        
-        self.t.append(t)
-        self.v.append(v.max())
-        
-        self.v_ax.cla()
-        self.v_ax.plot(self.t, np.log10(self.v), color='#ffcc00',marker='.')
-        self.v_fig.canvas.draw()
-        
-        self.sol_stack.append({'t': t, 'u': u, 'v': v, 'psi': psi, 'tau': tau})
-        
-        creg = self.thresholds[0]
-        for thr in self.thresholds[1:]:
-            if v.max() > thr['vthresh']:
-                creg = thr
-        
-        if len(self.plt_stack) == 0:
-            self.plt_stack.append({'c': creg['color'], 't': t, 'u': u, 'v': v, 'psi': psi, 'tau': tau})
-            self.u_ax.plot(self.plt_stack[-1]['u'],color=creg['color'], linewidth=0.5)
-            self.u_fig.canvas.draw()
-        
-        elif len(self.sol_stack) >= 2:
-            t0 = self.plt_stack[-1]['t']
-            t1 = self.sol_stack[-2]['t']
-            t2 = self.sol_stack[-1]['t']
-            tx = t0 + creg['dt']
-            while tx < t2:
-                if t1 < tx:
-                    print('appending to plot stack')
-                    
-                    self.plt_stack.append({'c': creg['color'], 't': tx, 'u': [], 'v': [], 'psi': [], 'tau': []})
-                    
-                    weights = [1 - (tx - t1) / (t2 - t1), (tx - t1) / (t2 - t1)]
-                    self.plt_stack[-1]['u']   = np.average([self.sol_stack[-2]['u']  , self.sol_stack[-1]['u']  ], axis=0, weights=weights)
-                    self.plt_stack[-1]['v']   = np.average([self.sol_stack[-2]['v']  , self.sol_stack[-1]['v']  ], axis=0, weights=weights)
-                    self.plt_stack[-1]['psi'] = np.average([self.sol_stack[-2]['psi'], self.sol_stack[-1]['psi']], axis=0, weights=weights)
-                    self.plt_stack[-1]['tau'] = np.average([self.sol_stack[-2]['tau'], self.sol_stack[-1]['tau']], axis=0, weights=weights)
-                    self.u_ax.plot(self.plt_stack[-1]['u'], color=creg['color'], linewidth=0.5)
-                    self.u_fig.canvas.draw()
-                
-                tx += creg['dt']
-                
-        if len(self.sol_stack) >= 10:
-            self.sol_stack.pop(0)
+        v_max = v.max()
+        with self._lock:
+            self.t.append(t)
+            self.v.append(v_max)
+            self._snapshots(t, u, v, psi, tau)
+
+        now = time.monotonic()
+        if self.log_interval is not None and now - self._last_log >= self.log_interval:
+            self._last_log = now
+            self.log('{} v_max = {} m/s | {} cm/yr'.format(format_time(t), v_max,
+                                                           v_max * 100 * (60 * 60 * 24 * 365)))
+        if self.render is not None and now - self._last_render >= self.render_interval:
+            self._last_render = now
+            if self.render == 'thread':
+                self._pending.set()
+            else:
+                self.draw()
+
+    def region(self, v_max):
+        """Index of the threshold region of slip rates v_max (scalar or array)."""
+        return np.searchsorted(self.vthresh, v_max, side='left')
+
+    def _snapshots(self, t, u, v, psi, tau):
+        if self.states is None:
+            self.states = RingBuffer(u.shape[0], self.depth)
+            self.snapshots = Snapshots(u.shape[0])
+        self.states.push(t, u, v, psi, tau)
+        region = self.region(v.max())
+
+        if len(self.snapshots) == 0:
+            self.snapshots.extend([t], region, self.states[-1][1][np.newaxis])
+        elif len(self.states) >= 2:
+            # all times t0 + k dt in (t1, t2], interpolated linearly in one go; t2 is included
+            # as a time which falls on a step would be skipped in both (t1, t2) and (t2, t3)
+            t0 = self.snapshots.t[-1]
+            t1, y1 = self.states[-2]
+            t2, y2 = self.states[-1]
+            dt = self.dt[region]
+            k = np.arange(max(1.0, np.floor((t1 - t0) / dt)), np.floor((t2 - t0) / dt) + 1)
+            tx = t0 + k * dt
+            tx = tx[(t1 < tx) & (tx <= t2)]
+            w = ((tx - t1) / (t2 - t1))[:, np.newaxis, np.newaxis]
+            self.snapshots.extend(tx, region, y1 + w * (y2 - y1))
+
+    def draw(self):
+        """Update the figures with the data captured since the last update."""
+        with self._lock:
+            t = self.t.data.copy()
+            v = self.v.data.copy()
+            if self.snapshots is None:
+                u, region = np.empty((0, 0)), np.empty(0, dtype=int)
+            else:
+                u = self.snapshots.u[self.nrendered:].copy()
+                region = self.snapshots.region[self.nrendered:].copy()
+                self.nrendered = len(self.snapshots)
+
+        if self.v_ax is not None and t.shape[0] > 0:
+            if self.v_line is None:
+                self.v_line, = self.v_ax.plot(t, np.log10(v), color='#ffcc00', marker='.')
+            else:
+                self.v_line.set_data(t, np.log10(v))
+                self.v_ax.relim()
+                self.v_ax.autoscale_view()
+            self.v_fig.canvas.draw_idle()
+        if self.u_ax is not None and u.shape[0] > 0:
+            for u_k, r in zip(u, region):
+                self.u_ax.plot(u_k, color=self.thresholds[r]['color'], linewidth=0.5)
+            self.u_fig.canvas.draw_idle()
+
+    def _render_loop(self):
+        while True:
+            self._pending.wait()
+            self._pending.clear()
+            if self._stop:
+                return
+            self.draw()
+
+    def close(self):
+        """Stop the rendering thread and draw the remaining data."""
+        if self._thread is not None:
+            self._stop = True
+            self._pending.set()
+            self._thread.join()
+            self._thread = None
+        if self.render is not None:
+            self.draw()
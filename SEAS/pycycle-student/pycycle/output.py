@@ -0,0 +1,260 @@
+import json
+import os
+import tempfile
+import numpy as np
+from .seas import y0
+from .timestep import Integrator
+
+# Recorded variables; t is a scalar per step, all others have one value per fault element
+VARIABLES = ('t', 'S', 'V', 'psi', 'tau')
+
+FORMAT = 1
+
+
+def _replace(path, write, suffix):
+    """Atomically (re)write path by writing to a temporary file first."""
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=suffix)
+    try:
+        with os.fdopen(fd, 'wb') as file:
+            write(file)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def _chunk_path(directory, name, k, compress):
+    return os.path.join(directory, name, '{:06d}.{}'.format(k, 'npz' if compress else 'npy'))
+
+
+def _read_chunk(path):
+    if path.endswith('.npz'):
+        with np.load(path) as archive:
+            return archive['data']
+    return np.load(path, mmap_mode='r')
+
+
+class Writer:
+    """Stream accepted steps (t, S, V, psi, tau) to directory.
+
+       Rows are buffered in memory up to chunk_size and then appended as one file per
+       variable, directory/<variable>/<chunk>.npz (compressed) or .npy. Every flush ends
+       with a checkpoint, directory/checkpoint.npz, which lists the committed chunks and
+       holds the integrator state if an integrator is attached. The checkpoint is the only
+       commit point: chunks written after it are ignored by Reader and overwritten when the
+       run is resumed (see run).
+
+       A Writer is a hook for Integrator.add_hook (or the callback of seas.F); rows with
+       t not larger than the last recorded time are skipped, such that the initial hook
+       call of a resumed run is not recorded twice.
+    """
+    def __init__(self, directory, chunk_size=1000, compress=True, integrator=None,
+                 cache_key=None):
+        """Constructor.
+
+        :param directory: Output directory (created if missing)
+        :param chunk_size: Number of steps buffered in memory before writing a chunk
+        :param compress: Write zlib-compressed chunks
+        :param integrator: timestep.Integrator whose state is checkpointed
+        :param cache_key: Operator cache key of the Context (see seas.Context), recorded
+                          to check that a resumed run uses the same operators
+        """
+        self.directory = directory
+        self.chunk_size = chunk_size
+        self.compress = compress
+        self.integrator = integrator
+        self.cache_key = cache_key
+        self.chunks = []
+        self.t_last = -np.inf
+        self.buffers = None
+        self.rows = 0
+        self.opened = False
+        os.makedirs(directory, exist_ok=True)
+
+    @classmethod
+    def open(cls, directory, integrator=None):
+        """Reopen the output of an earlier run for appending after its last checkpoint.
+
+        :param directory: Output directory
+        :param integrator: See constructor
+        :return: Writer, checkpoint (dict of arrays)
+        """
+        meta = read_meta(directory)
+        checkpoint = read_checkpoint(directory)
+        writer = cls(directory, meta['chunk_size'], meta['compress'], integrator,
+                     meta['cache_key'])
+        writer.opened = True
+        writer.chunks = [int(rows) for rows in checkpoint['chunks']]
+        if sum(writer.chunks) > 0:
+            writer.t_last = float(_read_chunk(writer._path('t', len(writer.chunks) - 1))[-1])
+        return writer, checkpoint
+
+    def _path(self, name, k):
+        return _chunk_path(self.directory, name, k, self.compress)
+
+    def _write_meta(self, N):
+        meta = {
+            'format': FORMAT,
+            'N': N,
+            'chunk_size': self.chunk_size,
+            'compress': self.compress,
+            'cache_key': self.cache_key
+        }
+        _replace(os.path.join(self.directory, 'meta.json'),
+                 lambda file: file.write(json.dumps(meta, indent=1).encode()), '.json')
+
+    def __call__(self, t, S, V, psi, tau):
+        if t <= self.t_last:
+            return
+        if self.buffers is None:
+            N = np.shape(S)[0]
+            self.buffers = {name: np.empty((self.chunk_size, N)) for name in VARIABLES[1:]}
+            self.buffers['t'] = np.empty(self.chunk_size)
+            for name in VARIABLES:
+                os.makedirs(os.path.join(self.directory, name), exist_ok=True)
+            if not self.opened:
+                self._write_meta(N)
+        for name, value in zip(VARIABLES, (t, S, V, psi, tau)):
+            self.buffers[name][self.rows] = value
+        self.rows += 1
+        self.t_last = t
+        if self.rows == self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        """Write buffered rows as a new chunk and checkpoint."""
+        if self.rows > 0:
+            k = len(self.chunks)
+            for name in VARIABLES:
+                data = self.buffers[name][:self.rows]
+                if self.compress:
+                    _replace(self._path(name, k),
+                             lambda file: np.savez_compressed(file, data=data), '.npz')
+                else:
+                    _replace(self._path(name, k), lambda file: np.save(file, data), '.npy')
+            self.chunks.append(self.rows)
+            self.rows = 0
+        state = {'chunks': np.array(self.chunks, dtype=int)}
+        if self.integrator is not None:
+            state.update(self.integrator.state())
+        _replace(os.path.join(self.directory, 'checkpoint.npz'),
+                 lambda file: np.savez(file, **state), '.npz')
+
+    def close(self):
+        """Flush remaining rows."""
+        self.flush()
+
+
+def read_meta(directory):
+    """Metadata of an output directory (dict)."""
+    with open(os.path.join(directory, 'meta.json')) as file:
+        return json.load(file)
+
+
+def read_checkpoint(directory):
+    """Last checkpoint of an output directory (dict of arrays), or None if there is none."""
+    path = os.path.join(directory, 'checkpoint.npz')
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as archive:
+        return {name: archive[name] for name in archive.files}
+
+
+class Reader:
+    """Read the output written by Writer up to its last checkpoint."""
+    def __init__(self, directory):
+        """Constructor.
+
+        :param directory: Output directory
+        """
+        self.directory = directory
+        self.meta = read_meta(directory)
+        checkpoint = read_checkpoint(directory)
+        self.chunks = [] if checkpoint is None else [int(rows) for rows in checkpoint['chunks']]
+
+    def __len__(self):
+        """Number of recorded steps."""
+        return sum(self.chunks)
+
+    def chunk(self, name, k):
+        """Chunk k of variable name."""
+        return _read_chunk(_chunk_path(self.directory, name, k, self.meta['compress']))
+
+    def load(self, name, mmap_mode='r'):
+        """Load variable name, shape (steps,) for t and (steps, N) otherwise.
+
+           The chunks are concatenated once into directory/<name>.npy, chunk by chunk, such
+           that single variables can be memory-mapped; the file is rebuilt only after a
+           new checkpoint.
+
+        :param name: One of VARIABLES
+        :param mmap_mode: See numpy.load; None loads into memory
+        """
+        if name not in VARIABLES:
+            raise ValueError('Unknown variable: {}'.format(name))
+        path = os.path.join(self.directory, name + '.npy')
+        shape = (len(self), ) if name == 't' else (len(self), self.meta['N'])
+        checkpoint = os.path.join(self.directory, 'checkpoint.npz')
+        if os.path.exists(path) and os.path.exists(checkpoint) and \
+                os.stat(path).st_mtime >= os.stat(checkpoint).st_mtime:
+            array = np.load(path, mmap_mode=mmap_mode)
+            if array.shape == shape:
+                return array
+
+        def write(file):
+            np.lib.format.write_array_header_1_0(
+                file, {
+                    'descr': np.lib.format.dtype_to_descr(np.dtype(float)),
+                    'fortran_order': False,
+                    'shape': shape
+                })
+            for k in range(len(self.chunks)):
+                file.write(np.ascontiguousarray(self.chunk(name, k), dtype=float).tobytes())
+
+        _replace(path, write, '.npy')
+        return np.load(path, mmap_mode=mmap_mode)
+
+    def __getitem__(self, name):
+        return self.load(name)
+
+
+def run(ctx, directory, t_span, y=None, chunk_size=1000, compress=True, callback=None,
+        max_steps=None, **options):
+    """Integrate the SEAS ODE with timestep.Integrator and stream every accepted step to
+       directory (see Writer).
+
+       If directory holds a checkpoint of an earlier run, the integration resumes from it
+       and appends to the output; t_span[0] and y are then ignored. Pass a Context built
+       with a cache (see seas.Context) to reuse the operators of the earlier run.
+
+    :param ctx: Context
+    :param directory: Output directory
+    :param t_span: Interval of integration (t0, tend) [s]
+    :param y: Initial state; seas.y0(ctx) if None
+    :param chunk_size: See Writer
+    :param compress: See Writer (ignored when resuming)
+    :param callback: Additional hook (t, S, V, psi, tau), e.g. a Monitor
+    :param max_steps: Maximum number of accepted steps in this call
+    :param options: Further options for Integrator (method, rtol, atol, max_slip, ...)
+    :return: timestep.Result
+    """
+    checkpoint = read_checkpoint(directory)
+    if checkpoint is not None and 'y' in checkpoint:
+        writer, checkpoint = Writer.open(directory)
+        if None not in (writer.cache_key, ctx.cache_key) and writer.cache_key != ctx.cache_key:
+            raise ValueError('Context does not match the operators of the earlier run')
+        options.setdefault('first_step', float(checkpoint['h']))
+        integrator = Integrator(ctx, checkpoint['y'], float(checkpoint['t']), **options)
+        integrator.restore(checkpoint)
+        writer.integrator = integrator
+    else:
+        integrator = Integrator(ctx, y0(ctx) if y is None else y, t_span[0], **options)
+        writer = Writer(directory, chunk_size, compress, integrator, ctx.cache_key)
+    integrator.add_hook(writer)
+    if callback is not None:
+        integrator.add_hook(callback)
+    try:
+        result = integrator.run(t_span[1], max_steps)
+    finally:
+        writer.close()
+    return result
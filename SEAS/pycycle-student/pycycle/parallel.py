@@ -0,0 +1,111 @@
+import os
+import weakref
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+from . import bem
+from .mesh import as_mesh
+
+# Mesh of the worker processes, set once per worker by _init
+_mesh = None
+
+
+def _init(mesh):
+    global _mesh
+    _mesh = mesh
+
+
+def _assemble_rows(name, shape, op, K, rows, start, stop, cols, options):
+    """Assemble rows[start:stop] into the shared-memory array name of the given shape."""
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        out = np.ndarray(shape, dtype=float, buffer=shm.buf)
+        out[start:stop] = getattr(bem, op)(K, _mesh, rows=rows[start:stop], cols=cols,
+                                           **options)
+    finally:
+        shm.close()
+
+
+def _blocks(P, workers, block_rows):
+    if block_rows is None:
+        block_rows = max(1, -(-P // (4 * workers)))
+    return [(start, min(start + block_rows, P)) for start in range(0, P, block_rows)]
+
+
+def _run(op, K, mesh, rows, cols, workers, executor, block_rows, options):
+    workers = os.cpu_count() if workers is None else workers
+    mesh = as_mesh(mesh)
+    rows, cols = bem._indices(mesh, rows, cols)
+    shape = (rows.shape[0], cols.shape[0])
+    blocks = _blocks(shape[0], workers, block_rows)
+    if executor == 'thread':
+        A = np.empty(shape)
+
+        def work(start, stop):
+            A[start:stop] = getattr(bem, op)(K, mesh, rows=rows[start:stop], cols=cols,
+                                             **options)
+
+        with ThreadPoolExecutor(workers) as pool:
+            for future in [pool.submit(work, *block) for block in blocks]:
+                future.result()
+        return A
+    if executor != 'process':
+        raise ValueError('Unknown executor: {}'.format(executor))
+
+    shm = shared_memory.SharedMemory(create=True, size=max(1, 8 * shape[0] * shape[1]))
+    try:
+        with ProcessPoolExecutor(workers, initializer=_init, initargs=(mesh, )) as pool:
+            futures = [
+                pool.submit(_assemble_rows, shm.name, shape, op, K, rows, start, stop, cols,
+                            options) for start, stop in blocks
+            ]
+            for future in futures:
+                future.result()
+        A = np.ndarray(shape, dtype=float, buffer=shm.buf)
+    except BaseException:
+        shm.close()
+        raise
+    finally:
+        shm.unlink()
+    # The mapping outlives the name; views of A keep A alive, so the mapping is closed when
+    # the last array referring to it is gone
+    weakref.finalize(A, shm.close)
+    return A
+
+
+def assemble(G, mesh, workers=None, executor='process', block_rows=None, rows=None,
+             cols=None, **options):
+    """Assemble the BEM operator A (see bem.assemble) in parallel over blocks of rows.
+
+       Every row is computed exactly as in bem.assemble, hence the result does not depend
+       on the number of workers or the block size. With processes, the workers write into
+       shared memory which is returned without a copy; it is released together with the
+       last array referring to it.
+
+    :param G: Green's function; must be picklable (a module-level function) for processes
+    :param mesh: Mesh or list of line elements
+    :param workers: Number of workers (os.cpu_count() if None)
+    :param executor: 'process' (process pool writing into shared memory) or 'thread'
+                     (thread pool, useful when the kernels release the GIL)
+    :param block_rows: Rows per task (a quarter of the rows per worker if None)
+    :param rows: See bem.assemble
+    :param cols: See bem.assemble
+    :param options: Further keyword arguments for bem.assemble (method, analytic, order, ...)
+    """
+    return _run('assemble', G, mesh, rows, cols, workers, executor, block_rows, options)
+
+
+def rhs_op(dG_dn, mesh, workers=None, executor='process', block_rows=None, rows=None,
+           cols=None, **options):
+    """Assemble the BEM operator B (see bem.rhs_op) in parallel over blocks of rows.
+
+    :param dG_dn: Directional derivative of Green's function; see assemble
+    :param mesh: Mesh or list of line elements
+    :param workers: See assemble
+    :param executor: See assemble
+    :param block_rows: See assemble
+    :param rows: See bem.assemble
+    :param cols: See bem.assemble
+    :param options: Further keyword arguments for bem.rhs_op
+    """
+    return _run('rhs_op', dG_dn, mesh, rows, cols, workers, executor, block_rows, options)
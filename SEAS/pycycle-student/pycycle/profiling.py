@@ -0,0 +1,135 @@
+import time
+import numpy as np
+
+# Phases of the wall time in Stats.time: the parts of seas.F, and the hooks of the integrator
+PHASES = ('traction', 'slip_rate', 'state_law', 'callback', 'hooks')
+
+
+class Stats:
+    """Counters and cumulative wall times of the hot path, filled by seas.F, seas.jacobian,
+       and timestep.Integrator if enabled with Context.profile (nothing is recorded
+       otherwise, and the disabled path costs one attribute check and a few clock reads
+       per call).
+
+       Recorded are the number of right-hand side evaluations (nrhs) and traction
+       evaluations (ntraction), the wall time per phase (see PHASES), a histogram of the
+       Newton iterations of solve_slip_rate per element (iterations[k] = number of element
+       solves which took k iterations), the number of element solves which did not converge,
+       and the accepted and rejected steps of the integrator.
+    """
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """Set all counters to zero and restart the wall clock."""
+        self.nrhs = 0
+        self.ntraction = 0
+        self.nsteps = 0
+        self.nrejected = 0
+        self.nunconverged = 0
+        self.time = dict.fromkeys(PHASES, 0.0)
+        self.iterations = np.zeros(0, dtype=int)
+        self.start = time.perf_counter()
+
+    @property
+    def wall(self):
+        """Wall time since construction or the last reset [s]."""
+        return time.perf_counter() - self.start
+
+    @property
+    def nsolves(self):
+        """Number of element solves of solve_slip_rate."""
+        return int(self.iterations.sum())
+
+    @property
+    def mean_iterations(self):
+        """Mean number of Newton iterations per element solve."""
+        n = self.nsolves
+        return np.dot(np.arange(self.iterations.shape[0]), self.iterations) / n if n else 0.0
+
+    def add_time(self, phase, seconds):
+        self.time[phase] += seconds
+
+    def add_rhs(self, info, traction, slip_rate, state_law, callback=None):
+        """Record one right-hand side evaluation of seas.F.
+
+        :param info: seas.SolverInfo of the slip-rate solve
+        :param traction: Wall time of the traction [s]
+        :param slip_rate: Wall time of the slip-rate solve [s]
+        :param state_law: Wall time of the state law [s]
+        :param callback: Wall time of the callback [s], None without callback
+        """
+        self.nrhs += 1
+        self.ntraction += 1
+        self.time['traction'] += traction
+        self.time['slip_rate'] += slip_rate
+        self.time['state_law'] += state_law
+        if callback is not None:
+            self.time['callback'] += callback
+        self.add_solver_info(info)
+
+    def add_solver_info(self, info):
+        """Add the iterations and convergence flags of a seas.SolverInfo."""
+        counts = np.bincount(np.ravel(info.iterations))
+        if counts.shape[0] > self.iterations.shape[0]:
+            counts[:self.iterations.shape[0]] += self.iterations
+            self.iterations = counts
+        else:
+            self.iterations[:counts.shape[0]] += counts
+        self.nunconverged += int(np.size(info.converged) - np.count_nonzero(info.converged))
+
+    def as_dict(self):
+        """Counters and times as dict of plain Python values (e.g. for JSON)."""
+        return {
+            'wall': self.wall,
+            'nrhs': self.nrhs,
+            'ntraction': self.ntraction,
+            'nsteps': self.nsteps,
+            'nrejected': self.nrejected,
+            'nsolves': self.nsolves,
+            'nunconverged': self.nunconverged,
+            'mean_iterations': float(self.mean_iterations),
+            'iterations': self.iterations.tolist(),
+            'time': dict(self.time)
+        }
+
+    def summary(self):
+        """Counters and the share of the wall time per phase as text."""
+        wall = self.wall
+        lines = [
+            'wall {:.4g} s | rhs {} | traction {} | steps {} accepted, {} rejected'.format(
+                wall, self.nrhs, self.ntraction, self.nsteps, self.nrejected),
+            'slip rate: {} solves, {:.2f} iterations on average, max {}, {} unconverged'.format(
+                self.nsolves, self.mean_iterations, max(0, self.iterations.shape[0] - 1),
+                self.nunconverged)
+        ]
+        for phase in PHASES:
+            share = 100 * self.time[phase] / wall if wall > 0 else 0.0
+            lines.append('{:<10} {:>10.4g} s {:>6.1f} %'.format(phase, self.time[phase], share))
+        return '\n'.join(lines)
+
+    def __repr__(self):
+        return 'Stats(nrhs={}, ntraction={}, nsteps={}, nrejected={})'.format(
+            self.nrhs, self.ntraction, self.nsteps, self.nrejected)
+
+
+class Summary:
+    """Hook for timestep.Integrator (t, S, V, psi, tau) which logs Stats.summary at most every
+       interval seconds (wall-clock)."""
+    def __init__(self, stats, interval=10.0, log=print):
+        """Constructor.
+
+        :param stats: Stats, e.g. the one returned by Context.profile
+        :param interval: Minimum wall-clock time between summaries [s]; 0 logs every step
+        :param log: Function which receives the summaries
+        """
+        self.stats = stats
+        self.interval = interval
+        self.log = log
+        self._last = time.monotonic()
+
+    def __call__(self, t, S, V, psi, tau):
+        now = time.monotonic()
+        if now - self._last >= self.interval:
+            self._last = now
+            self.log('t = {} s\n{}'.format(t, self.stats.summary()))
@@ -1,8 +1,18 @@
+import copy
+import functools
+import time
 import numpy as np
+from scipy.integrate import solve_ivp
 from scipy.linalg import lu_factor, lu_solve
 from scipy.optimize import toms748
-from .mesh import num_fault_elements
+from scipy.sparse import bsr_matrix
+from .mesh import as_mesh
+from .fields import evaluate
 from .bem import assemble, rhs_op
+from . import hmatrix, krylov, parallel, toeplitz
+from .incremental import MeshDiff, UpdatedSolver, update_operator
+from .profiling import Stats
+from .cache import OperatorCache, operator_key
 
 
 class FaultMap:
@@ -10,15 +20,10 @@ class FaultMap:
     def __init__(self, mesh):
         """Constructor.
 
-        :param mesh: List of line elements.
+        :param mesh: Mesh or list of line elements.
         """
-        self.Nf = num_fault_elements(mesh)
-        self.map = np.ndarray((self.Nf, ), dtype=int)
-        f = 0
-        for i in range(len(mesh)):
-            if mesh[i].is_fault:
-                self.map[f] = i
-                f = f + 1
+        self.map = as_mesh(mesh).fault_indices()
+        self.Nf = self.map.shape[0]
 
     def __len__(self):
         """Number of on-fault elements."""
@@ -34,17 +39,12 @@ class IFaultMap:
     def __init__(self, mesh):
         """Constructor.
 
-        :param mesh: List of line elements.
+        :param mesh: Mesh or list of line elements.
         """
-        self.N = len(mesh)
-        self.imap = np.ndarray((self.N, ), dtype=int)
-        f = 0
-        for i in range(len(mesh)):
-            if mesh[i].is_fault:
-                self.imap[i] = f
-                f = f + 1
-            else:
-                self.imap[i] = -1
+        is_fault = as_mesh(mesh).is_fault
+        self.N = is_fault.shape[0]
+        self.imap = np.full((self.N, ), -1, dtype=int)
+        self.imap[is_fault] = np.arange(np.count_nonzero(is_fault))
 
     def __len__(self):
         """Number of bem elements (= number of line elements in mesh)."""
@@ -59,29 +59,42 @@ class VariableParams:
     """Prestress and a parameter for rate and state friction.
        May depend on position in space.
     """
-    def __init__(self, mesh, a, tau_pre):
+    def __init__(self, mesh, a, tau_pre, vectorized=None):
         """Constructor.
 
-        :param mesh: List of line elements.
-        :param a: Functional R^2 -> R for a parameter.
-        :param tau_pre: Functional R^2 -> R for pre-stress.
+        :param mesh: Mesh or list of line elements.
+        :param a: Functional R^2 -> R for a parameter, constant, array (size Nf), or field
+                  from pycycle.fields.
+        :param tau_pre: Functional R^2 -> R for pre-stress (same options as a).
+        :param vectorized: Evaluate functionals on all fault collocation points at once
+                           (True), per point (False), or detect (None), see fields.evaluate.
+        """
+        mesh = as_mesh(mesh)
+        self.x = mesh[mesh.is_fault].collocation_points()
+        self.a = evaluate(a, self.x, vectorized)
+        self.tau_pre = evaluate(tau_pre, self.x, vectorized)
+        self.inv_a = 1.0 / self.a
+
+    @classmethod
+    def stack(cls, vps):
+        """Stack the parameters of several members (same mesh) for batched evaluation,
+           i.e. a, tau_pre, and inv_a get shape (K, Nf).
+
+        :param vps: List of VariableParams
         """
-        Nf = num_fault_elements(mesh)
-        self.x = np.ndarray((Nf, 2))
-        f = 0
-        for i in range(len(mesh)):
-            if mesh[i].is_fault:
-                self.x[f, :] = mesh[i].collocation_point()
-                f = f + 1
-        self.a = np.ndarray((Nf, ))
-        self.tau_pre = np.ndarray((Nf, ))
-        for f in range(Nf):
-            self.a[f] = a(self.x[f, :])
-            self.tau_pre[f] = tau_pre(self.x[f, :])
+        vp = cls.__new__(cls)
+        vp.x = vps[0].x
+        for name in ('a', 'tau_pre', 'inv_a'):
+            setattr(vp, name, np.stack([getattr(p, name) for p in vps]))
+        return vp
 
 
 class ConstantParams:
-    """Constant parameters for rate and state friction."""
+    """Constant parameters for rate and state friction.
+
+       Derived quantities (mu, eta, and the coefficients of the ageing law) are computed
+       once in the constructor; create a new instance to change parameters.
+    """
     def __init__(self, rho, v_s, Vp, V0, b, L, f0, sn, Vinit):
         """Constructor.
 
@@ -104,56 +117,466 @@ class ConstantParams:
         self.f0 = f0
         self.sn = sn
         self.Vinit = Vinit
+        # psi' = state_rate (exp((f0 - psi) inv_b) - V inv_V0), see Context.state_law
+        self.state_rate = b * V0 / L
+        self.inv_b = 1.0 / b
+        self.inv_V0 = 1.0 / V0
+
+    @classmethod
+    def stack(cls, cps):
+        """Stack the parameters of several members for batched evaluation, i.e. every
+           parameter becomes an array of shape (K, 1), which broadcasts against (K, Nf).
+
+        :param cps: List of ConstantParams
+        """
+        cp = cls.__new__(cls)
+        for name in vars(cps[0]):
+            setattr(cp, name, np.array([getattr(p, name) for p in cps])[:, np.newaxis])
+        return cp
+
+
+class SolverInfo:
+    """Convergence diagnostics of solve_slip_rate."""
+    def __init__(self, iterations, converged, residual):
+        """Constructor.
+
+        :param iterations: Number of iterations per element
+        :param converged: Convergence flag per element
+        :param residual: |tau + f(V, psi) + eta V| per element at the returned V
+        """
+        self.iterations = iterations
+        self.converged = converged
+        self.residual = residual
+
+    @property
+    def success(self):
+        """True if all elements converged."""
+        return bool(np.all(self.converged))
+
+    def __repr__(self):
+        return 'SolverInfo(success={}, max_iterations={}, max_residual={})'.format(
+            self.success, self.iterations.max(initial=0), self.residual.max(initial=0))
+
+
+def solve_slip_rate(tau, psi, a, cp, rtol=1e-12, atol=0.0, maxiter=100, inv_a=None):
+    """Solve tau + f(V, psi) + eta V = 0 for V on all elements at once.
+
+       C(V) = tau + f(V, psi) + eta V is strictly increasing in V, hence its only root lies
+       in [0, -tau/eta] if tau < 0, in [-tau/eta, 0] if tau > 0, and is 0 if tau = 0
+       (cf. README). Newton's method is run on all elements simultaneously in the variable
+       w = arcsinh(V exp(psi / a) / (2 V0)), where C is convex for w > 0 (concave for w < 0),
+       starting from the root without radiation damping. Iterates leaving the current
+       bracket are replaced by bisection steps.
+
+    :param tau: Traction (array)
+    :param psi: State (array)
+    :param a: a parameter (array)
+    :param cp: ConstantParams; V0, eta, and sn may be arrays broadcasting against tau
+               (see ConstantParams.stack)
+    :param rtol: Relative tolerance on the update of V
+    :param atol: Absolute tolerance on the update of V [m/s]
+    :param maxiter: Maximum number of iterations
+    :param inv_a: Precomputed 1 / a (optional)
+    :return: V, SolverInfo
+    """
+    inv_a = 1.0 / np.asarray(a, dtype=float) if inv_a is None else inv_a
+    tau, psi, a, inv_a = np.broadcast_arrays(np.asarray(tau, dtype=float), psi, a, inv_a)
+    shape = tau.shape
+    tau, psi, a, inv_a = tau.ravel(), psi.ravel(), a.ravel(), inv_a.ravel()
+    V0, eta, sn = (p if np.ndim(p) == 0 else np.broadcast_to(p, shape).ravel()
+                   for p in (cp.V0, cp.eta, cp.sn))
+    c = np.exp(psi * inv_a) / (2.0 * V0)
+    eta_c = eta / c
+    sn_a = sn * a
+    lo = np.arcsinh(np.minimum(0.0, -tau / eta) * c)
+    hi = np.arcsinh(np.maximum(0.0, -tau / eta) * c)
+
+    def C(w, i=slice(None)):
+        return tau[i] + sn_a[i] * w + eta_c[i] * np.sinh(w)
+
+    w = np.clip(-tau / sn_a, lo, hi)
+    V = np.sinh(w) / c
+    iterations = np.zeros(tau.shape, dtype=int)
+    idx = np.flatnonzero(hi > lo)
+    for _ in range(maxiter):
+        if idx.size == 0:
+            break
+        wi = w[idx]
+        Ci = C(wi, idx)
+        lo_i = np.where(Ci < 0, wi, lo[idx])
+        hi_i = np.where(Ci > 0, wi, hi[idx])
+        wn = wi - Ci / (sn_a[idx] + eta_c[idx] * np.cosh(wi))
+        wn = np.where((wn >= lo_i) & (wn <= hi_i), wn, 0.5 * (lo_i + hi_i))
+        wn = np.where(Ci == 0, wi, wn)
+        Vn = np.sinh(wn) / c[idx]
+        tol = atol + rtol * np.abs(Vn)
+        done = (np.abs(Vn - V[idx]) <= tol) | (wn == wi)
+        w[idx] = wn
+        V[idx] = Vn
+        lo[idx] = lo_i
+        hi[idx] = hi_i
+        iterations[idx] += 1
+        idx = idx[~done]
+    converged = np.ones(tau.shape, dtype=bool)
+    converged[idx] = False
+    info = SolverInfo(iterations.reshape(shape), converged.reshape(shape),
+                      np.abs(C(w)).reshape(shape))
+    return V.reshape(shape), info
 
 
 class Context:
     """Context which contains everything we need in evaluating the right-hand side
        in the time integrator.
     """
-    def __init__(self, mesh, G, dG_dn, vp, cp):
+    def __init__(self, mesh, G, dG_dn, vp, cp, assembly='quad', precompute=None,
+                 solver_options=None, operator='dense', hmatrix_options=None,
+                 toeplitz_options=None, linear_solver=None, linear_solver_options=None,
+                 cache=None, workers=None):
         """Constructor.
 
-        :param mesh: List of line elements 
+        :param mesh: Mesh or list of line elements
         :param G: Green's function
         :param dG_dn: Directional derivative of Green's function
         :param vp: VariableParams
         :param cp: ConstantParams
+        :param assembly: Assembly method of the BEM operators ('quad' or 'gauss')
+        :param precompute: Precompute the fault traction operator such that traction is a
+                           single matrix-vector product. Set to False to solve with A in
+                           every call (reference path for validation).
+                           Defaults to True for dense operators with LU and False otherwise.
+        :param solver_options: Keyword arguments for solve_slip_rate (rtol, atol, maxiter)
+        :param operator: Representation of A and B: 'dense' (LU factorization of A),
+                         'hmatrix' (ACA-compressed, A is solved with preconditioned GMRES),
+                         'toeplitz' (FFT-based, requires the fault to be a uniform straight
+                         run, see toeplitz.detect), or 'auto' ('toeplitz' if applicable,
+                         'dense' otherwise)
+        :param hmatrix_options: Keyword arguments for hmatrix.build (tol, eta, leaf_size)
+        :param toeplitz_options: Keyword arguments for toeplitz.build (tol, maxiter)
+        :param linear_solver: Solver for A x = b: 'lu' (dense operators only), 'gmres' or
+                              'bicgstab'. Defaults to 'lu' for dense operators and 'gmres'
+                              otherwise. Diagnostics of Krylov solvers are available in
+                              self.linear_solver (see krylov.KrylovSolver).
+        :param linear_solver_options: Options of the Krylov solvers:
+                                      tol (relative residual, default 1e-10), maxiter, restart,
+                                      preconditioner ('block-jacobi' over blocks of fault and
+                                      non-fault elements, 'coarse' (block-Jacobi with a
+                                      coarse-mesh LU correction), 'nearfield' (hmatrix only),
+                                      or None; default 'coarse'), block_size (default 64),
+                                      coarse_size (elements per coarse element, default 8),
+                                      and warm_start (start from the previous solution in
+                                      traction, default True). Only warm_start applies to
+                                      'toeplitz', see toeplitz_options for the other options.
+        :param cache: OperatorCache or cache directory. A, B, the LU factors, and the
+                      fault traction operator are then loaded memory-mapped from the cache
+                      if the mesh, G, dG_dn, and assembly are the same as in an earlier
+                      run (dense operators only)
+        :param workers: Assemble dense operators in parallel with this many processes (see
+                        parallel.assemble); serial if None
         """
-        self.A = assemble(G, mesh)
-        self.B = rhs_op(dG_dn, mesh)
-        self.lu, self.piv = lu_factor(self.A)
+        mesh = as_mesh(mesh)
+        if operator == 'auto':
+            operator = 'toeplitz' if toeplitz.detect(mesh, G, dG_dn) else 'dense'
+        if linear_solver is None:
+            linear_solver = 'lu' if operator == 'dense' else 'gmres'
+        if linear_solver == 'lu' and operator != 'dense':
+            raise ValueError('LU requires dense operators, got: {}'.format(operator))
+        krylov_options = {} if linear_solver_options is None else dict(linear_solver_options)
+        self.warm_start = krylov_options.pop('warm_start', True)
+        self._x0 = None
+        self.fault_op = None
+        self.linear_solver = None
+        self.cache = None
+        self.cache_key = None
+        if cache is not None:
+            if operator != 'dense':
+                raise ValueError('Operator cache requires dense operators, got: {}'.format(
+                    operator))
+            self.cache = cache if isinstance(cache, OperatorCache) else OperatorCache(cache)
+            self.cache_key = operator_key(mesh, G, dG_dn, assembly)
+        if operator == 'dense':
+            if workers is None:
+                self.A = self._cached('A', lambda: assemble(G, mesh, method=assembly))
+                self.B = self._cached('B', lambda: rhs_op(dG_dn, mesh, method=assembly))
+            else:
+                self.A = self._cached(
+                    'A', lambda: parallel.assemble(G, mesh, workers, method=assembly))
+                self.B = self._cached(
+                    'B', lambda: parallel.rhs_op(dG_dn, mesh, workers, method=assembly))
+            self.lu, self.piv = None, None
+            if linear_solver == 'lu':
+                self.lu, self.piv = self._cached(('lu', 'piv'), lambda: lu_factor(self.A))
+                # lu_solve does not accept read-only pivots; they are small, so load them
+                self.piv = np.array(self.piv)
+        elif operator == 'hmatrix':
+            options = {} if hmatrix_options is None else hmatrix_options
+            self.A = hmatrix.build(
+                lambda r, c: assemble(G, mesh, method=assembly, rows=r, cols=c), mesh,
+                **options)
+            self.B = hmatrix.build(
+                lambda r, c: rhs_op(dG_dn, mesh, method=assembly, rows=r, cols=c), mesh,
+                **options)
+            self.lu, self.piv = None, None
+        elif operator == 'toeplitz':
+            options = {} if toeplitz_options is None else toeplitz_options
+            self.fault_op = toeplitz.build(G, dG_dn, mesh, method=assembly,
+                                           krylov=linear_solver, **options)
+            self.A, self.B = None, None
+            self.lu, self.piv = None, None
+            self.linear_solver = self.fault_op.solver
+        else:
+            raise ValueError('Unknown operator representation: {}'.format(operator))
+        if self.A is not None and self.lu is None:
+            preconditioner = krylov_options.pop('preconditioner', 'coarse')
+            block_size = krylov_options.pop('block_size', 64)
+            coarse_size = krylov_options.pop('coarse_size', 8)
+            if preconditioner in ('block-jacobi', 'coarse'):
+                blocks = krylov.partition(mesh, block_size)
+                M = krylov.BlockJacobi(
+                    lambda r, c: assemble(G, mesh, method=assembly, rows=r, cols=c), blocks,
+                    self.A.shape)
+                if preconditioner == 'coarse':
+                    M = krylov.TwoLevel(self.A, M, krylov.aggregate(blocks, coarse_size))
+                M = M.aslinearoperator()
+            elif preconditioner == 'nearfield' and operator == 'hmatrix':
+                M = self.A.preconditioner()
+            elif preconditioner is None:
+                M = None
+            else:
+                raise ValueError('Unknown preconditioner: {}'.format(preconditioner))
+            self.linear_solver = krylov.KrylovSolver(self.A, M, linear_solver,
+                                                     **krylov_options)
+        self._jacobian_op = None
+        self.operator = operator
+        self.mesh = mesh
+        self.kernels = (G, dG_dn)
+        self.assembly = assembly
         self.map = FaultMap(mesh)
         self.imap = IFaultMap(mesh)
         self.vp = vp
         self.cp = cp
+        self.solver_options = {} if solver_options is None else dict(solver_options)
+        self.K = None
+        self.load = None
+        self.mu_scale = None
+        self.stats = None
+        if precompute or (precompute is None and self.lu is not None):
+            self.K, self.load = self.fault_operator()
+
+    @classmethod
+    def from_fault_operator(cls, mesh, K, vp, cp, solver_options=None, mu=None):
+        """Context which only holds the fault traction operator K = mu / 2 M^T A^{-1} B M,
+           e.g. a view of shared memory (see ensemble), instead of A and B.
+
+        :param mesh: Mesh or list of line elements
+        :param K: Fault traction operator (Nf x Nf)
+        :param vp: VariableParams
+        :param cp: ConstantParams
+        :param solver_options: See constructor
+        :param mu: Shear modulus of K (cp.mu if None); traction is scaled by cp.mu / mu
+        """
+        ctx = cls.__new__(cls)
+        ctx.warm_start = True
+        ctx._x0 = None
+        ctx._jacobian_op = None
+        ctx.fault_op = None
+        ctx.linear_solver = None
+        ctx.cache = None
+        ctx.cache_key = None
+        ctx.A, ctx.B = None, None
+        ctx.lu, ctx.piv = None, None
+        ctx.operator = 'fault'
+        ctx.mesh = as_mesh(mesh)
+        ctx.kernels = None
+        ctx.assembly = None
+        ctx.map = FaultMap(mesh)
+        ctx.imap = IFaultMap(mesh)
+        ctx.vp = vp
+        ctx.cp = cp
+        ctx.solver_options = {} if solver_options is None else dict(solver_options)
+        ctx.K = K
+        ctx.load = K.sum(axis=1)
+        ctx.mu_scale = None if mu is None or np.all(cp.mu == mu) else cp.mu / mu
+        ctx.stats = None
+        return ctx
+
+    def with_params(self, vp, cp):
+        """Context which shares the operators of this one but uses other parameters, e.g.
+           stacked parameters of several members for batched evaluation (see F and
+           VariableParams.stack / ConstantParams.stack).
+
+        :param vp: VariableParams
+        :param cp: ConstantParams
+        """
+        ctx = copy.copy(self)
+        ctx.vp = vp
+        ctx.cp = cp
+        ctx._x0 = None
+        if self.K is not None:
+            mu = self.cp.mu if self.mu_scale is None else self.cp.mu / self.mu_scale
+            ctx.mu_scale = None if np.all(cp.mu == mu) else cp.mu / mu
+        return ctx
+
+    def update(self, mesh, vp, cp=None, refactor=None):
+        """Context of a changed mesh which reuses the operators of this one, e.g. for
+           mesh-convergence studies which extend the fault, add far-field elements, or refine
+           locally (see incremental.MeshDiff for how elements are matched).
+
+           Only rows and columns of A and B belonging to added elements are assembled, and
+           the LU factorization of A is updated by blocks (see incremental.UpdatedSolver)
+           instead of recomputed; the fault traction operator is then obtained with the
+           updated solver. Requires a dense Context with LU (or an updated one).
+
+        :param mesh: New mesh or list of line elements
+        :param vp: VariableParams of the new mesh
+        :param cp: ConstantParams (those of this Context if None)
+        :param refactor: Factorize A of the new mesh instead of updating the factorization.
+                         Defaults to True if the change is large, i.e. if the rank of the
+                         update (2 removed + added elements) exceeds a sixth of the mesh
+                         size, where the O(M^3) factorization becomes cheaper.
+        :return: Context
+        """
+        if self.operator != 'dense' or self.kernels is None or not (
+                self.lu is not None or isinstance(self.linear_solver, UpdatedSolver)):
+            raise ValueError('Incremental update requires a dense Context with LU, got: '
+                             '{}'.format(self.operator))
+        mesh = as_mesh(mesh)
+        G, dG_dn = self.kernels
+        diff = MeshDiff(self.mesh, mesh)
+        ctx = copy.copy(self)
+        ctx.mesh = mesh
+        if self.cache is not None:
+            ctx.cache_key = operator_key(mesh, G, dG_dn, self.assembly)
+        ctx.A = ctx._cached('A', lambda: update_operator(
+            self.A, diff,
+            lambda r, c: assemble(G, mesh, method=self.assembly, rows=r, cols=c)))
+        ctx.B = ctx._cached('B', lambda: update_operator(
+            self.B, diff,
+            lambda r, c: rhs_op(dG_dn, mesh, method=self.assembly, rows=r, cols=c)))
+        if refactor is None:
+            refactor = 6 * diff.rank > len(mesh)
+        if refactor:
+            ctx.lu, ctx.piv = ctx._cached(('lu', 'piv'), lambda: lu_factor(ctx.A))
+            ctx.piv = np.array(ctx.piv)
+            ctx.linear_solver = None
+        else:
+            solve = self.linear_solver.solve if self.lu is None else functools.partial(
+                lu_solve, (self.lu, self.piv))
+            ctx.lu, ctx.piv = None, None
+            ctx.linear_solver = UpdatedSolver(solve, self.A, ctx.A, diff)
+        ctx.map = FaultMap(mesh)
+        ctx.imap = IFaultMap(mesh)
+        ctx.vp = vp
+        ctx.cp = self.cp if cp is None else cp
+        ctx._x0 = None
+        ctx._jacobian_op = None
+        ctx.K, ctx.load = None, None
+        ctx.mu_scale = None
+        if self.K is not None:
+            ctx.K, ctx.load = ctx.fault_operator()
+        return ctx
+
+    def profile(self, stats=None):
+        """Enable the instrumentation of F, jacobian, and timestep.Integrator for this
+           Context (see profiling.Stats); profile(False) disables it again.
+
+        :param stats: Stats to record into (a new one if None)
+        :return: Stats, or None if disabled
+        """
+        self.stats = None if stats is False else Stats() if stats is None else stats
+        return self.stats
+
+    def _cached(self, names, compute):
+        """Load arrays from the cache or compute and store them.
+
+        :param names: Array name or tuple of names
+        :param compute: Function without arguments returning the array (tuple of arrays)
+        """
+        if self.cache is None:
+            return compute()
+        single = isinstance(names, str)
+        keys = (names, ) if single else names
+        arrays = [self.cache.load(self.cache_key, name) for name in keys]
+        if any(array is None for array in arrays):
+            arrays = (compute(), ) if single else compute()
+            for name, array in zip(keys, arrays):
+                self.cache.store(self.cache_key, name, array)
+        return arrays[0] if single else tuple(arrays)
+
+    def solve(self, b, x0=None):
+        """Solve A x = b.
+
+        :param b: Right-hand side (N,) or (N, k)
+        :param x0: Initial guess for Krylov solvers (ignored by LU)
+        """
+        if self.lu is not None:
+            return lu_solve((self.lu, self.piv), b)
+        return self.linear_solver.solve(b, x0)
+
+    def fault_operator(self):
+        """Computes the on-fault traction operator
+           K = mu / 2 M^T A^{-1} B M (Nf x Nf) and the loading vector K @ 1,
+           such that tau = tau_pre + K @ u - Vp t K @ 1.
+        """
+        K = (0.5 * self.cp.mu) * self._fault_solve()
+        return K, K.sum(axis=1)
+
+    def _fault_solve(self):
+        """M^T A^{-1} B M, i.e. the fault traction operator without the factor mu / 2."""
+        if self.fault_op is not None:
+            return self.fault_op(np.eye(len(self.map)))
+
+        def compute():
+            if self.operator == 'dense':
+                BM = self.B[:, self.map.map]
+            else:
+                BM = self.B @ np.eye(len(self.imap))[:, self.map.map]
+            return self.solve(BM)[self.map.map, :]
+
+        return self._cached('fault_operator', compute)
+
+    def _initial_guess(self, b):
+        """Previous solution as initial guess if it matches right-hand side b in shape, i.e.
+           not after switching between single and batched states or batch sizes."""
+        if self._x0 is not None and self._x0.shape == np.shape(b):
+            return self._x0
+        return None
 
     def traction(self, time, u):
         """Computes tau at time 'time' for on-fault displacement u (u has size Nf).
 
+           A batch of displacements u of shape (K, Nf) is handled at once (one matrix-matrix
+           product with the fault traction operator); parameters broadcast against u.
+
         :param time: Time [s]
         :param u: Displacement vector [m]
         """
-        N = len(self.imap)
-        Nf = len(self.map)
-        tau = np.zeros((Nf, ))
-        g = np.zeros((N, ))
-
-        # TODO: implement - UNDERSTAND?
-        for f in range(Nf):
-            g[self.map(f)] = (u[f] - self.cp.Vp * time) / 2.0
+        if self.K is not None:
+            if np.ndim(u) == 1:
+                tau = self.K @ u - (self.cp.Vp * time) * self.load
+            else:
+                tau = u @ self.K.T - (self.cp.Vp * time) * self.load
+            if self.mu_scale is not None:
+                tau *= self.mu_scale
+            return self.vp.tau_pre + tau
+        if self.fault_op is not None:
+            b = np.transpose((u - self.cp.Vp * time) / 2.0)
+            x = self.fault_op(b, self._initial_guess(b))
+            if self.warm_start:
+                self._x0 = x
+            return self.vp.tau_pre + self.cp.mu * np.transpose(x)
+
+        g = np.zeros((len(self.imap), ) + np.shape(u)[:-1])
+        g[self.map.map] = np.transpose((u - self.cp.Vp * time) / 2.0)
         b = self.B @ g
-        t = lu_solve((self.lu, self.piv), b)
-        for i in range(N):
-            f = self.imap(i)
-            if f>= 0:
-                tau[f] = t[i]      
-        
-        return self.vp.tau_pre + self.cp.mu * tau
+        t = self.solve(b, self._initial_guess(b))
+        if self.warm_start and self.lu is None:
+            self._x0 = t
+        return self.vp.tau_pre + self.cp.mu * np.transpose(t[self.map.map])
 
-    def psi0(self, f):
+    def psi0(self, f=slice(None)):
         """Compute initial state for the f-th on-fault element.
 
-        :param f: Fault element number
+        :param f: Fault element number, or index array / slice (default: all elements)
         """
         tau = -self.vp.tau_pre[f]
         a = self.vp.a[f]
@@ -164,14 +587,12 @@ class Context:
     def friction_law(self, f, V, psi):
         """Evaluate friction law.
 
-        :param f: Fault element number
-        :param V: Slip-rate (scalar)
-        :param psi: State (scalar)
+        :param f: Fault element number, or index array / slice
+        :param V: Slip-rate (scalar or array matching f)
+        :param psi: State (scalar or array matching f)
         """
-        a = self.vp.a[f]
-        e = np.exp(psi / a)
-        f = a * np.arcsinh((V / (2.0 * self.cp.V0)) * e)
-        return self.cp.sn * f
+        e = np.exp(psi * self.vp.inv_a[f])
+        return self.cp.sn * self.vp.a[f] * np.arcsinh((V / (2.0 * self.cp.V0)) * e)
 
     def slip_rate(self, f, tau, psi):
         """Obtain slip-rate by solving tau + friction_law(V, psi) + eta V = 0 for V.
@@ -192,6 +613,16 @@ class Context:
             return 0.0
 
 
+    def slip_rates(self, tau, psi):
+        """Obtain slip-rate of all on-fault elements at once, see solve_slip_rate.
+
+        :param tau: Traction (size Nf, or (K, Nf) for a batch)
+        :param psi: State (same shape as tau)
+        :return: V, SolverInfo
+        """
+        return solve_slip_rate(tau, psi, self.vp.a, self.cp, inv_a=self.vp.inv_a,
+                               **self.solver_options)
+
     def state_law(self, f, V, psi):
         """Evaluate ageing law.
 
@@ -201,46 +632,149 @@ class Context:
                 = b V0 / L exp( ( f0 - psi ) / b ) - b V / L
                 = b V0 / L ( exp( ( f0 - psi ) / b ) - V / V0 )
 
-        :param f: Fault element number
-        :param V: Slip-rate (scalar)
-        :param psi: State (scalar)
+        :param f: Fault element number, or index array / slice (unused, the law is uniform)
+        :param V: Slip-rate (scalar or array)
+        :param psi: State (scalar or array)
         """
-        return self.cp.b * self.cp.V0 / self.cp.L * (np.exp(
-            (self.cp.f0 - psi) / self.cp.b) - V / self.cp.V0)
+        cp = self.cp
+        return cp.state_rate * (np.exp((cp.f0 - psi) * cp.inv_b) - V * cp.inv_V0)
 
 
 def y0(ctx):
     """Compute initial condition for parameters set in context.
        Note: Initial displacement is zero.
 
-    :param ctx: Context
+    :param ctx: Context; for stacked parameters the result is a batch (K, 2 Nf)
     """
-    Nf = len(ctx.map)
-    y0 = np.zeros((2 * Nf, ))
-    for f in range(Nf):
-        y0[2 * f + 1] = ctx.psi0(f)
+    psi0 = ctx.psi0()
+    y0 = np.zeros(psi0.shape[:-1] + (2 * psi0.shape[-1], ))
+    y0[..., 1::2] = psi0
     return y0
 
 
-def F(t, y, ctx, callback=None):
+def F(t, y, ctx, callback=None, out=None):
     """Evaluate right-hand side of the SEAS ODE. The state vector y interleaves displacement
        and psi variable in the following way:
        [S_0, psi_0, S_1, psi_1, ..., S_{N_f}, psi_{N_f}],
-       where N_f is the number of fault elements.
+       where N_f is the number of fault elements. A batch of K states of shape (K, 2 N_f)
+       is evaluated at once, e.g. with a Context from Context.with_params holding stacked
+       parameters.
+       If enabled with Context.profile, counters and phase times are recorded in ctx.stats.
 
     :param t: Time
     :param y: State vector according to solve_ivp (not to be confused with state variable psi).
     :param ctx: Context
     :param callback: Callback with signature (t, S, V, psi, tau)
+    :param out: Optional output array of the same shape as y; a new one is allocated if None
     """
-    tau = ctx.traction(t, y[::2])
-    Nf = y.shape[0] // 2
-    fy = np.ndarray(y.shape)
-    for f in range(Nf):
-        psi = y[2 * f + 1]
-        V = ctx.slip_rate(f, tau[f], psi)
-        fy[2 * f] = V
-        fy[2 * f + 1] = ctx.state_law(f, V, psi)
+    S = y[..., ::2]
+    psi = y[..., 1::2]
+    start = time.perf_counter()
+    tau = ctx.traction(t, S)
+    t1 = time.perf_counter()
+    fy = np.empty(y.shape) if out is None else out
+    V, info = ctx.slip_rates(tau, psi)
+    fy[..., ::2] = V
+    t2 = time.perf_counter()
+    fy[..., 1::2] = ctx.state_law(slice(None), V, psi)
+    t3 = time.perf_counter()
     if callback is not None:
-        callback(t,y[::2],fy[::2],y[1::2],tau)
+        callback(t, S, fy[..., ::2], psi, tau)
+    if ctx.stats is not None:
+        ctx.stats.add_rhs(info, t1 - start, t2 - t1, t3 - t2,
+                          None if callback is None else time.perf_counter() - t3)
     return fy
+
+
+def jacobian(t, y, ctx, sparse=False, drop_tol=0.0):
+    """Evaluate the Jacobian dF/dy of the SEAS right-hand side.
+
+       With C(V, tau, psi) = tau + f(V, psi) + eta V = 0 the implicit function theorem gives
+       dV/dtau = -1 / (f_V + eta) and dV/dpsi = -f_psi / (f_V + eta). Since tau depends
+       linearly on S via the fault traction operator K (dtau/dS = K), the blocks are
+       dV/dS = diag(dV/dtau) K,          dV/dpsi = diag(dV/dpsi),
+       dpsi'/dS = g_V diag(dV/dtau) K,   dpsi'/dpsi = diag(g_psi + g_V dV/dpsi),
+       where g is the ageing law. Rows and columns interleave S and psi like y.
+       Without precomputed K (see Context), K is computed on the first call and kept in the
+       Context.
+
+    :param t: Time
+    :param y: State vector (see F)
+    :param ctx: Context
+    :param sparse: Return a block-sparse matrix (scipy.sparse.bsr_matrix with 2x2 blocks)
+                   instead of a dense array
+    :param drop_tol: Only for sparse: drop blocks where |K_fg| < drop_tol * max_g |K_fg|
+                     (off-diagonal). The result is then an approximate Jacobian, which is
+                     sufficient for the Newton iterations of implicit methods.
+    """
+    S = y[::2]
+    psi = y[1::2]
+    if ctx.K is not None:
+        K = ctx.K if ctx.mu_scale is None else ctx.mu_scale * ctx.K
+    else:
+        # Solved once per Context (and shared by with_params, which keeps A and B)
+        if ctx._jacobian_op is None:
+            ctx._jacobian_op = ctx._fault_solve()
+        K = (0.5 * ctx.cp.mu) * ctx._jacobian_op
+    tau = ctx.traction(t, S)
+    V, info = ctx.slip_rates(tau, psi)
+    if ctx.stats is not None:
+        ctx.stats.ntraction += 1
+        ctx.stats.add_solver_info(info)
+    cp = ctx.cp
+    a = ctx.vp.a
+
+    c = np.exp(psi * ctx.vp.inv_a) / (2.0 * cp.V0)
+    z = V * c
+    f_V = cp.sn * a * c / np.hypot(1.0, z)
+    f_psi = cp.sn * z / np.hypot(1.0, z)
+    dV_dtau = -1.0 / (f_V + cp.eta)
+    dV_dpsi = f_psi * dV_dtau
+    g_V = -cp.state_rate * cp.inv_V0
+    g_psi = -cp.state_rate * cp.inv_b * np.exp((cp.f0 - psi) * cp.inv_b)
+
+    Nf = S.shape[0]
+    if not sparse:
+        J = np.zeros((2 * Nf, 2 * Nf))
+        J[::2, ::2] = dV_dtau[:, np.newaxis] * K
+        J[1::2, ::2] = g_V * J[::2, ::2]
+        diag = np.arange(Nf)
+        J[2 * diag, 2 * diag + 1] = dV_dpsi
+        J[2 * diag + 1, 2 * diag + 1] = g_psi + g_V * dV_dpsi
+        return J
+
+    absK = np.abs(K)
+    mask = absK >= drop_tol * absK.max(axis=1, keepdims=True)
+    np.fill_diagonal(mask, True)
+    rows, cols = np.nonzero(mask)
+    blocks = np.zeros((rows.shape[0], 2, 2))
+    blocks[:, 0, 0] = dV_dtau[rows] * K[rows, cols]
+    blocks[:, 1, 0] = g_V * blocks[:, 0, 0]
+    on_diag = rows == cols
+    blocks[on_diag, 0, 1] = dV_dpsi[rows[on_diag]]
+    blocks[on_diag, 1, 1] = g_psi[rows[on_diag]] + g_V * dV_dpsi[rows[on_diag]]
+    indptr = np.concatenate(([0], np.cumsum(mask.sum(axis=1))))
+    return bsr_matrix((blocks, cols, indptr), shape=(2 * Nf, 2 * Nf))
+
+
+def solve(ctx, t_span, y=None, method='BDF', sparse=False, drop_tol=0.0, **options):
+    """Integrate the SEAS ODE with an implicit method of solve_ivp using the analytic
+       Jacobian.
+
+    :param ctx: Context
+    :param t_span: Interval of integration (t0, tend) [s]
+    :param y: Initial state; y0(ctx) if None
+    :param method: 'BDF', 'Radau' or 'LSODA'
+    :param sparse: Pass the block-sparse Jacobian (not supported by LSODA)
+    :param drop_tol: See jacobian
+    :param options: Further options for scipy.integrate.solve_ivp (rtol, atol, t_eval, ...)
+    """
+    if method not in ('BDF', 'Radau', 'LSODA'):
+        raise ValueError('Unknown implicit method: {}'.format(method))
+    if sparse and method == 'LSODA':
+        raise ValueError('LSODA requires a dense Jacobian')
+    if y is None:
+        y = y0(ctx)
+    jac = lambda t, y: jacobian(t, y, ctx, sparse, drop_tol)
+    return solve_ivp(lambda t, y: F(t, y, ctx), t_span, y, method=method, jac=jac,
+                     **options)
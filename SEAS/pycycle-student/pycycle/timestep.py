@@ -0,0 +1,310 @@
+import time
+import numpy as np
+from .seas import F, y0
+
+
+class Tableau:
+    """Butcher tableau of an embedded explicit Runge-Kutta pair with the
+       first-same-as-last (FSAL) property."""
+    def __init__(self, c, A, b, b_hat, order):
+        """Constructor.
+
+        :param c: Nodes
+        :param A: Runge-Kutta matrix (lower triangular, list of rows)
+        :param b: Weights of the propagated solution
+        :param b_hat: Weights of the embedded solution
+        :param order: Order of the propagated solution
+        """
+        self.c = np.array(c)
+        self.A = [np.array(row) for row in A]
+        self.b = np.array(b)
+        self.E = self.b - np.array(b_hat)
+        self.order = order
+
+    def __len__(self):
+        """Number of stages."""
+        return len(self.c)
+
+
+# Dormand-Prince 5(4), as RK45 in scipy.integrate.solve_ivp
+RK45 = Tableau(
+    c=[0, 1 / 5, 3 / 10, 4 / 5, 8 / 9, 1, 1],
+    A=[[], [1 / 5], [3 / 40, 9 / 40], [44 / 45, -56 / 15, 32 / 9],
+       [19372 / 6561, -25360 / 2187, 64448 / 6561, -212 / 729],
+       [9017 / 3168, -355 / 33, 46732 / 5247, 49 / 176, -5103 / 18656],
+       [35 / 384, 0, 500 / 1113, 125 / 192, -2187 / 6784, 11 / 84]],
+    b=[35 / 384, 0, 500 / 1113, 125 / 192, -2187 / 6784, 11 / 84, 0],
+    b_hat=[5179 / 57600, 0, 7571 / 16695, 393 / 640, -92097 / 339200, 187 / 2100, 1 / 40],
+    order=5)
+
+# Bogacki-Shampine 3(2), as RK23 in scipy.integrate.solve_ivp
+RK23 = Tableau(c=[0, 1 / 2, 3 / 4, 1],
+               A=[[], [1 / 2], [0, 3 / 4], [2 / 9, 1 / 3, 4 / 9]],
+               b=[2 / 9, 1 / 3, 4 / 9, 0],
+               b_hat=[7 / 24, 1 / 4, 1 / 3, 1 / 8],
+               order=3)
+
+METHODS = {'RK45': RK45, 'RK23': RK23}
+
+
+class Result:
+    """Outcome of Integrator.run."""
+    def __init__(self, t, y, status, message, nsteps, nrejected, nfev):
+        """Constructor.
+
+        :param t: Final time
+        :param y: Final state
+        :param status: 0 if tend was reached, 1 if max_steps was reached,
+                       -1 if the step size dropped below min_step (or to zero),
+                       -2 if the error estimate was not finite (e.g. F returned NaN)
+        :param message: Description of status
+        :param nsteps: Number of accepted steps
+        :param nrejected: Number of rejected steps
+        :param nfev: Number of right-hand side evaluations
+        """
+        self.t = t
+        self.y = y
+        self.status = status
+        self.message = message
+        self.nsteps = nsteps
+        self.nrejected = nrejected
+        self.nfev = nfev
+
+    @property
+    def success(self):
+        return self.status >= 0
+
+    def __repr__(self):
+        return 'Result(t={}, status={}, nsteps={}, nrejected={}, nfev={})'.format(
+            self.t, self.status, self.nsteps, self.nrejected, self.nfev)
+
+
+class Integrator:
+    """Adaptive embedded Runge-Kutta integrator for the SEAS ODE (see seas.F).
+
+       The error is controlled separately on slip and state, i.e. the step is accepted
+       if both scaled RMS error norms are at most one. Hooks are only called for
+       accepted steps and receive (t, S, V, psi, tau), like the callback of seas.F,
+       using the last (FSAL) stage, so monitoring needs no extra right-hand side
+       evaluations. A batch of states (K, 2 Nf) (see seas.F) is integrated in lockstep,
+       i.e. with common steps controlled by the error norms over all members.
+       Steps and the time spent in hooks are recorded in ctx.stats if profiling is
+       enabled (see seas.Context.profile).
+    """
+    def __init__(self,
+                 ctx,
+                 y,
+                 t=0.0,
+                 method='RK45',
+                 rtol=1e-7,
+                 atol=1e-7,
+                 rtol_psi=None,
+                 atol_psi=None,
+                 first_step=None,
+                 min_step=0.0,
+                 max_step=np.inf,
+                 max_slip=None,
+                 safety=0.9,
+                 min_factor=0.2,
+                 max_factor=10.0):
+        """Constructor.
+
+        :param ctx: Context
+        :param y: Initial state vector (see seas.F)
+        :param t: Initial time [s]
+        :param method: 'RK45' (Dormand-Prince) or 'RK23' (Bogacki-Shampine)
+        :param rtol: Relative tolerance on slip
+        :param atol: Absolute tolerance on slip [m]
+        :param rtol_psi: Relative tolerance on state (rtol if None)
+        :param atol_psi: Absolute tolerance on state (atol if None)
+        :param first_step: Initial step size [s]; estimated if None
+        :param min_step: Minimum step size [s]; integration stops with status -1 below it
+        :param max_step: Maximum step size [s]
+        :param max_slip: Bound the step such that at most max_slip [m] of slip accumulates
+                         at the current maximum slip rate, i.e. h <= max_slip / max(|V|)
+        :param safety: Safety factor of the step size controller
+        :param min_factor: Minimum factor by which the step size may change
+        :param max_factor: Maximum factor by which the step size may change
+        """
+        if method not in METHODS:
+            raise ValueError('Unknown Runge-Kutta method: {}'.format(method))
+        self.ctx = ctx
+        self.tableau = METHODS[method]
+        self.t = t
+        self.y = np.array(y, dtype=float)
+        self.rtol = rtol
+        self.atol = atol
+        self.rtol_psi = rtol if rtol_psi is None else rtol_psi
+        self.atol_psi = atol if atol_psi is None else atol_psi
+        self.min_step = min_step
+        self.max_step = max_step
+        self.max_slip = max_slip
+        self.safety = safety
+        self.min_factor = min_factor
+        self.max_factor = max_factor
+        self.hooks = []
+        self.nsteps = 0
+        self.nrejected = 0
+        self.nfev = 0
+        self.failure = None
+
+        self.k = np.empty((len(self.tableau), ) + self.y.shape)
+        self.tau = None
+        self.k[0] = self._rhs(self.t, self.y, self.k[0], capture=True)
+        self.h = self._initial_step() if first_step is None else first_step
+
+    def add_hook(self, hook):
+        """Register a function hook(t, S, V, psi, tau) called after every accepted step
+           (and once for the initial state when run starts)."""
+        self.hooks.append(hook)
+
+    def _capture(self, t, S, V, psi, tau):
+        self.tau = tau
+
+    def _rhs(self, t, y, out, capture=False):
+        self.nfev += 1
+        return F(t, y, self.ctx, self._capture if capture else None, out)
+
+    def _error_norm(self, y, y_new, err):
+        """Maximum of the scaled RMS norms of the error in slip and state."""
+        scale = np.maximum(np.abs(y), np.abs(y_new))
+        e_S = err[..., ::2] / (self.atol + self.rtol * scale[..., ::2])
+        e_psi = err[..., 1::2] / (self.atol_psi + self.rtol_psi * scale[..., 1::2])
+        return max(np.sqrt(np.mean(e_S**2)), np.sqrt(np.mean(e_psi**2)))
+
+    def _initial_step(self):
+        """Initial step size estimate (Hairer, Norsett, Wanner, Sec. II.4)."""
+        scale = np.empty(self.y.shape)
+        scale[..., ::2] = self.atol + self.rtol * np.abs(self.y[..., ::2])
+        scale[..., 1::2] = self.atol_psi + self.rtol_psi * np.abs(self.y[..., 1::2])
+        d0 = np.sqrt(np.mean((self.y / scale)**2))
+        d1 = np.sqrt(np.mean((self.k[0] / scale)**2))
+        h0 = 1e-6 if d0 < 1e-5 or d1 < 1e-5 else 0.01 * d0 / d1
+        h0 = min(h0, self.max_step)
+        f1 = self._rhs(self.t + h0, self.y + h0 * self.k[0], np.empty(self.y.shape))
+        d2 = np.sqrt(np.mean(((f1 - self.k[0]) / scale)**2)) / h0
+        if max(d1, d2) <= 1e-15:
+            h1 = max(1e-6, h0 * 1e-3)
+        else:
+            h1 = (0.01 / max(d1, d2))**(1.0 / self.tableau.order)
+        return min(100 * h0, h1, self.max_step)
+
+    def _step_limit(self):
+        h_max = self.max_step
+        if self.max_slip is not None:
+            V_max = np.abs(self.k[0][..., ::2]).max()
+            if V_max > 0:
+                h_max = min(h_max, self.max_slip / V_max)
+        return h_max
+
+    def step(self, tend=np.inf):
+        """Perform one accepted step, not stepping beyond tend.
+
+        :param tend: End time [s]
+        :return: True if a step was accepted; False if the integration failed, with
+                 (status, message) of the failure (see Result) in self.failure
+        """
+        tab = self.tableau
+        exponent = -1.0 / tab.order
+        rejected = False
+        while True:
+            h = min(self.h, self._step_limit())
+            if h < self.min_step or h <= 0.0 or self.t + h == self.t:
+                self.failure = (-1, 'Step size dropped below min_step.')
+                return False
+            h = min(h, tend - self.t)
+            for i in range(1, len(tab)):
+                dy = np.tensordot(tab.A[i], self.k[:i], axes=1)
+                self.k[i] = self._rhs(self.t + tab.c[i] * h, self.y + h * dy, self.k[i],
+                                      capture=(i == len(tab) - 1))
+            y_new = self.y + h * np.tensordot(tab.b, self.k, axes=1)
+            err = self._error_norm(self.y, y_new, h * np.tensordot(tab.E, self.k, axes=1))
+            if not np.isfinite(err):
+                self.failure = (-2, 'Error estimate is not finite at t = {}.'.format(self.t))
+                return False
+            if err <= 1.0:
+                factor = self.max_factor if err == 0 else min(
+                    self.max_factor, self.safety * err**exponent)
+                self.h = h * (min(factor, 1.0) if rejected else factor)
+                self.t += h
+                self.y = y_new
+                self.k[0] = self.k[-1]
+                self.nsteps += 1
+                if self.ctx.stats is not None:
+                    self.ctx.stats.nsteps += 1
+                return True
+            self.nrejected += 1
+            if self.ctx.stats is not None:
+                self.ctx.stats.nrejected += 1
+            rejected = True
+            self.h = h * max(self.min_factor, self.safety * err**exponent)
+
+    def state(self):
+        """State needed to continue the integration (dict of arrays), see restore."""
+        return {
+            't': np.array(self.t),
+            'y': self.y.copy(),
+            'h': np.array(self.h),
+            'counters': np.array([self.nsteps, self.nrejected, self.nfev])
+        }
+
+    def restore(self, state):
+        """Continue from state (see state) in place of the current state."""
+        t = float(state['t'])
+        y = np.array(state['y'], dtype=float)
+        if t != self.t or not np.array_equal(y, self.y):
+            self.t = t
+            self.y = y
+            self.k[0] = self._rhs(self.t, self.y, self.k[0], capture=True)
+        self.h = float(state['h'])
+        self.nsteps, self.nrejected, nfev = (int(c) for c in state['counters'])
+        self.nfev += nfev
+
+    def _call_hooks(self):
+        if self.hooks:
+            S = self.y[..., ::2]
+            V = self.k[0][..., ::2].copy()
+            psi = self.y[..., 1::2]
+            start = time.perf_counter()
+            for hook in self.hooks:
+                hook(self.t, S, V, psi, self.tau)
+            if self.ctx.stats is not None:
+                self.ctx.stats.add_time('hooks', time.perf_counter() - start)
+
+    def run(self, tend, max_steps=None):
+        """Integrate until tend or until max_steps accepted steps were taken.
+
+        :param tend: End time [s]
+        :param max_steps: Maximum number of accepted steps in this call (unbounded if None)
+        :return: Result
+        """
+        self._call_hooks()
+        steps = 0
+        while self.t < tend:
+            if max_steps is not None and steps >= max_steps:
+                return self._result(1, 'Maximum number of steps reached.')
+            if not self.step(tend):
+                return self._result(*self.failure)
+            steps += 1
+            self._call_hooks()
+        return self._result(0, 'End time reached.')
+
+    def _result(self, status, message):
+        return Result(self.t, self.y, status, message, self.nsteps, self.nrejected, self.nfev)
+
+
+def integrate(ctx, t_span, y=None, callback=None, max_steps=None, **options):
+    """Integrate the SEAS ODE with an adaptive embedded Runge-Kutta pair.
+
+    :param ctx: Context
+    :param t_span: Interval of integration (t0, tend) [s]
+    :param y: Initial state; seas.y0(ctx) if None
+    :param callback: Called with (t, S, V, psi, tau) after every accepted step, e.g. a Monitor
+    :param max_steps: Maximum number of accepted steps
+    :param options: Further options for Integrator (method, rtol, atol, max_slip, ...)
+    :return: Result
+    """
+    integrator = Integrator(ctx, y0(ctx) if y is None else y, t_span[0], **options)
+    if callback is not None:
+        integrator.add_hook(callback)
+    return integrator.run(t_span[1], max_steps)
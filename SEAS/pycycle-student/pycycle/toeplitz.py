@@ -0,0 +1,269 @@
+import numpy as np
+from scipy.fft import rfft, irfft
+from scipy.linalg import lu_factor, lu_solve
+from scipy.sparse.linalg import LinearOperator
+from . import green
+from .bem import assemble, rhs_op
+from .krylov import KrylovSolver
+from .mesh import as_mesh
+
+# On a straight, uniformly tessellated line the whole-space kernels only depend on the offset
+# i - j between collocation point i and element j (Toeplitz). The image term of the
+# free-surface kernels only depends on i + j if the line is perpendicular to the free
+# surface (Hankel). The free-surface kernels are split into whole-space and image part with:
+_whole_space = {
+    green.G: green.G,
+    green.G_fs: green.G,
+    green.dG_dn: green.dG_dn,
+    green.dG_fs_dn: green.dG_dn,
+}
+
+
+def uniform_run(mesh, indices, rtol=1e-10):
+    """Check whether the elements mesh[indices] tessellate a straight line uniformly,
+       i.e. all are LineElements with the same h and n and each starts where the
+       previous one ends.
+
+    :param mesh: Mesh or list of line elements
+    :param indices: Element indices in order along the line
+    :param rtol: Tolerance relative to the element length
+    """
+    run = as_mesh(mesh)[np.asarray(indices, dtype=int)]
+    if len(run) == 0 or not np.all(run.line):
+        return False
+    a, h, n = run.a, run.h, run.n
+    tol = rtol * np.linalg.norm(h[0])
+    return bool(
+        np.all(np.abs(h - h[0]) <= tol) and np.all(np.abs(n - n[0]) <= rtol)
+        and np.all(np.abs(a[1:] - a[:-1] - h[0]) <= tol))
+
+
+def perpendicular(mesh, indices, rtol=1e-10):
+    """Check whether the elements mesh[indices] of a uniform run (see uniform_run) are
+       perpendicular to the free surface x_1 = 0, where image terms are Hankel.
+
+    :param mesh: Mesh or list of line elements
+    :param indices: Element indices of a uniform run
+    :param rtol: Tolerance relative to the element length
+    """
+    h = as_mesh(mesh)[np.asarray(indices, dtype=int)].h[0]
+    return bool(np.abs(h[0]) <= rtol * np.linalg.norm(h))
+
+
+def _has_image(*kernels):
+    return any(_whole_space.get(K, K) is not K for K in kernels)
+
+
+def detect(mesh, G=None, dG_dn=None):
+    """Check whether build applies, i.e. whether the fault elements of mesh form a uniform
+       straight run (see uniform_run) which, if G or dG_dn has an image term (e.g. G_fs), is
+       perpendicular to the free surface.
+
+    :param mesh: Mesh or list of line elements
+    :param G: Green's function (not checked if None)
+    :param dG_dn: Directional derivative of Green's function (not checked if None)
+    """
+    mesh = as_mesh(mesh)
+    fault = mesh.fault_indices()
+    if not uniform_run(mesh, fault):
+        return False
+    return not _has_image(G, dG_dn) or perpendicular(mesh, fault)
+
+
+def _spectrum(c, r):
+    """Spectrum of the circulant embedding (size 2n) of the Toeplitz matrix with first
+       column c and first row r."""
+    return rfft(np.concatenate((c, [0.0], r[:0:-1])))
+
+
+class ToeplitzHankel:
+    """Matrix T + H (n x n) with T[i, j] = t(i - j) and H[i, j] = h[i + j], stored by its
+       generating vectors. Products are computed in O(n log n) via FFT."""
+    def __init__(self, c, r, h=None):
+        """Constructor.
+
+        :param c: First column of T (size n)
+        :param r: First row of T (size n, r[0] is ignored)
+        :param h: Generating vector of H (size 2n - 1) or None if H = 0
+        """
+        self.c = np.asarray(c, dtype=float)
+        self.r = np.asarray(r, dtype=float)
+        self.h = None if h is None else np.asarray(h, dtype=float)
+        n = self.c.shape[0]
+        self.shape = (n, n)
+        self._T = _spectrum(self.c, self.r)
+        # H x = T_h (J x) with the reversal J and T_h[i, j] = h[i - j + n - 1]
+        self._H = None if h is None else _spectrum(self.h[n - 1:], self.h[n - 1::-1])
+
+    @property
+    def nbytes(self):
+        """Memory of generating vectors and spectra in bytes."""
+        return sum(v.nbytes for v in (self.c, self.r, self.h, self._T, self._H)
+                   if v is not None)
+
+    def matvec(self, x):
+        """Compute self @ x for x of shape (n,) or (n, k)."""
+        x = np.asarray(x, dtype=float)
+        n = self.shape[0]
+        shape = (-1, ) + (1, ) * (x.ndim - 1)
+        Y = self._T.reshape(shape) * rfft(x, 2 * n, axis=0)
+        if self._H is not None:
+            Y += self._H.reshape(shape) * rfft(x[::-1], 2 * n, axis=0)
+        return irfft(Y, 2 * n, axis=0)[:n]
+
+    __matmul__ = matvec
+
+    def to_dense(self):
+        """Expand to a dense array (for testing)."""
+        n = self.shape[0]
+        k = np.subtract.outer(np.arange(n), np.arange(n))
+        D = np.where(k >= 0, self.c[np.abs(k)], self.r[np.abs(k)])
+        if self.h is not None:
+            D += self.h[np.add.outer(np.arange(n), np.arange(n))]
+        return D
+
+    def entries(self, rows, cols):
+        """Entries self[rows[i], cols[j]] for index arrays rows, cols."""
+        k = np.subtract.outer(rows, cols)
+        D = np.where(k >= 0, self.c[np.abs(k)], self.r[np.abs(k)])
+        if self.h is not None:
+            D += self.h[np.add.outer(rows, cols)]
+        return D
+
+    def preconditioner(self):
+        """Inverse of T. Chan's optimal circulant approximation of T as LinearOperator."""
+        n = self.shape[0]
+        k = np.arange(n)
+        t_neg = np.concatenate(([0.0], self.r[:0:-1]))  # t(k - n) for k = 0, ..., n - 1
+        circ = ((n - k) * self.c + k * t_neg) / n
+        eig = rfft(circ)
+        return LinearOperator(self.shape, matvec=lambda x: irfft(rfft(x) / eig, n))
+
+
+def generate(entries, whole_space, indices, check=16, rtol=1e-8, seed=0):
+    """Extract the generating vectors of the block entries(indices, indices).
+
+    :param entries: Function (rows, cols) -> dense block of the operator
+    :param whole_space: Function (rows, cols) -> dense block of its whole-space part, or None
+                        if the operator is Toeplitz
+    :param indices: Element indices of a uniform run (see uniform_run)
+    :param check: The structure is verified on a random check x check sub-block
+    :param rtol: Tolerance of the verification relative to the largest generating entry
+    :param seed: Seed for choosing the sub-block
+    :return: ToeplitzHankel
+    """
+    f = np.asarray(indices, dtype=int)
+    first, last = f[:1], f[-1:]
+    if whole_space is None:
+        c, r, h = entries(f, first)[:, 0], entries(first, f)[0], None
+    else:
+        c, r = whole_space(f, first)[:, 0], whole_space(first, f)[0]
+        h = np.concatenate((entries(f, first)[:, 0] - c,
+                            (entries(last, f)[0] - whole_space(last, f)[0])[1:]))
+    T = ToeplitzHankel(c, r, h)
+
+    rng = np.random.default_rng(seed)
+    k = np.sort(rng.choice(f.shape[0], min(check, f.shape[0]), replace=False))
+    scale = max(np.abs(c).max(), np.abs(r).max(), 0.0 if h is None else np.abs(h).max())
+    if np.abs(entries(f[k], f[k]) - T.entries(k, k)).max() > rtol * scale:
+        raise ValueError('Operator is not Toeplitz-plus-Hankel on the given elements')
+    return T
+
+
+class FaultOperator:
+    """Fault traction operator for meshes whose fault is a uniform straight run.
+
+       With fault (f) and other (o) elements, A x = b is solved by eliminating the few
+       other elements, i.e. by solving the Schur complement system
+       (A_ff - A_fo A_oo^{-1} A_of) x_f = b_f - A_fo A_oo^{-1} b_o with a Krylov method,
+       where A_ff is applied by FFT and preconditioned by a circulant approximation.
+       Only B_ff and B_of are needed as the displacement jump vanishes off the fault.
+       Memory and cost per product are O(Nf log Nf + Nf No).
+    """
+    def __init__(self, A_entries, B_entries, A_whole_space, B_whole_space, fault, other,
+                 tol=1e-10, maxiter=None, krylov='gmres'):
+        """Constructor.
+
+        :param A_entries: Function (rows, cols) -> dense block of A
+        :param B_entries: Function (rows, cols) -> dense block of B
+        :param A_whole_space: Whole-space part of A_entries or None, see generate
+        :param B_whole_space: Whole-space part of B_entries or None, see generate
+        :param fault: Indices of the fault elements (a uniform run)
+        :param other: Indices of all remaining elements
+        :param tol: Relative residual tolerance of the Krylov solver
+        :param maxiter: Maximum number of iterations (GMRES: restarts)
+        :param krylov: Krylov method, see krylov.KrylovSolver
+        """
+        self.fault = np.asarray(fault, dtype=int)
+        self.other = np.asarray(other, dtype=int)
+        self.A_ff = generate(A_entries, A_whole_space, self.fault)
+        self.B_ff = generate(B_entries, B_whole_space, self.fault)
+        Nf = self.fault.shape[0]
+        self.shape = (Nf, Nf)
+        if self.other.shape[0] > 0:
+            self.A_fo = A_entries(self.fault, self.other)
+            self.B_of = B_entries(self.other, self.fault)
+            self.lu_oo = lu_factor(A_entries(self.other, self.other))
+            self.W = lu_solve(self.lu_oo, A_entries(self.other, self.fault))
+        else:
+            self.A_fo = self.B_of = self.W = self.lu_oo = None
+        self.solver = KrylovSolver(LinearOperator(self.shape, matvec=self.schur_matvec),
+                                   self.A_ff.preconditioner(), krylov, tol, maxiter)
+
+    @property
+    def nbytes(self):
+        """Memory of the stored operators in bytes."""
+        dense = (self.A_fo, self.B_of, self.W) + ((self.lu_oo[0], ) if self.lu_oo else ())
+        return self.A_ff.nbytes + self.B_ff.nbytes + sum(
+            D.nbytes for D in dense if D is not None)
+
+    def schur_matvec(self, x):
+        """Product with the Schur complement A_ff - A_fo A_oo^{-1} A_of."""
+        y = self.A_ff @ x
+        if self.W is not None:
+            y -= self.A_fo @ (self.W @ x)
+        return y
+
+    def __call__(self, g, x0=None):
+        """Compute (A^{-1} B g)[fault] for a displacement jump g which vanishes off the fault.
+
+        :param g: On-fault values (Nf,) or (Nf, k)
+        :param x0: Initial guess for the result, e.g. the previous solution
+        """
+        g = np.asarray(g, dtype=float)
+        b = self.B_ff @ g
+        if self.W is not None:
+            b -= self.A_fo @ lu_solve(self.lu_oo, self.B_of @ g)
+        return self.solver.solve(b, x0)
+
+
+def build(G, dG_dn, mesh, method='quad', tol=1e-10, maxiter=None, krylov='gmres'):
+    """Build the FFT-based fault traction operator.
+
+    :param G: Green's function
+    :param dG_dn: Directional derivative of Green's function
+    :param mesh: Mesh or list of line elements; the fault elements must form a uniform run,
+                 perpendicular to the free surface for free-surface kernels (see detect)
+    :param method: Assembly method ('quad' or 'gauss'), see bem.assemble
+    :param tol: Relative residual tolerance of the Krylov solver
+    :param maxiter: Maximum number of iterations (GMRES: restarts)
+    :param krylov: Krylov method ('gmres' or 'bicgstab')
+    :return: FaultOperator
+    """
+    mesh = as_mesh(mesh)
+    fault = mesh.fault_indices()
+    if not uniform_run(mesh, fault):
+        raise ValueError('Fault elements do not tessellate a straight line uniformly')
+    if _has_image(G, dG_dn) and not perpendicular(mesh, fault):
+        raise ValueError('Fault elements are not perpendicular to the free surface')
+    other = np.setdiff1d(np.arange(len(mesh)), fault)
+
+    def entries(op, K):
+        return lambda r, c: op(K, mesh, method=method, rows=r, cols=c)
+
+    G_ws = _whole_space.get(G)
+    dG_dn_ws = _whole_space.get(dG_dn)
+    return FaultOperator(entries(assemble, G), entries(rhs_op, dG_dn),
+                         None if G_ws in (None, G) else entries(assemble, G_ws),
+                         None if dG_dn_ws in (None, dG_dn) else entries(rhs_op, dG_dn_ws),
+                         fault, other, tol, maxiter, krylov)
@@ -0,0 +1,36 @@
+import numpy as np
+import unittest
+from scipy.integrate import quad
+
+import pycycle.green as green
+from pycycle.analytic import closed_form
+from pycycle.mesh import LineElement
+
+
+class TestAnalytic(unittest.TestCase):
+    def setUp(self):
+        normal = (2, 1)
+        self.line = LineElement((1, -1), (2, -3), normal, False)
+        self.points = np.array([(0.5, -0.5), (1.5, -2), (1, -1), (4, -2), (3, -5)])
+
+    def numeric(self, K, x):
+        f = lambda t: K(x, self.line.xi(t)) * self.line.factor(t)
+        return quad(f, -1, 0)[0] + quad(f, 0, 1)[0]
+
+    def test_closed_form(self):
+        n = self.line.n
+        kernels = [(green.G, lambda x, xi: green.G(x, xi)),
+                   (green.G_fs, lambda x, xi: green.G_fs(x, xi)),
+                   (green.dG_dn, lambda x, xi: green.dG_dn(x, xi, n)),
+                   (green.dG_fs_dn, lambda x, xi: green.dG_fs_dn(x, xi, n))]
+        for K, K_n in kernels:
+            integral = closed_form(K)(self.points, self.line.a, self.line.h, n)
+            for x, value in zip(self.points, integral):
+                self.assertAlmostEqual(value, self.numeric(K_n, x))
+
+    def test_unknown_kernel(self):
+        self.assertIsNone(closed_form(lambda x, xi: 0.0))
+
+
+if __name__ == '__main__':
+    unittest.main()
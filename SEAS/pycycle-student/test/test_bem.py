@@ -2,8 +2,8 @@ import numpy as np
 import unittest
 
 import pycycle.green as green
-from pycycle.mesh import InfiniteLineElement, tessellate_line
-from pycycle.bem import assemble
+from pycycle.mesh import InfiniteLineElement, line_normal, tessellate_line
+from pycycle.bem import FAR, INFINITE, MID, NEAR, SELF, assemble, plan, rhs_op
 
 
 class TestBEM(unittest.TestCase):
@@ -17,7 +17,6 @@ class TestBEM(unittest.TestCase):
         self.mesh2 += [InfiniteLineElement(self.b, normal)]
 
     def test_assemble1(self):
-        A = assemble(green.G, self.mesh1)
         A_ref = np.array([[
             0.09639054133451744, 0.05002654593052053, 0.029551160769275796,
             0.017976064197639696, 0.009824422016652375, 0.003519722760060333,
@@ -65,16 +64,18 @@ class TestBEM(unittest.TestCase):
                               0.017976064197639696, 0.029551160769275796,
                               0.05002654593052053, 0.09639054133451744
                           ]])
-        self.assertEqual(A.shape[0], A.shape[1])
-        self.assertEqual(A.shape[0], A_ref.shape[0])
-        self.assertEqual(A.shape[1], A_ref.shape[1])
-        M = A_ref.shape[1]
-        for i in range(M):
-            for j in range(M):
-                self.assertAlmostEqual(A[i, j], A_ref[i, j])
+        for method, analytic in ((m, a) for m in ('quad', 'gauss') for a in (False, True)):
+            with self.subTest(method=method, analytic=analytic):
+                A = assemble(green.G, self.mesh1, method=method, analytic=analytic)
+                self.assertEqual(A.shape[0], A.shape[1])
+                self.assertEqual(A.shape[0], A_ref.shape[0])
+                self.assertEqual(A.shape[1], A_ref.shape[1])
+                M = A_ref.shape[1]
+                for i in range(M):
+                    for j in range(M):
+                        self.assertAlmostEqual(A[i, j], A_ref[i, j])
 
     def test_assemble2(self):
-        A = assemble(green.G_fs, self.mesh2)
         A_ref = np.array([[
             -0.41079608885528335, -0.22188729466733317, -0.2704292017249441,
             -1.9513023052819096
@@ -91,13 +92,52 @@ class TestBEM(unittest.TestCase):
                               -0.8326483007021639, -0.1401277797332982,
                               0.002520986278272498, -1.4456438938669798
                           ]])
-        self.assertEqual(A.shape[0], A.shape[1])
-        self.assertEqual(A.shape[0], A_ref.shape[0])
-        self.assertEqual(A.shape[1], A_ref.shape[1])
-        M = A_ref.shape[1]
-        for i in range(M):
-            for j in range(M):
-                self.assertAlmostEqual(A[i, j], A_ref[i, j])
+        for method, analytic in ((m, a) for m in ('quad', 'gauss') for a in (False, True)):
+            with self.subTest(method=method, analytic=analytic):
+                A = assemble(green.G_fs, self.mesh2, method=method, analytic=analytic)
+                self.assertEqual(A.shape[0], A.shape[1])
+                self.assertEqual(A.shape[0], A_ref.shape[0])
+                self.assertEqual(A.shape[1], A_ref.shape[1])
+                M = A_ref.shape[1]
+                for i in range(M):
+                    for j in range(M):
+                        self.assertAlmostEqual(A[i, j], A_ref[i, j])
+
+    def test_rhs_op(self):
+        for dG_dn, mesh in ((green.dG_dn, self.mesh1), (green.dG_fs_dn, self.mesh2)):
+            B_ref = rhs_op(dG_dn, mesh, analytic=False)
+            for method in ('quad', 'gauss'):
+                B = rhs_op(dG_dn, mesh, method=method)
+                M = B_ref.shape[1]
+                for i in range(M):
+                    for j in range(M):
+                        self.assertAlmostEqual(B[i, j], B_ref[i, j])
+
+    def test_plan(self):
+        x = np.array([[1.25, 1.25], [1.1, 1.3], [3.0, 3.0], [5.0, 5.0]])
+        classes, theta = plan(x, self.mesh2)
+        self.assertTrue(np.array_equal(classes, [[INFINITE, SELF, NEAR, INFINITE],
+                                                 [INFINITE, NEAR, NEAR, INFINITE],
+                                                 [INFINITE, MID, MID, INFINITE],
+                                                 [INFINITE, FAR, FAR, INFINITE]]))
+        self.assertTrue(np.allclose(theta[:, 1], [0, -0.2, 0, 0]))
+        classes, _ = plan(self.mesh1.collocation_points(), self.mesh1, green.kernel(green.G))
+        self.assertTrue(np.all(np.diag(classes) == SELF))
+
+    def test_planned_quadrature(self):
+        # bent fault at the free surface: self pairs of tilted elements, near pairs with the
+        # mirror image, and a far field ending in an infinite element
+        p0, p1, p2 = (5.0, 0.0), (10.0, 20.0), (20.0, 40.0)
+        n1 = line_normal(p0, p1, (1.0, 1.0))
+        n2 = line_normal(p1, p2, (1.0, 1.0))
+        mesh = tessellate_line(p0, p1, 0.8, n1, True) + tessellate_line(p1, p2, 4.0, n2)
+        mesh.append(InfiniteLineElement(p2, n2))
+        for op, K in ((assemble, green.G_fs), (rhs_op, green.dG_fs_dn)):
+            A_ref = op(K, mesh, method='quad', analytic=False)
+            for analytic in (False, True):
+                with self.subTest(op=op.__name__, analytic=analytic):
+                    A = op(K, mesh, method='gauss', analytic=analytic)
+                    self.assertTrue(np.allclose(A, A_ref, rtol=0, atol=1e-8))
 
 
 if __name__ == '__main__':
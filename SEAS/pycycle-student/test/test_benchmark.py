@@ -0,0 +1,34 @@
+import numpy as np
+import unittest
+
+from pycycle.benchmark import bench, compare, report, scaling
+
+
+class TestBenchmark(unittest.TestCase):
+    def test_bench(self):
+        results = bench(4.0, cases=('traction', 'F'), repeat=1)
+        self.assertEqual([r['case'] for r in results], ['traction', 'F'])
+        self.assertEqual(results[0]['Nf'], 10)
+        self.assertEqual(results[0]['operator'], 'dense')
+        self.assertEqual(results[0]['assembly'], 'gauss')
+        self.assertGreater(results[1]['time'], 0)
+        self.assertIn('Scaling', report({'results': results}))
+        with self.assertRaises(ValueError):
+            bench(4.0, cases=('solve', ))
+
+    def test_scaling(self):
+        N = np.array([100, 200, 400])
+        results = [{'case': 'F', 'N': int(n), 'time': 1e-6 * n**2} for n in N]
+        self.assertAlmostEqual(scaling(results)['F'], 2.0)
+        baseline = [dict(r, time=2 * r['time']) for r in results]
+        rows = compare(results, baseline[:2])
+        self.assertEqual([row[5] for row in rows], ['faster', 'faster'])
+        self.assertAlmostEqual(rows[0][4], 2.0)
+        other = [dict(r, cpus=64) for r in baseline]
+        with self.assertWarns(UserWarning) as context:
+            self.assertEqual(compare(results, other), [])
+        self.assertIn('cpus', str(context.warning))
+
+
+if __name__ == '__main__':
+    unittest.main()
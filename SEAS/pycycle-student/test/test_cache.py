@@ -0,0 +1,66 @@
+import numpy as np
+import os
+import tempfile
+import unittest
+
+import pycycle.green as green
+from pycycle.cache import OperatorCache, operator_key
+from pycycle.mesh import InfiniteLineElement, LineElement, tessellate_line
+from pycycle.seas import Context, ConstantParams, VariableParams
+
+
+class TestCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        a = np.array((0, 0.1))
+        b = np.array((0, 1))
+        normal = (-1, 0)
+        self.mesh = [LineElement((0, 0), a, normal, False)]
+        self.mesh += tessellate_line(a, b, 0.1, normal, True)
+        self.mesh += [InfiniteLineElement(b, normal)]
+        self.cp = ConstantParams(2.670, 3.464, 1e-9, 1e-6, 0.015, 0.014, 0.6, 50, 1e-9)
+        self.vp = VariableParams(self.mesh, lambda x: 0.10, lambda x: -20)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_key(self):
+        key = operator_key(self.mesh, green.G_fs, green.dG_fs_dn, 'quad')
+        self.assertEqual(key, operator_key(list(self.mesh), green.G_fs, green.dG_fs_dn, 'quad'))
+        self.assertNotEqual(key, operator_key(self.mesh, green.G, green.dG_dn, 'quad'))
+        self.assertNotEqual(key, operator_key(self.mesh, green.G_fs, green.dG_fs_dn, 'gauss'))
+        mesh = list(self.mesh)
+        mesh[0] = LineElement((0, 0), (0, 0.1), (-1, 0), True)
+        self.assertNotEqual(key, operator_key(mesh, green.G_fs, green.dG_fs_dn, 'quad'))
+        with self.assertRaises(ValueError):
+            operator_key(self.mesh, lambda x, xi: 0, green.dG_fs_dn, 'quad')
+
+    def test_context(self):
+        ctx_ref = Context(self.mesh, green.G_fs, green.dG_fs_dn, self.vp, self.cp)
+        ctx1 = Context(self.mesh, green.G_fs, green.dG_fs_dn, self.vp, self.cp,
+                       cache=self.tmp.name)
+        cache = OperatorCache(self.tmp.name)
+        self.assertEqual(len(cache.entries()), 1)
+        ctx2 = Context(self.mesh, green.G_fs, green.dG_fs_dn, self.vp, self.cp, cache=cache)
+        self.assertIsInstance(ctx2.A, np.memmap)
+        for ctx in (ctx1, ctx2):
+            self.assertTrue(np.array_equal(ctx.A, ctx_ref.A))
+            self.assertTrue(np.array_equal(ctx.K, ctx_ref.K))
+        u = np.linspace(0, 1, len(ctx2.map))
+        ctx2.K = None
+        self.assertTrue(np.allclose(ctx2.traction(1e8, u), ctx_ref.traction(1e8, u)))
+
+    def test_evict(self):
+        cache = OperatorCache(self.tmp.name, max_bytes=2000)
+        cache.store('a', 'x', np.zeros(100))
+        os.utime(os.path.join(self.tmp.name, 'a'), (0, 0))
+        cache.store('b', 'x', np.zeros(100))
+        self.assertIsNotNone(cache.load('a', 'x'))
+        cache.store('c', 'x', np.zeros(100))
+        self.assertEqual(sorted(key for key, _, _ in cache.entries()), ['a', 'c'])
+        self.assertIsNone(cache.load('b', 'x'))
+        self.assertEqual(cache.get('b', 'x', lambda: np.ones(3))[0], 1.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import os
+import shutil
+import tempfile
+import numpy as np
+import unittest
+
+import pycycle.green as green
+from pycycle.ensemble import Ensemble, Member
+from pycycle.fields import Profile
+from pycycle.mesh import LineElement, InfiniteLineElement, tessellate_line
+from pycycle.output import Reader
+from pycycle.seas import Context, ConstantParams, VariableParams
+from pycycle.timestep import integrate
+
+
+def tau_pre(x):
+    return -20.0
+
+
+class TestEnsemble(unittest.TestCase):
+    def setUp(self):
+        a = np.array((0, 0.1))
+        b = np.array((0, 1))
+        normal = (-1, 0)
+        self.mesh = [LineElement((0, 0), a, normal, False)]
+        self.mesh += tessellate_line(a, b, 0.1, normal, True)
+        self.mesh += [InfiniteLineElement(b, normal)]
+        self.cp = ConstantParams(2.670, 3.464, 1e-9, 1e-6, 0.015, 0.014, 0.6, 50, 1e-9)
+        self.vp = VariableParams(self.mesh, 0.10, tau_pre)
+        self.ensemble = Ensemble(self.mesh, green.G_fs, green.dG_fs_dn, self.vp, self.cp,
+                                 assembly='gauss')
+        cp2 = ConstantParams(2.0, 3.0, 1e-9, 1e-6, 0.02, 0.01, 0.6, 40, 1e-9)
+        self.members = [Member(), Member(cp=cp2, a=Profile([0.0, 1.0], [0.05, 0.15]))]
+        self.tend = 1e9
+
+    def reference(self, member):
+        vp = self.vp if member.a is None else VariableParams(self.mesh, member.a, tau_pre)
+        cp = self.cp if member.cp is None else member.cp
+        ctx = Context(self.mesh, green.G_fs, green.dG_fs_dn, vp, cp, assembly='gauss')
+        return integrate(ctx, (0, self.tend))
+
+    def test_run(self):
+        members = self.members + [Member(tau_pre=lambda x: 1.0)]
+        reports = []
+        results = self.ensemble.run(members, (0, self.tend), workers=2,
+                                    progress=lambda *args: reports.append(args))
+        self.assertEqual(sorted(r[0] for r in reports), [1, 2, 3])
+        self.assertFalse(results[2].success)
+        self.assertIn('pickle', results[2].error)
+        for member, result in zip(self.members, results):
+            self.assertTrue(result.success)
+            ref = self.reference(member)
+            self.assertTrue(np.allclose(result.result.y, ref.y, rtol=1e-10, atol=1e-12))
+
+    def test_thread(self):
+        directory = tempfile.mkdtemp()
+        try:
+            results = self.ensemble.run(self.members, (0, self.tend), directory,
+                                        executor='thread')
+            self.assertEqual(sorted(os.listdir(directory)), ['member0000', 'member0001'])
+            self.assertTrue(all(member.name is None for member in self.members))
+            for result in results:
+                S = Reader(os.path.join(directory, result.name))['S']
+                self.assertTrue(np.array_equal(S[-1], result.result.y[::2]))
+            reverse = os.path.join(directory, 'reverse')
+            results = self.ensemble.run(self.members[::-1], (0, self.tend), reverse,
+                                        executor='thread')
+            self.assertEqual([result.name for result in results], ['member0000', 'member0001'])
+            S = Reader(os.path.join(reverse, 'member0000'))['S']
+            self.assertTrue(np.array_equal(S[-1], results[0].result.y[::2]))
+        finally:
+            shutil.rmtree(directory)
+        with self.assertRaises(ValueError):
+            self.ensemble.run(self.members, (0, self.tend), executor='mpi')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import numpy as np
+import unittest
+
+import pycycle.green as green
+from pycycle.events import MOMENT_UNIT, Catalog
+from pycycle.mesh import LineElement, InfiniteLineElement, tessellate_line
+from pycycle.seas import Context, ConstantParams, VariableParams
+
+
+class TestCatalog(unittest.TestCase):
+    def setUp(self):
+        a = np.array((0, 0.1))
+        b = np.array((0, 1))
+        normal = (-1, 0)
+        self.mesh = [LineElement((0, 0), a, normal, False)]
+        self.mesh += tessellate_line(a, b, 0.1, normal, True)
+        self.mesh += [InfiniteLineElement(b, normal)]
+        cp = ConstantParams(2.670, 3.464, 1e-9, 1e-6, 0.015, 0.014, 0.6, 50, 1e-9)
+        vp = VariableParams(self.mesh, lambda x: 0.10, lambda x: -20)
+        self.ctx = Context(self.mesh, green.G_fs, green.dG_fs_dn, vp, cp, assembly='gauss')
+
+    def test_catalog(self):
+        Nf = len(self.ctx.map)
+        catalog = Catalog(self.ctx, self.mesh)
+        S = np.zeros(Nf)
+        t_prev = 0.0
+        # slow slip up to 1e-4 m/s around element 5, then a quake up to 1 m/s at 3..6
+        profile = np.exp(-(np.arange(Nf) - 5.0)**2)
+        for t in np.arange(1.0, 200.0):
+            v_max = 10.0**(-9 + 9 * np.exp(-((t - 100) / 30)**2))
+            V = np.maximum(v_max * profile, 1e-12)
+            S += V * (t - t_prev)
+            t_prev = t
+            catalog(t, S, V, None, None)
+        self.assertEqual([e.name for e in catalog.events], ['earthquake', 'slow slip'])
+        quake, slow = catalog.events
+        self.assertTrue(t_prev > slow.t_end > quake.t_end > quake.t_start > slow.t_start)
+        self.assertAlmostEqual(quake.t_start + quake.t_end, 200.0, places=6)
+        self.assertEqual(quake.hypocenter, 5)
+        self.assertEqual(quake.V_peak, 1.0)
+        self.assertEqual(quake.t_peak, 100.0)
+        self.assertTrue(np.array_equal(np.flatnonzero(quake.ruptured), [3, 4, 5, 6, 7]))
+        self.assertTrue(np.allclose(quake.extent[0], self.ctx.vp.x[3]))
+        self.assertTrue(np.allclose(slow.moment,
+                                    MOMENT_UNIT * self.ctx.cp.mu * 0.1 * np.sum(slow.slip)))
+        self.assertEqual(list(catalog.table(1)['hypocenter']), [5])
+        self.assertIsNone(catalog.active[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
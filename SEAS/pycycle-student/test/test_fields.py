@@ -0,0 +1,57 @@
+import numpy as np
+import unittest
+
+from pycycle.fields import GriddedField, Profile, evaluate
+from pycycle.mesh import tessellate_line
+from pycycle.seas import VariableParams
+
+
+def a_bp1(x):
+    z = x[1]
+    if z < 15.0:
+        return 0.010
+    elif z < 18.0:
+        return 0.010 + 0.015 * (z - 15.0) / 3.0
+    else:
+        return 0.025
+
+
+class TestFields(unittest.TestCase):
+    def setUp(self):
+        self.x = np.stack((np.linspace(-1, 1, 41), np.linspace(0, 40, 41)), axis=1)
+
+    def test_evaluate(self):
+        expected = np.array([a_bp1(p) for p in self.x])
+        self.assertTrue(np.array_equal(evaluate(a_bp1, self.x), expected))
+        self.assertTrue(np.array_equal(evaluate(0.5, self.x), np.full(41, 0.5)))
+        self.assertTrue(np.array_equal(evaluate(expected, self.x), expected))
+        self.assertTrue(np.array_equal(evaluate(lambda x: -20, self.x), np.full(41, -20.0)))
+        norm = evaluate(lambda x: np.linalg.norm(x), self.x)
+        self.assertTrue(np.allclose(norm, np.linalg.norm(self.x, axis=1)))
+        depth = evaluate(lambda x: 2 * x[..., 1], self.x, vectorized=True)
+        self.assertTrue(np.array_equal(depth, 2 * self.x[:, 1]))
+        with self.assertRaises(ValueError):
+            evaluate(a_bp1, self.x, vectorized=True)
+
+    def test_profile(self):
+        a = Profile([15.0, 18.0], [0.010, 0.025])
+        self.assertTrue(np.allclose(a(self.x), [a_bp1(p) for p in self.x], rtol=0, atol=1e-15))
+
+    def test_gridded(self):
+        xg = np.linspace(-2, 2, 5)
+        zg = np.linspace(0, 50, 11)
+        f = lambda x, z: 1 + 2 * x + 3 * z + x * z
+        field = GriddedField(xg, zg, f(*np.meshgrid(xg, zg, indexing='ij')))
+        self.assertTrue(np.allclose(field(self.x), f(self.x[:, 0], self.x[:, 1])))
+
+    def test_variable_params(self):
+        mesh = tessellate_line((0, 0), (0, 40), 0.5, (-1, 0), True)
+        vp = VariableParams(mesh, Profile([15.0, 18.0], [0.010, 0.025]), -20)
+        vp_ref = VariableParams(mesh, a_bp1, lambda x: -20, vectorized=False)
+        self.assertTrue(np.allclose(vp.a, vp_ref.a, rtol=0, atol=1e-15))
+        self.assertTrue(np.array_equal(vp.tau_pre, vp_ref.tau_pre))
+        self.assertTrue(np.allclose(vp.inv_a * vp.a, 1.0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,43 @@
+import numpy as np
+import unittest
+
+import pycycle.green as green
+
+
+class TestGreen(unittest.TestCase):
+    def test_batched(self):
+        rng = np.random.default_rng(0)
+        x = rng.uniform(-1, 1, (5, 1, 2))
+        xi = rng.uniform(-1, 1, (1, 7, 2))
+        n = rng.uniform(-1, 1, (1, 7, 2))
+        x_tilde = x * [1, -1]
+        d = x - xi
+        d_tilde = x_tilde - xi
+        G = -np.log(np.linalg.norm(d, axis=-1)) / (2 * np.pi)
+        G_tilde = -np.log(np.linalg.norm(d_tilde, axis=-1)) / (2 * np.pi)
+        dG = np.sum(d * n, axis=-1) / (2 * np.pi * np.sum(d * d, axis=-1))
+        dG_tilde = np.sum(d_tilde * n, axis=-1) / (2 * np.pi * np.sum(d_tilde**2, axis=-1))
+        self.assertTrue(np.allclose(green.G(x, xi), G, rtol=1e-14))
+        self.assertTrue(np.allclose(green.G_fs(x, xi), G + G_tilde, rtol=1e-14))
+        self.assertTrue(np.allclose(green.dG_dn(x, xi, n), dG, rtol=1e-14))
+        self.assertTrue(np.allclose(green.dG_fs_dn(x, xi, n), dG + dG_tilde, rtol=1e-14))
+        x0 = x.copy()
+        green.dG_fs_dn(x, xi, n)
+        self.assertTrue(np.array_equal(x, x0))
+        self.assertEqual(green.dG_dn(x[0, 0], x[0, 0], n[0, 0]), 0.0)
+        self.assertTrue(np.isscalar(green.G_fs([1.0, 2.0], [0.0, 0.0])))
+
+    def test_kernel(self):
+        self.assertIs(green.kernel(green.G_fs), green.kernel(green.kernel(green.G_fs)))
+        self.assertIsNone(green.kernel(lambda x, xi: 0.0))
+        K = green.kernel(green.dG_fs_dn)
+        self.assertEqual(K.singularity, 'cauchy')
+        self.assertTrue(K.image)
+        self.assertEqual(green.kernel(green.G).singularity, 'log')
+        x = np.array([[1.0, 2.0]])
+        self.assertTrue(np.array_equal(K.singular_points(x), [[[1.0, 2.0]], [[1.0, -2.0]]]))
+        self.assertEqual(green.kernel(green.G).singular_points(x).shape, (1, 1, 2))
+
+
+if __name__ == '__main__':
+    unittest.main()
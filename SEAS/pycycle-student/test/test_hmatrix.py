@@ -0,0 +1,49 @@
+import numpy as np
+import unittest
+
+import pycycle.green as green
+from pycycle.bem import assemble, rhs_op
+from pycycle.hmatrix import build
+from pycycle.mesh import InfiniteLineElement, line_normal, tessellate_line
+from pycycle.seas import Context, ConstantParams, VariableParams
+
+
+class TestHMatrix(unittest.TestCase):
+    def setUp(self):
+        b1 = (0, 40.0)
+        b2 = (0, 50.0)
+        star_centre = (1, 1)
+        normal1 = line_normal((0, 0), b1, star_centre)
+        normal2 = line_normal(b1, b2, star_centre)
+        self.mesh = tessellate_line((0, 0), b1, 0.2, normal1, True)
+        self.mesh += tessellate_line(b1, b2, 1.0, normal2)
+        self.mesh.append(InfiniteLineElement(b2, normal2))
+        self.tol = 1e-6
+
+    def test_matvec_solve(self):
+        A = assemble(green.G_fs, self.mesh, method='gauss')
+        H = build(lambda r, c: assemble(green.G_fs, self.mesh, method='gauss', rows=r, cols=c),
+                  self.mesh, tol=self.tol)
+        self.assertLess(H.compression, 0.5)
+        x = np.sin(np.arange(A.shape[0]))
+        self.assertLess(np.linalg.norm(H @ x - A @ x), 10 * self.tol * np.linalg.norm(A @ x))
+        b = A @ x
+        self.assertLess(np.linalg.norm(A @ H.solve(b) - b), 10 * self.tol * np.linalg.norm(b))
+
+    def test_traction(self):
+        cp = ConstantParams(2.670, 3.464, 1e-9, 1e-6, 0.015, 0.008, 0.6, 50, 1e-9)
+        vp = VariableParams(self.mesh, lambda x: 0.015, lambda x: -20)
+        options = {'tol': 1e-10, 'leaf_size': 16}
+        ctx = Context(self.mesh, green.G_fs, green.dG_fs_dn, vp, cp, assembly='gauss',
+                      operator='hmatrix', hmatrix_options=options)
+        ctx_ref = Context(self.mesh, green.G_fs, green.dG_fs_dn, vp, cp, assembly='gauss')
+        self.assertIsNone(ctx.K)
+        u = np.linspace(0, 1, len(ctx.map))**2
+        tau = ctx.traction(1e8, u)
+        tau_ref = ctx_ref.traction(1e8, u)
+        for f in range(len(ctx.map)):
+            self.assertAlmostEqual(tau[f], tau_ref[f], places=5)
+
+
+if __name__ == '__main__':
+    unittest.main()
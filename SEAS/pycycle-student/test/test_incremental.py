@@ -0,0 +1,90 @@
+import functools
+import numpy as np
+import unittest
+from scipy.linalg import lu_factor, lu_solve
+
+import pycycle.green as green
+from pycycle.bem import assemble, rhs_op
+from pycycle.incremental import MeshDiff, UpdatedSolver, update_operator
+from pycycle.mesh import InfiniteLineElement, tessellate_line
+from pycycle.seas import Context, ConstantParams, VariableParams
+
+
+def fault_mesh(refine=False, depth=1.0, far=2.0):
+    """Fault from 0 to depth (optionally refined between 0.4 and 0.6), far field to far."""
+    normal = (-1, 0)
+    if refine:
+        mesh = tessellate_line((0, 0), (0, 0.4), 0.1, normal, True)
+        mesh += tessellate_line((0, 0.4), (0, 0.6), 0.05, normal, True)
+        mesh += tessellate_line((0, 0.6), (0, depth), 0.1, normal, True)
+    else:
+        mesh = tessellate_line((0, 0), (0, 0.4), 0.1, normal, True)
+        mesh += tessellate_line((0, 0.4), (0, 0.6), 0.1, normal, True)
+        mesh += tessellate_line((0, 0.6), (0, depth), 0.1, normal, True)
+    mesh += tessellate_line((0, depth), (0, far), 0.25, normal)
+    mesh.append(InfiniteLineElement((0, far), normal))
+    return mesh
+
+
+class TestIncremental(unittest.TestCase):
+    def test_diff(self):
+        old = fault_mesh()
+        diff = MeshDiff(old, fault_mesh(refine=True))
+        self.assertTrue(np.array_equal(diff.removed, [4, 5]))
+        self.assertTrue(np.array_equal(diff.added, [4, 5, 6, 7]))
+        self.assertTrue(np.array_equal(diff.match[diff.kept],
+                                       np.delete(np.arange(len(old)), [4, 5])))
+        diff = MeshDiff(old, old[:-1] + tessellate_line((0, 2), (0, 3), 0.25, (-1, 0)))
+        self.assertEqual(diff.removed.shape[0], 1)
+        self.assertEqual(diff.added.shape[0], 4)
+        self.assertEqual(diff.rank, 6)
+
+    def test_update_operator(self):
+        old = fault_mesh()
+        new = fault_mesh(refine=True, far=3.0)
+        diff = MeshDiff(old, new)
+        for op, K in ((assemble, green.G_fs), (rhs_op, green.dG_fs_dn)):
+            with self.subTest(op=op.__name__):
+                A = op(K, old, method='gauss')
+                A_new = update_operator(
+                    A, diff, lambda r, c: op(K, new, method='gauss', rows=r, cols=c))
+                self.assertTrue(np.allclose(A_new, op(K, new, method='gauss'), rtol=1e-13,
+                                            atol=1e-13))
+
+    def test_solver(self):
+        meshes = [fault_mesh(), fault_mesh(refine=True), fault_mesh(refine=True, far=3.0)]
+        A = assemble(green.G_fs, meshes[0], method='gauss')
+        solve = functools.partial(lu_solve, lu_factor(A))
+        b = np.random.default_rng(0).standard_normal((len(meshes[-1]), 3))
+        for old, new in zip(meshes[:-1], meshes[1:]):
+            diff = MeshDiff(old, new)
+            A_new = update_operator(
+                A, diff, lambda r, c: assemble(green.G_fs, new, 'gauss', rows=r, cols=c))
+            solve = UpdatedSolver(solve, A, A_new, diff).solve
+            A = A_new
+            M = len(new)
+            self.assertTrue(np.allclose(solve(b[:M]), np.linalg.solve(A, b[:M]), rtol=1e-10,
+                                        atol=1e-12))
+            self.assertTrue(np.allclose(solve(b[:M, 0]), np.linalg.solve(A, b[:M, 0])))
+
+    def test_context(self):
+        cp = ConstantParams(2.670, 3.464, 1e-9, 1e-6, 0.015, 0.014, 0.6, 50, 1e-9)
+        old = fault_mesh()
+        new = fault_mesh(refine=True, depth=1.5, far=3.0)
+        vp = lambda mesh: VariableParams(mesh, lambda x: 0.10, lambda x: -20)
+        ctx = Context(old, green.G_fs, green.dG_fs_dn, vp(old), cp, assembly='gauss')
+        ref = Context(new, green.G_fs, green.dG_fs_dn, vp(new), cp, assembly='gauss')
+        for refactor in (False, True):
+            with self.subTest(refactor=refactor):
+                updated = ctx.update(new, vp(new), refactor=refactor)
+                self.assertEqual(updated.lu is not None, refactor)
+                self.assertTrue(np.allclose(updated.K, ref.K, rtol=1e-10, atol=1e-12))
+                u = np.linspace(0, 1, len(ref.map))
+                self.assertTrue(np.allclose(updated.traction(1e8, u), ref.traction(1e8, u)))
+        with self.assertRaises(ValueError):
+            Context(old, green.G_fs, green.dG_fs_dn, vp(old), cp, assembly='gauss',
+                    operator='hmatrix').update(new, vp(new))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import numpy as np
+import unittest
+
+import pycycle.green as green
+from pycycle.bem import assemble
+from pycycle.krylov import BlockJacobi, KrylovSolver, partition
+from pycycle.mesh import InfiniteLineElement, line_normal, tessellate_line
+from pycycle.seas import Context, ConstantParams, VariableParams
+
+
+class TestKrylov(unittest.TestCase):
+    def setUp(self):
+        b1 = (0, 40.0)
+        b2 = (0, 50.0)
+        star_centre = (1, 1)
+        normal1 = line_normal((0, 0), b1, star_centre)
+        normal2 = line_normal(b1, b2, star_centre)
+        self.mesh = tessellate_line((0, 0), b1, 0.5, normal1, True)
+        self.mesh += tessellate_line(b1, b2, 1.0, normal2)
+        self.mesh.append(InfiniteLineElement(b2, normal2))
+        self.cp = ConstantParams(2.670, 3.464, 1e-9, 1e-6, 0.015, 0.008, 0.6, 50, 1e-9)
+        self.vp = VariableParams(self.mesh, lambda x: 0.015, lambda x: -20)
+
+    def test_partition(self):
+        blocks = partition(self.mesh, 32)
+        self.assertEqual([b.shape[0] for b in blocks], [32, 32, 16, 11])
+        self.assertTrue(np.array_equal(np.sort(np.concatenate(blocks)),
+                                       np.arange(len(self.mesh))))
+
+    def test_solve(self):
+        A = assemble(green.G_fs, self.mesh, method='gauss')
+        M = BlockJacobi(lambda r, c: A[np.ix_(r, c)], partition(self.mesh, 16), A.shape)
+        b = np.sin(np.arange(A.shape[0]))
+        x_ref = np.linalg.solve(A, b)
+        for method in ('gmres', 'bicgstab'):
+            with self.subTest(method=method):
+                solver = KrylovSolver(A, M.aslinearoperator(), method, tol=1e-12)
+                x = solver.solve(b)
+                self.assertLess(np.abs(x - x_ref).max(), 1e-8 * np.abs(x_ref).max())
+                self.assertLess(solver.residual, 1e-11)
+                self.assertGreater(solver.iterations, 0)
+                solver.solve(b, x0=x)
+                self.assertEqual(solver.iterations, 0)
+                self.assertEqual(solver.nsolves, 2)
+
+    def test_traction(self):
+        ctx_ref = Context(self.mesh, green.G_fs, green.dG_fs_dn, self.vp, self.cp,
+                          assembly='gauss')
+        u = np.linspace(0, 1, len(ctx_ref.map))**2
+        tau_ref = ctx_ref.traction(1e8, u)
+        for solver in ('gmres', 'bicgstab'):
+            with self.subTest(solver=solver):
+                ctx = Context(self.mesh, green.G_fs, green.dG_fs_dn, self.vp, self.cp,
+                              assembly='gauss', linear_solver=solver)
+                self.assertIsNone(ctx.K)
+                tau = ctx.traction(1e8, u)
+                self.assertTrue(np.allclose(tau, tau_ref, rtol=0, atol=1e-6))
+                iterations = ctx.linear_solver.iterations
+                ctx.traction(1e8, u * (1 + 1e-6))
+                self.assertLess(ctx.linear_solver.iterations, iterations)
+        with self.assertRaises(ValueError):
+            Context(self.mesh, green.G_fs, green.dG_fs_dn, self.vp, self.cp, assembly='gauss',
+                    linear_solver='gmres', linear_solver_options={'preconditioner': 'ilu'})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,7 +2,8 @@ import numpy as np
 import unittest
 from scipy.integrate import quad
 
-from pycycle.mesh import LineElement, InfiniteLineElement
+from pycycle.mesh import (LineElement, InfiniteLineElement, Mesh, as_mesh, num_fault_elements,
+                          tessellate_line)
 
 
 class TestLineElement(unittest.TestCase):
@@ -71,5 +72,78 @@ class TestInfiniteLineElement(unittest.TestCase):
         self.assertAlmostEqual(analytic, numeric)
 
 
+class TestMesh(unittest.TestCase):
+    def setUp(self):
+        self.mesh = tessellate_line((0, 0), (0, 1), 0.25, (-1, 0), True)
+        self.mesh = self.mesh + tessellate_line((0, 1), (1, 2), 0.75, (-1, 1))
+        self.mesh.append(InfiniteLineElement((1, 2), (-1, 1)))
+        self.elements = [
+            LineElement((0, n / 4), (0, (n + 1) / 4), (-1, 0), True) for n in range(4)
+        ]
+        self.elements += [
+            LineElement((0, 1), (0.5, 1.5), (-1, 1), False),
+            LineElement((0.5, 1.5), (1, 2), (-1, 1), False),
+            InfiniteLineElement((1, 2), (-1, 1))
+        ]
+
+    def test_container(self):
+        self.assertIsInstance(self.mesh, Mesh)
+        self.assertEqual(len(self.mesh), 7)
+        self.assertEqual(num_fault_elements(self.mesh), 4)
+        self.assertEqual(num_fault_elements(self.elements), 4)
+        self.assertTrue(np.array_equal(self.mesh.fault_indices(), np.arange(4)))
+        for e, e_ref in zip(self.mesh, self.elements):
+            self.assertIs(type(e), type(e_ref))
+            self.assertTrue(np.allclose(e.a, e_ref.a))
+            self.assertTrue(np.allclose(e.n, e_ref.n))
+            self.assertEqual(e.is_fault, e_ref.is_fault)
+        self.assertIsInstance(self.mesh[1:3], Mesh)
+        self.assertEqual(len(self.mesh[self.mesh.line]), 6)
+        mesh = as_mesh(self.elements)
+        self.assertTrue(np.allclose(mesh.a, self.mesh.a))
+        self.assertTrue(np.allclose(mesh.h, self.mesh.h))
+        self.assertTrue(np.array_equal(mesh.kind, self.mesh.kind))
+        elements = list(self.elements[:1])
+        elements += self.mesh[1:]
+        self.assertIsInstance(elements, Mesh)
+        self.assertTrue(np.allclose(elements.a, self.mesh.a))
+
+    def test_list_operations(self):
+        mesh = self.mesh[:]
+        mesh[4].is_fault = True
+        mesh[-1].n = (0, 1)
+        self.assertTrue(mesh.is_fault[4])
+        self.assertTrue(np.array_equal(mesh.n[-1], (0, 1)))
+        self.assertFalse(self.mesh.is_fault[4])
+        for e in mesh:
+            e.is_fault = False
+        self.assertEqual(num_fault_elements(mesh), 0)
+        with self.assertRaises(ValueError):
+            mesh[0].a[0] = 1.0
+        alias = mesh
+        mesh += [self.elements[0]]
+        self.assertIs(mesh, alias)
+        self.assertEqual(len(mesh), 8)
+        e = mesh.pop()
+        self.assertTrue(np.allclose(e.a, self.elements[0].a))
+        e.is_fault = False
+        mesh.insert(1, self.elements[2])
+        self.assertTrue(np.allclose(mesh.a[:3], [(0, 0), (0, 0.5), (0, 0.25)]))
+        del mesh[1]
+        self.assertTrue(np.allclose(mesh.a, self.mesh.a))
+        with self.assertRaises(IndexError):
+            mesh[7]
+
+    def test_vectorized(self):
+        theta = np.linspace(-0.9, 0.9, 5)
+        X = self.mesh.xi(theta)
+        W = self.mesh.factor(theta)
+        x = self.mesh.collocation_points()
+        for i, e in enumerate(self.elements):
+            self.assertTrue(np.allclose(X[i], e.xi(theta)))
+            self.assertTrue(np.allclose(W[i], e.factor(theta)))
+            self.assertTrue(np.allclose(x[i], e.collocation_point()))
+
+
 if __name__ == '__main__':
     unittest.main()
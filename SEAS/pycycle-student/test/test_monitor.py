@@ -0,0 +1,109 @@
+import numpy as np
+import unittest
+
+from pycycle.monitor import ArrayStore, Monitor, format_time
+
+
+class FakeCanvas:
+    def __init__(self):
+        self.draws = 0
+
+    def draw_idle(self):
+        self.draws += 1
+
+
+class FakeLine:
+    def __init__(self, *data):
+        self.data = data
+
+    def set_data(self, x, y):
+        self.data = (x, y)
+
+
+class FakeAxes:
+    def __init__(self):
+        self.lines = []
+
+    def plot(self, *args, **kwargs):
+        self.lines.append(FakeLine(*args))
+        return [self.lines[-1]]
+
+    def relim(self):
+        pass
+
+    def autoscale_view(self):
+        pass
+
+
+class FakeFigure:
+    def __init__(self):
+        self.canvas = FakeCanvas()
+
+
+class TestMonitor(unittest.TestCase):
+    def setUp(self):
+        self.thresholds = [{'color': '#000000', 'vthresh': 0, 'dt': 10.0},
+                           {'color': '#ff0000', 'vthresh': 1e-6, 'dt': 1.0}]
+
+    def run_monitor(self, monitor, steps=50):
+        for k in range(steps):
+            v = np.full(4, 1e-5 if 20 <= k < 30 else 1e-9)
+            monitor(3.0 * k, np.full(4, 0.1 * k), v, np.zeros(4), np.zeros(4))
+        monitor.close()
+
+    def test_array_store(self):
+        store = ArrayStore((2, ), capacity=1)
+        for k in range(5):
+            store.append((k, -k))
+        self.assertEqual(len(store), 5)
+        self.assertTrue(np.array_equal(store.data[:, 0], np.arange(5)))
+        self.assertEqual(format_time(365 * 24 * 3600 + 1.5).split(), [
+            '1', 'yr,', '0', 'd,', '0', 'h,', '0', 'm,', '1', 's,', '500', 'ms.'])
+
+    def test_render(self):
+        for render in ('thread', 'sync'):
+            with self.subTest(render=render):
+                u_ax, u_fig, v_ax, v_fig = FakeAxes(), FakeFigure(), FakeAxes(), FakeFigure()
+                lines = []
+                monitor = Monitor(self.thresholds, u_ax, u_fig, v_ax, v_fig, render=render,
+                                  render_interval=3600.0, log_interval=3600.0,
+                                  log=lines.append)
+                self.run_monitor(monitor)
+                self.assertEqual(len(lines), 1)
+                self.assertTrue(np.array_equal(monitor.t.data, 3.0 * np.arange(50)))
+                self.assertEqual(len(v_ax.lines), 1)
+                self.assertEqual(v_ax.lines[0].data[0].shape, (50, ))
+                self.assertEqual(len(u_ax.lines), len(monitor.snapshots))
+                self.assertLessEqual(v_fig.canvas.draws, 2)
+        monitor = Monitor(self.thresholds, FakeAxes(), FakeFigure(), log_interval=None)
+        self.assertEqual(monitor.render, 'sync')
+        self.assertIsNone(monitor._thread)
+
+    def test_step_boundary(self):
+        monitor = Monitor(self.thresholds, log_interval=None)
+        for t in (0.0, 10.0, 15.0, 20.0, 25.0):
+            monitor(t, np.full(4, t), np.full(4, 1e-9), np.zeros(4), np.zeros(4))
+        self.assertTrue(np.array_equal(monitor.snapshots.t, [0, 10, 20]))
+        self.assertTrue(np.array_equal(monitor.snapshots.u[:, 0], [0, 10, 20]))
+
+    def test_headless(self):
+        lines = []
+        monitor = Monitor(self.thresholds, log_interval=0, log=lines.append)
+        self.assertIsNone(monitor.render)
+        self.run_monitor(monitor)
+        self.assertEqual(len(lines), 50)
+        snapshots = monitor.snapshots
+        self.assertTrue(np.array_equal(snapshots.t[:6], [0, 10, 20, 30, 40, 50]))
+        self.assertTrue(np.array_equal(snapshots.t[6:36], np.arange(58, 88)))
+        self.assertTrue(np.array_equal(snapshots.t[36:], [97, 107, 117, 127, 137, 147]))
+        self.assertTrue(np.array_equal(snapshots.region[5:7], [0, 1]))
+        self.assertTrue(np.allclose(snapshots.u[:, 0], 0.1 * snapshots.t / 3.0))
+        self.assertEqual(len(monitor.states), 10)
+        self.assertEqual(monitor.states[-1][0], 147.0)
+        self.assertEqual(monitor.states[0][0], 120.0)
+        with self.assertRaises(ValueError):
+            Monitor(self.thresholds, render='process')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import os
+import shutil
+import tempfile
+import numpy as np
+import unittest
+
+import pycycle.green as green
+from pycycle.mesh import LineElement, InfiniteLineElement, tessellate_line
+from pycycle.output import Reader, Writer, read_checkpoint, run
+from pycycle.seas import Context, ConstantParams, VariableParams
+from pycycle.timestep import integrate
+
+
+class TestOutput(unittest.TestCase):
+    def setUp(self):
+        a = np.array((0, 0.1))
+        b = np.array((0, 1))
+        normal = (-1, 0)
+        mesh = [LineElement((0, 0), a, normal, False)]
+        mesh += tessellate_line(a, b, 0.1, normal, True)
+        mesh += [InfiniteLineElement(b, normal)]
+        cp = ConstantParams(2.670, 3.464, 1e-9, 1e-6, 0.015, 0.014, 0.6, 50, 1e-9)
+        vp = VariableParams(mesh, lambda x: 0.10, lambda x: -20)
+        self.ctx = Context(mesh, green.G_fs, green.dG_fs_dn, vp, cp)
+        self.tend = 1e9
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_resume(self):
+        times = []
+        ref = integrate(self.ctx, (0, self.tend), callback=lambda t, *args: times.append(t))
+        result = run(self.ctx, self.directory, (0, self.tend), chunk_size=7, max_steps=30)
+        self.assertEqual(result.status, 1)
+        self.assertEqual(Reader(self.directory).chunks, [7, 7, 7, 7, 3])
+        result = run(self.ctx, self.directory, (0, self.tend), chunk_size=7)
+        self.assertEqual(result.status, 0)
+        self.assertEqual(result.nsteps, ref.nsteps)
+        self.assertTrue(np.array_equal(result.y, ref.y))
+
+        reader = Reader(self.directory)
+        self.assertEqual(len(reader), len(times))
+        self.assertTrue(np.array_equal(reader['t'], times))
+        S = reader['S']
+        self.assertIsInstance(S, np.memmap)
+        self.assertEqual(S.shape, (len(times), len(self.ctx.map)))
+        self.assertTrue(np.array_equal(S[-1], ref.y[::2]))
+
+    def test_uncommitted(self):
+        writer = Writer(self.directory, chunk_size=2, compress=False)
+        for k in range(5):
+            writer(float(k), np.full(3, k), np.zeros(3), np.zeros(3), np.zeros(3))
+        self.assertEqual(writer.chunks, [2, 2])
+        self.assertTrue(os.path.exists(os.path.join(self.directory, 'V', '000001.npy')))
+        reader = Reader(self.directory)
+        self.assertTrue(np.array_equal(reader['t'], [0, 1, 2, 3]))
+        writer(2.0, np.zeros(3), np.zeros(3), np.zeros(3), np.zeros(3))
+        writer.close()
+        self.assertEqual(read_checkpoint(self.directory)['chunks'].tolist(), [2, 2, 1])
+        reader = Reader(self.directory)
+        self.assertTrue(np.array_equal(reader['S'][:, 0], [0, 1, 2, 3, 4]))
+        with self.assertRaises(ValueError):
+            reader.load('u')
+
+
+if __name__ == '__main__':
+    unittest.main()
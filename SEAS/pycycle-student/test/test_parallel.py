@@ -0,0 +1,50 @@
+import numpy as np
+import unittest
+
+import pycycle.green as green
+from pycycle.bem import assemble, rhs_op
+from pycycle import parallel
+from pycycle.mesh import InfiniteLineElement, line_normal, tessellate_line
+from pycycle.seas import Context, ConstantParams, VariableParams
+
+
+class TestParallel(unittest.TestCase):
+    def setUp(self):
+        b1 = (0, 40.0)
+        b2 = (0, 50.0)
+        star_centre = (1, 1)
+        normal1 = line_normal((0, 0), b1, star_centre)
+        normal2 = line_normal(b1, b2, star_centre)
+        self.mesh = tessellate_line((0, 0), b1, 1.0, normal1, True)
+        self.mesh += tessellate_line(b1, b2, 1.0, normal2)
+        self.mesh.append(InfiniteLineElement(b2, normal2))
+
+    def test_assemble(self):
+        A = assemble(green.G_fs, self.mesh, method='gauss')
+        B = rhs_op(green.dG_fs_dn, self.mesh, method='gauss')
+        for executor in ('process', 'thread'):
+            with self.subTest(executor=executor):
+                A_par = parallel.assemble(green.G_fs, self.mesh, 2, executor, block_rows=7,
+                                          method='gauss')
+                B_par = parallel.rhs_op(green.dG_fs_dn, self.mesh, 3, executor,
+                                        method='gauss')
+                self.assertTrue(np.array_equal(A, A_par))
+                self.assertTrue(np.array_equal(B, B_par))
+                self.assertEqual(A_par.flags.owndata, executor == 'thread')
+        rows = np.array([3, 1, 40])
+        self.assertTrue(
+            np.array_equal(
+                parallel.rhs_op(green.dG_fs_dn, self.mesh, 2, rows=rows, method='gauss'),
+                B[rows]))
+
+    def test_context(self):
+        cp = ConstantParams(2.670, 3.464, 1e-9, 1e-6, 0.015, 0.008, 0.6, 50, 1e-9)
+        vp = VariableParams(self.mesh, lambda x: 0.015, lambda x: -20)
+        ctx = Context(self.mesh, green.G_fs, green.dG_fs_dn, vp, cp, assembly='gauss',
+                      workers=2)
+        ctx_ref = Context(self.mesh, green.G_fs, green.dG_fs_dn, vp, cp, assembly='gauss')
+        self.assertTrue(np.array_equal(ctx.K, ctx_ref.K))
+
+
+if __name__ == '__main__':
+    unittest.main()
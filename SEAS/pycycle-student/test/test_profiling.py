@@ -0,0 +1,70 @@
+import numpy as np
+import unittest
+
+import pycycle.green as green
+from pycycle.mesh import LineElement, InfiniteLineElement, tessellate_line
+from pycycle.profiling import PHASES, Stats, Summary
+from pycycle.seas import Context, ConstantParams, VariableParams, F, y0
+from pycycle.timestep import integrate
+
+
+class TestStats(unittest.TestCase):
+    def setUp(self):
+        a = np.array((0, 0.1))
+        b = np.array((0, 1))
+        normal = (-1, 0)
+        mesh = [LineElement((0, 0), a, normal, False)]
+        mesh += tessellate_line(a, b, 0.1, normal, True)
+        mesh += [InfiniteLineElement(b, normal)]
+        cp = ConstantParams(2.670, 3.464, 1e-9, 1e-6, 0.015, 0.014, 0.6, 50, 1e-9)
+        vp = VariableParams(mesh, lambda x: 0.10, lambda x: -20)
+        self.ctx = Context(mesh, green.G_fs, green.dG_fs_dn, vp, cp)
+
+    def test_disabled(self):
+        y = y0(self.ctx)
+        fy = F(0.0, y, self.ctx)
+        self.assertIsNone(self.ctx.stats)
+        stats = self.ctx.profile()
+        self.assertTrue(np.array_equal(F(0.0, y, self.ctx), fy))
+        self.assertEqual(stats.nrhs, 1)
+        self.assertIsNone(self.ctx.profile(False))
+        F(0.0, y, self.ctx)
+        self.assertEqual(stats.nrhs, 1)
+
+    def test_integrate(self):
+        stats = self.ctx.profile()
+        lines = []
+        summary = Summary(stats, interval=0, log=lines.append)
+        result = integrate(self.ctx, (0, 1e9), callback=summary)
+        Nf = len(self.ctx.map)
+        self.assertEqual(stats.nrhs, result.nfev)
+        self.assertEqual(stats.ntraction, result.nfev)
+        self.assertEqual(stats.nsteps, result.nsteps)
+        self.assertEqual(stats.nrejected, result.nrejected)
+        self.assertEqual(stats.nsolves, Nf * result.nfev)
+        self.assertEqual(stats.nunconverged, 0)
+        self.assertTrue(stats.mean_iterations > 0)
+        self.assertTrue(all(stats.time[phase] > 0 for phase in PHASES if phase != 'callback'))
+        self.assertEqual(len(lines), result.nsteps + 1)
+        self.assertEqual(stats.as_dict()['iterations'], stats.iterations.tolist())
+        stats.reset()
+        self.assertEqual(stats.nrhs, 0)
+
+    def test_histogram(self):
+        class Info:
+            pass
+        stats = Stats()
+        info = Info()
+        info.iterations = np.array([1, 3, 3])
+        info.converged = np.array([True, True, False])
+        stats.add_solver_info(info)
+        info.iterations = np.array([0, 1])
+        info.converged = np.array([True, True])
+        stats.add_solver_info(info)
+        self.assertTrue(np.array_equal(stats.iterations, [1, 2, 0, 2]))
+        self.assertEqual(stats.nunconverged, 1)
+        self.assertAlmostEqual(stats.mean_iterations, 8 / 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
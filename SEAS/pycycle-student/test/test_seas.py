@@ -4,7 +4,7 @@ import unittest
 
 import pycycle.green as green
 from pycycle.mesh import num_fault_elements, LineElement, InfiniteLineElement, tessellate_line
-from pycycle.seas import Context, ConstantParams, VariableParams
+from pycycle.seas import Context, ConstantParams, VariableParams, F, y0, jacobian, solve
 
 
 class TestBEM(unittest.TestCase):
@@ -32,6 +32,7 @@ class TestBEM(unittest.TestCase):
         vp = VariableParams(self.mesh, a, tau_pre)
 
         self.ctx = Context(self.mesh, green.G_fs, green.dG_fs_dn, vp, cp)
+        self.ctx_ref = Context(self.mesh, green.G_fs, green.dG_fs_dn, vp, cp, precompute=False)
 
     def test_slip_rate(self):
         def test_constraint(tau, psi):
@@ -51,15 +52,136 @@ class TestBEM(unittest.TestCase):
             psi = random.uniform(0, 1)
             self.assertAlmostEqual(test_constraint(tau, psi), 0.0)
 
+    def test_slip_rates(self):
+        Nf = num_fault_elements(self.mesh)
+        tau = np.array([random.uniform(-40, 40) for f in range(Nf)])
+        psi = np.array([random.uniform(0, 1) for f in range(Nf)])
+        tau[0] = 0
+        V, info = self.ctx.slip_rates(tau, psi)
+        self.assertTrue(info.success)
+        self.assertEqual(V[0], 0.0)
+        for f in range(Nf):
+            self.assertAlmostEqual(V[f], self.ctx.slip_rate(f, tau[f], psi[f]))
+            self.assertAlmostEqual(
+                tau[f] + self.ctx.friction_law(f, V[f], psi[f]) + self.ctx.cp.eta * V[f], 0.0)
+
+    def test_rhs(self):
+        Nf = num_fault_elements(self.mesh)
+        y = y0(self.ctx)
+        for f in range(Nf):
+            self.assertAlmostEqual(y[2 * f + 1], self.ctx.psi0(f))
+        y[::2] = np.linspace(0, 1, Nf)
+        t = 1e6
+        out = np.zeros(y.shape)
+        fy = F(t, y, self.ctx, out=out)
+        self.assertIs(fy, out)
+        tau = self.ctx.traction(t, y[::2])
+        for f in range(Nf):
+            V = self.ctx.slip_rate(f, tau[f], y[2 * f + 1])
+            self.assertAlmostEqual(fy[2 * f] / V, 1.0)
+            self.assertAlmostEqual(fy[2 * f + 1], self.ctx.state_law(f, V, y[2 * f + 1]))
+
+    def test_state_law(self):
+        cp = self.ctx.cp
+        V = np.array([0.0, 1e-9, 1e-3])
+        psi = np.array([0.5, 0.6, 0.7])
+        ref = cp.b * cp.V0 / cp.L * (np.exp((cp.f0 - psi) / cp.b) - V / cp.V0)
+        self.assertTrue(np.allclose(self.ctx.state_law(slice(None), V, psi), ref, rtol=1e-14,
+                                    atol=0))
+        stacked = ConstantParams.stack([cp, cp])
+        self.assertEqual(stacked.state_rate.shape, (2, 1))
+
+    def test_jacobian(self):
+        self.check_jacobian(self.ctx)
+        J = jacobian(3e8, y0(self.ctx), self.ctx)
+        J_sparse = jacobian(3e8, y0(self.ctx), self.ctx, sparse=True).toarray()
+        self.assertTrue(np.array_equal(J, J_sparse))
+        self.check_jacobian(self.ctx_ref)
+        op = self.ctx_ref._jacobian_op
+        self.assertIsNotNone(op)
+        self.assertTrue(np.allclose(jacobian(3e8, y0(self.ctx), self.ctx_ref), J, rtol=1e-10,
+                                    atol=0))
+        self.assertIs(self.ctx_ref._jacobian_op, op)
+
+    def test_jacobian_params(self):
+        cp = ConstantParams(3.2, 3.0, 1e-9, 1e-6, 0.015, 0.014, 0.6, 50, 1e-9)
+        for ctx in (self.ctx, self.ctx_ref):
+            with self.subTest(precompute=ctx.K is not None):
+                self.check_jacobian(ctx.with_params(ctx.vp, cp))
+
+    def test_warm_start_batch(self):
+        cp = self.ctx.cp
+        vp = self.ctx.vp
+        y = y0(self.ctx)
+        y[::2] = np.linspace(0, 1, y.shape[0] // 2)
+        ys = (y, np.stack([y, 2 * y, 3 * y]), y, np.stack([y, 2 * y]), np.stack([y, 2 * y]))
+        for operator in ('dense', 'hmatrix'):
+            for precompute in (False, True):
+                with self.subTest(operator=operator, precompute=precompute):
+                    ctx = Context(self.mesh, green.G_fs, green.dG_fs_dn, vp, cp,
+                                  precompute=precompute, operator=operator,
+                                  linear_solver='gmres')
+                    for yk in ys:
+                        fy = F(1e8, yk, ctx)
+                        self.assertTrue(np.allclose(fy, F(1e8, yk, self.ctx), rtol=1e-6,
+                                                    atol=0))
+
+    def test_solve(self):
+        tend = 1e9
+        result = solve(self.ctx, (0, tend), rtol=1e-7, atol=1e-7)
+        self.assertEqual(result.status, 0)
+        self.assertAlmostEqual(result.t[-1], tend)
+        self.assertTrue(np.all(np.isfinite(result.y)))
+
     def test_traction(self):
+        for ctx in (self.ctx, self.ctx_ref):
+            with self.subTest(precompute=ctx.K is not None):
+                self.check_traction(ctx)
+
+    def test_batch(self):
+        cp = self.ctx.cp
+        cps = [cp, ConstantParams(2.0, 3.0, 1e-9, 1e-6, 0.02, 0.01, 0.6, 40, 1e-9)]
+        vps = [self.ctx.vp, VariableParams(self.mesh, 0.05, -25)]
+        for ctx in (self.ctx, self.ctx_ref):
+            with self.subTest(precompute=ctx.K is not None):
+                members = [ctx.with_params(vp, cp) for vp, cp in zip(vps, cps)]
+                batch = ctx.with_params(VariableParams.stack(vps), ConstantParams.stack(cps))
+                y = y0(batch)
+                self.assertEqual(y.shape, (2, 2 * len(ctx.map)))
+                for k, member in enumerate(members):
+                    self.assertTrue(np.allclose(y[k], y0(member), rtol=1e-14, atol=0))
+                y[:, ::2] = np.linspace(0, 1, y[:, ::2].size).reshape(2, -1)
+                fy = F(1e8, y, batch)
+                for k, member in enumerate(members):
+                    self.assertTrue(np.allclose(fy[k], F(1e8, y[k], member), rtol=1e-12,
+                                                atol=0))
+
+    def check_jacobian(self, ctx):
+        y = y0(ctx)
+        Nf = y.shape[0] // 2
+        y[::2] = np.linspace(0, 0.5, Nf)
+        y[1::2] += np.linspace(-0.05, 0.1, Nf)
+        t = 3e8
+        J = jacobian(t, y, ctx)
+        for k in range(y.shape[0]):
+            h = 1e-7
+            yp = y.copy()
+            ym = y.copy()
+            yp[k] += h
+            ym[k] -= h
+            dF = (F(t, yp, ctx) - F(t, ym, ctx)) / (2 * h)
+            for i in range(y.shape[0]):
+                self.assertAlmostEqual(J[i, k] / np.abs(J).max(), dF[i] / np.abs(J).max())
+
+    def check_traction(self, ctx):
         M = num_fault_elements(self.mesh)
         u = np.zeros((M, ))
-        tau0 = self.ctx.traction(0, u)
+        tau0 = ctx.traction(0, u)
         self.assertEqual(tau0.shape[0], M)
         for i in range(M):
             self.assertAlmostEqual(tau0[i], -20.0)
 
-        tau1 = self.ctx.traction(1e6, u)
+        tau1 = ctx.traction(1e6, u)
         tau1_ref = [
             -20.2770392, -20.18965558, -20.18867066, -20.19184425,
             -20.20018175, -20.21425668, -20.23834119, -20.2767227, -20.51650913
@@ -71,7 +193,7 @@ class TestBEM(unittest.TestCase):
             c = (M - 1) / 2
             x = i - c
             u[i] = -np.exp(-c**2 / (c**2 - x**2)) if np.abs(x) < c else 0
-        tau2 = self.ctx.traction(0, u)
+        tau2 = ctx.traction(0, u)
         tau2_ref = [
             -2.89302998, -13.06762148, -37.0195062, -40.08661435, -40.73051422,
             -40.50087324, -37.88783157, -14.51133166, -4.3230266
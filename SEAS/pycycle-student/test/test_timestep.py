@@ -0,0 +1,88 @@
+import numpy as np
+import unittest
+from scipy.integrate import solve_ivp
+
+import pycycle.green as green
+from pycycle.mesh import LineElement, InfiniteLineElement, tessellate_line
+from pycycle.seas import Context, ConstantParams, VariableParams, F, y0
+from pycycle.timestep import Integrator, integrate
+
+
+class TestIntegrator(unittest.TestCase):
+    def setUp(self):
+        a = np.array((0, 0.1))
+        b = np.array((0, 1))
+        normal = (-1, 0)
+        mesh = [LineElement((0, 0), a, normal, False)]
+        mesh += tessellate_line(a, b, 0.1, normal, True)
+        mesh += [InfiniteLineElement(b, normal)]
+        cp = ConstantParams(2.670, 3.464, 1e-9, 1e-6, 0.015, 0.014, 0.6, 50, 1e-9)
+        vp = VariableParams(mesh, lambda x: 0.10, lambda x: -20)
+        self.ctx = Context(mesh, green.G_fs, green.dG_fs_dn, vp, cp)
+        self.tend = 1e9
+
+    def test_solve_ivp(self):
+        for method in ('RK45', 'RK23'):
+            with self.subTest(method=method):
+                result = integrate(self.ctx, (0, self.tend), method=method, rtol=1e-8,
+                                   atol=1e-8)
+                ref = solve_ivp(F, (0, self.tend), y0(self.ctx), method=method, rtol=1e-10,
+                                atol=1e-10, args=(self.ctx, ))
+                self.assertEqual(result.status, 0)
+                self.assertEqual(result.t, self.tend)
+                for i in range(result.y.shape[0]):
+                    self.assertAlmostEqual(result.y[i], ref.y[i, -1], places=5)
+
+    def test_hooks(self):
+        times = []
+
+        def hook(t, S, V, psi, tau):
+            times.append(t)
+            tau_ref = self.ctx.traction(t, S)
+            V_ref, _ = self.ctx.slip_rates(tau_ref, psi)
+            for f in range(S.shape[0]):
+                self.assertAlmostEqual(tau[f], tau_ref[f])
+                self.assertAlmostEqual(V[f] / V_ref[f], 1.0)
+
+        integrator = Integrator(self.ctx, y0(self.ctx))
+        integrator.add_hook(hook)
+        result = integrator.run(self.tend, max_steps=20)
+        self.assertEqual(result.status, 1)
+        self.assertEqual(result.nsteps, 20)
+        self.assertEqual(len(times), 21)
+        self.assertTrue(np.all(np.diff(times) > 0))
+
+    def test_max_slip(self):
+        max_slip = 0.01
+        slip = []
+        integrator = Integrator(self.ctx, y0(self.ctx), max_slip=max_slip)
+        integrator.add_hook(lambda t, S, V, psi, tau: slip.append(S.copy()))
+        integrator.run(self.tend)
+        self.assertLessEqual(np.abs(np.diff(slip, axis=0)).max(), 1.5 * max_slip)
+
+    def test_failure(self):
+        integrator = Integrator(self.ctx, y0(self.ctx))
+        integrator.ctx = self.ctx.with_params(self.ctx.vp, ConstantParams(
+            2.670, 3.464, 1e-9, 1e-6, 0.015, np.nan, 0.6, 50, 1e-9))
+        result = integrator.run(self.tend)
+        self.assertEqual(result.status, -2)
+        self.assertFalse(result.success)
+        self.assertEqual(result.t, 0.0)
+        integrator = Integrator(self.ctx, y0(self.ctx), first_step=0.0)
+        result = integrator.run(self.tend)
+        self.assertEqual(result.status, -1)
+
+    def test_batch(self):
+        cp = self.ctx.cp
+        cps = [cp, ConstantParams(2.670, 3.464, 1e-9, 1e-6, 0.015, 0.01, 0.6, 40, 1e-9)]
+        batch = self.ctx.with_params(self.ctx.vp, ConstantParams.stack(cps))
+        result = integrate(batch, (0, self.tend), rtol=1e-8, atol=1e-8)
+        self.assertEqual(result.y.shape, (2, 2 * len(self.ctx.map)))
+        for k, cp in enumerate(cps):
+            ref = integrate(self.ctx.with_params(self.ctx.vp, cp), (0, self.tend), rtol=1e-8,
+                            atol=1e-8)
+            self.assertTrue(np.allclose(result.y[k], ref.y, rtol=1e-5, atol=1e-5))
+
+
+if __name__ == '__main__':
+    unittest.main()
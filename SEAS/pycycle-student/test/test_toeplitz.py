@@ -0,0 +1,75 @@
+import numpy as np
+import unittest
+
+import pycycle.green as green
+from pycycle.bem import assemble, rhs_op
+from pycycle.mesh import InfiniteLineElement, line_normal, tessellate_line
+from pycycle.seas import Context, ConstantParams, VariableParams
+from pycycle.toeplitz import build, detect
+
+
+class TestToeplitz(unittest.TestCase):
+    def setUp(self):
+        b1 = (0, 40.0)
+        b2 = (0, 50.0)
+        star_centre = (1, 1)
+        normal1 = line_normal((0, 0), b1, star_centre)
+        normal2 = line_normal(b1, b2, star_centre)
+        self.mesh = tessellate_line((0, 0), b1, 0.5, normal1, True)
+        self.mesh += tessellate_line(b1, b2, 1.0, normal2)
+        self.mesh.append(InfiniteLineElement(b2, normal2))
+
+    def test_detect(self):
+        self.assertTrue(detect(self.mesh))
+        mesh = tessellate_line((0, 0), (0, 20.0), 0.5, (-1, 0), True)
+        mesh += tessellate_line((0, 20.0), (0, 40.0), 1.0, (-1, 0), True)
+        self.assertFalse(detect(mesh))
+        with self.assertRaises(ValueError):
+            build(green.G_fs, green.dG_fs_dn, mesh, method='gauss')
+
+    def test_dipping(self):
+        b = (20.0, 20.0)
+        normal = line_normal((0, 0), b, (1, 0))
+        mesh = tessellate_line((0, 0), b, 1.0, normal, True)
+        mesh.append(InfiniteLineElement(b, normal))
+        self.assertTrue(detect(mesh))
+        self.assertTrue(detect(mesh, green.G, green.dG_dn))
+        self.assertFalse(detect(mesh, green.G_fs, green.dG_fs_dn))
+        with self.assertRaises(ValueError):
+            build(green.G_fs, green.dG_fs_dn, mesh, method='gauss')
+        cp = ConstantParams(2.670, 3.464, 1e-9, 1e-6, 0.015, 0.008, 0.6, 50, 1e-9)
+        vp = VariableParams(mesh, lambda x: 0.015, lambda x: -20)
+        ctx = Context(mesh, green.G_fs, green.dG_fs_dn, vp, cp, assembly='gauss',
+                      operator='auto')
+        self.assertEqual(ctx.operator, 'dense')
+
+    def test_blocks(self):
+        op = build(green.G_fs, green.dG_fs_dn, self.mesh, method='gauss')
+        A = assemble(green.G_fs, self.mesh, method='gauss')
+        B = rhs_op(green.dG_fs_dn, self.mesh, method='gauss')
+        f = op.fault
+        self.assertTrue(np.allclose(op.A_ff.to_dense(), A[np.ix_(f, f)], rtol=0, atol=1e-12))
+        self.assertTrue(np.allclose(op.B_ff.to_dense(), B[np.ix_(f, f)], rtol=0, atol=1e-12))
+        x = np.sin(np.arange(f.shape[0]))
+        X = np.stack((x, x[::-1]), axis=1)
+        self.assertTrue(np.allclose(op.A_ff @ X, A[np.ix_(f, f)] @ X, rtol=0, atol=1e-10))
+
+    def test_traction(self):
+        cp = ConstantParams(2.670, 3.464, 1e-9, 1e-6, 0.015, 0.008, 0.6, 50, 1e-9)
+        vp = VariableParams(self.mesh, lambda x: 0.015, lambda x: -20)
+        ctx = Context(self.mesh, green.G_fs, green.dG_fs_dn, vp, cp, assembly='gauss',
+                      operator='auto')
+        ctx_ref = Context(self.mesh, green.G_fs, green.dG_fs_dn, vp, cp, assembly='gauss')
+        self.assertEqual(ctx.operator, 'toeplitz')
+        self.assertIsNone(ctx.K)
+        u = np.linspace(0, 1, len(ctx.map))**2
+        tau = ctx.traction(1e8, u)
+        tau_ref = ctx_ref.traction(1e8, u)
+        for f in range(len(ctx.map)):
+            self.assertAlmostEqual(tau[f], tau_ref[f], places=6)
+        K, load = ctx.fault_operator()
+        self.assertTrue(np.allclose(K, ctx_ref.K, rtol=0, atol=1e-8 * np.abs(ctx_ref.K).max()))
+
+
+if __name__ == '__main__':
+    unittest.main()